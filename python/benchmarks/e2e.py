@@ -0,0 +1,380 @@
+"""End-to-end benchmarks of the agent loop against local fixture sites.
+
+Each scenario serves a static site from benchmarks/sites on a local HTTP server and
+runs BrowserAgent against headless Chromium with a ScriptedPlanner, so every run
+takes the same actions and needs no network or API key. Per-phase timings come from
+the spans of a ChromeTraceTracer.
+
+Usage, from the python directory:
+
+    python -m benchmarks.e2e                      # Compare against the baseline
+    python -m benchmarks.e2e --update-baseline    # Record a new baseline
+    python -m benchmarks.e2e --cdp --scenario form --trace-dir traces --no-compare
+
+Timings depend on the machine, so the baseline is recorded locally rather than
+committed. The run exits with status 1 if a metric regressed by more than the
+tolerance, and with status 2 if there is no baseline to compare against.
+"""
+
+import argparse
+import base64
+import functools
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from PIL import Image
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from cerebellum import (
+    ActionPlanner,
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserState,
+    BrowserStep,
+    CDPTransport,
+    ChromeTraceTracer,
+    Coordinate,
+)
+
+SITES_DIR = os.path.join(os.path.dirname(__file__), "sites")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+WINDOW_SIZE = (1024, 768)
+
+# Phases reported per step, as named by the agent's tracer spans
+PHASES = ("step", "capture", "capture.screenshot", "plan", "act")
+
+
+def action(
+    action_type: BrowserActionType,
+    x: Optional[int] = None,
+    y: Optional[int] = None,
+    text: Optional[str] = None,
+) -> BrowserAction:
+    """Builds a scripted action."""
+    coordinate = Coordinate(x=x, y=y) if x is not None and y is not None else None
+    return BrowserAction(
+        action=action_type,
+        coordinate=coordinate,
+        text=text,
+        reasoning="Scripted benchmark step",
+        id=f"toolu_{action_type.value}",
+    )
+
+
+def click(x: int, y: int) -> list[BrowserAction]:
+    return [
+        action(BrowserActionType.MOUSE_MOVE, x, y),
+        action(BrowserActionType.LEFT_CLICK),
+    ]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A fixture page and the actions taken on it."""
+
+    path: str
+    actions: list[BrowserAction]
+
+
+SCENARIOS = {
+    "form": Scenario(
+        "/form/index.html",
+        [
+            *click(200, 80),
+            action(BrowserActionType.TYPE, text="Ada Lovelace"),
+            *click(200, 160),
+            action(BrowserActionType.TYPE, text="ada@example.com"),
+            *click(200, 240),
+            action(BrowserActionType.TYPE, text="12 St James's Square, London"),
+            *click(100, 320),
+        ],
+    ),
+    "scroll": Scenario(
+        "/scroll/index.html",
+        [action(BrowserActionType.SCROLL_DOWN)] * 6
+        + [action(BrowserActionType.SCROLL_UP)] * 2,
+    ),
+    "tabs": Scenario(
+        "/tabs/index.html",
+        [
+            *click(120, 60),
+            action(BrowserActionType.SWITCH_TAB, text="1"),
+            action(BrowserActionType.SCROLL_DOWN),
+            action(BrowserActionType.SWITCH_TAB, text="0"),
+        ],
+    ),
+    "images": Scenario(
+        "/images/index.html",
+        [action(BrowserActionType.SCROLL_DOWN)] * 4,
+    ),
+}
+
+
+class ScriptedPlanner(ActionPlanner):
+    """Deterministic planner returning a fixed list of actions, then success.
+
+    Attributes:
+        screenshot_bytes: Decoded size of each screenshot the planner received.
+    """
+
+    def __init__(self, actions: list[BrowserAction]) -> None:
+        super().__init__()
+        self.actions = actions
+        self.screenshot_bytes: list[int] = []
+
+    def plan_action(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> BrowserAction:
+        self.screenshot_bytes.append(len(base64.b64decode(current_state.screenshot)))
+
+        step = len(session_history)
+        if step < len(self.actions):
+            return self.actions[step]
+        return action(BrowserActionType.SUCCESS)
+
+
+@functools.cache
+def generated_photo(index: int) -> bytes:
+    """Renders a deterministic noisy PNG that compresses poorly, like a photo."""
+    rng = random.Random(index)
+    img = Image.effect_noise((800, 600), 64 + rng.randint(0, 32)).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves benchmarks/sites and generated photos, counting response bytes."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, directory=SITES_DIR, **kwargs)
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if keyword.lower() == "content-length":
+            self.server.bytes_served += int(value)  # type: ignore[attr-defined]
+        super().send_header(keyword, value)
+
+    def do_GET(self) -> None:  # noqa: N802 Name required by BaseHTTPRequestHandler
+        if not self.path.startswith("/generated/photo-"):
+            super().do_GET()
+            return
+
+        index = int(self.path.rsplit("-", 1)[1].split(".")[0])
+        body = generated_photo(index)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def fixture_server() -> Iterator[ThreadingHTTPServer]:
+    """Serves the fixture sites on a free local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.bytes_served = 0  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def create_driver(args: argparse.Namespace) -> webdriver.Chrome:
+    """Starts headless Chromium."""
+    options = webdriver.ChromeOptions()
+    if args.chromium:
+        options.binary_location = args.chromium
+    options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}")
+    options.add_argument(f"--force-device-scale-factor={args.device_scale_factor}")
+    if os.name == "posix" and os.geteuid() == 0:
+        options.add_argument("--no-sandbox")
+
+    chromedriver = args.chromedriver or shutil.which("chromedriver")
+    service = Service(executable_path=chromedriver) if chromedriver else None
+    return webdriver.Chrome(options=options, service=service)
+
+
+def phase_means(tracer: ChromeTraceTracer) -> dict[str, float]:
+    """Mean duration in milliseconds of each reported phase."""
+    durations: dict[str, list[float]] = defaultdict(list)
+    for span in tracer.spans:
+        if span.name in PHASES:
+            durations[span.name].append(span.duration_us / 1000)
+    return {name: statistics.fmean(values) for name, values in durations.items()}
+
+
+def run_scenario(
+    name: str, scenario: Scenario, args: argparse.Namespace
+) -> dict[str, float]:
+    """Runs one scenario once and returns its metrics."""
+    with fixture_server() as server:
+        driver = create_driver(args)
+        cdp = None
+        try:
+            host, port = server.server_address[:2]
+            driver.get(f"http://{host}:{port}{scenario.path}")
+            server.bytes_served = 0  # type: ignore[attr-defined]
+
+            trace_path = None
+            if args.trace_dir:
+                os.makedirs(args.trace_dir, exist_ok=True)
+                trace_path = os.path.join(args.trace_dir, f"{name}.json")
+            tracer = ChromeTraceTracer(trace_path)
+            planner = ScriptedPlanner(scenario.actions)
+            cdp = CDPTransport.from_driver(driver) if args.cdp else None
+
+            agent = BrowserAgent(
+                driver,
+                planner,
+                f"Benchmark {name}",
+                BrowserAgentOptions(
+                    wait_after_step_ms=args.wait_after_step_ms,
+                    tracer=tracer,
+                    cdp=cdp,
+                    css_pixel_screenshots=args.css_pixels,
+                ),
+            )
+            started = time.perf_counter()
+            agent.start()
+            elapsed = time.perf_counter() - started
+        finally:
+            if cdp:
+                cdp.close()
+            driver.quit()
+
+    steps = len(planner.screenshot_bytes)
+    metrics = {f"{phase}_ms": value for phase, value in phase_means(tracer).items()}
+    metrics["steps_per_sec"] = steps / elapsed
+    metrics["screenshot_bytes_per_step"] = statistics.fmean(planner.screenshot_bytes)
+    metrics["served_bytes_per_step"] = server.bytes_served / steps  # type: ignore
+    return metrics
+
+
+def median_metrics(runs: list[dict[str, float]]) -> dict[str, float]:
+    """Median of each metric across repeated runs."""
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric == "steps_per_sec"
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Lists metrics that regressed by more than the tolerance."""
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(scenario, {}).get(metric)
+            if not expected:
+                continue
+
+            change = (value - expected) / expected
+            if higher_is_better(metric):
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{scenario}.{metric}: {value:.2f} vs baseline {expected:.2f}"
+                )
+    return regressions
+
+
+def print_table(results: dict[str, dict[str, float]]) -> None:
+    metrics = sorted({metric for values in results.values() for metric in values})
+    print(f"{'metric':<28}" + "".join(f"{name:>14}" for name in results))
+    for metric in metrics:
+        row = "".join(
+            f"{results[name].get(metric, float('nan')):>14.2f}" for name in results
+        )
+        print(f"{metric:<28}{row}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), default=None
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--wait-after-step-ms", type=int, default=1)
+    parser.add_argument("--device-scale-factor", type=float, default=1.0)
+    parser.add_argument("--cdp", action="store_true", help="Use the DevTools path")
+    parser.add_argument("--css-pixels", action="store_true")
+    parser.add_argument("--chromium", help="Chromium binary")
+    parser.add_argument("--chromedriver", help="chromedriver binary")
+    parser.add_argument("--trace-dir", help="Write a Chrome trace per scenario")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--no-compare", action="store_true", help="Only report, skip the baseline"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    names = args.scenario or sorted(SCENARIOS)
+
+    results = {
+        name: median_metrics(
+            [run_scenario(name, SCENARIOS[name], args) for _ in range(args.repeat)]
+        )
+        for name in names
+    }
+    print_table(results)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if args.no_compare:
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(
+            f"No baseline at {args.baseline}, run with --update-baseline to record "
+            "one or --no-compare to skip the comparison"
+        )
+        return 2
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print("Regression:", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Microbenchmarks of the CPU-bound planner paths.
+
+Times message building, screenshot processing, coordinate transforms and key
+parsing on synthetic inputs, without a browser or API calls. Each case is run
+repeatedly for timing statistics and once more under tracemalloc for its peak
+allocation, since tracing allocations slows the code down.
+
+Usage, from the python directory:
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter format_into_messages --repeat 50
+    python -m benchmarks.micro --json baseline.json      # Record a baseline
+    python -m benchmarks.micro --baseline baseline.json  # Compare against it
+
+With --baseline the run exits with status 1 if a case's median time or peak
+allocation regressed by more than the tolerance, and with status 2 if the
+baseline file does not exist.
+"""
+
+import argparse
+import base64
+import functools
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from PIL import Image
+
+from cerebellum import (
+    AnthropicPlanner,
+    AnthropicPlannerOptions,
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+    BrowserTab,
+    Coordinate,
+    MsgOptions,
+    ScrollBar,
+    parse_xdotool,
+)
+
+HISTORY_LENGTHS = (10, 50, 200)
+VIEWPORTS = (Coordinate(x=1280, y=800), Coordinate(x=1920, y=1080))
+DEVICE_PIXEL_RATIOS = (1, 2)
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """Timing statistics and peak allocation of one benchmark case."""
+
+    name: str
+    iterations: int
+    mean_ms: float
+    stdev_ms: float
+    median_ms: float
+    p95_ms: float
+    min_ms: float
+    peak_kib: float
+
+
+def measure(
+    name: str, fn: Callable[[], Any], repeat: int, warmup: int = 2
+) -> BenchmarkResult:
+    """Times repeated calls of a function and records its peak allocation."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return BenchmarkResult(
+        name=name,
+        iterations=repeat,
+        mean_ms=statistics.fmean(samples),
+        stdev_ms=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        median_ms=statistics.median(samples),
+        p95_ms=samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))],
+        min_ms=samples[0],
+        peak_kib=peak / 1024,
+    )
+
+
+@functools.cache
+def synthetic_screenshot(width: int, height: int) -> str:
+    """Renders a deterministic page-like PNG screenshot as base64."""
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height // 4), 40).convert("RGB")
+    img.paste(noise, (0, height // 2))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def synthetic_state(viewport: Coordinate, dpr: int = 1) -> BrowserState:
+    """Browser state with a device pixel screenshot of the given viewport."""
+    return BrowserState(
+        screenshot=synthetic_screenshot(viewport.x * dpr, viewport.y * dpr),
+        height=viewport.y,
+        width=viewport.x,
+        scrollbar=ScrollBar(offset=0.25, height=0.1),
+        tabs=[
+            BrowserTab(
+                handle="tab-1",
+                url="https://shop.example.com/checkout",
+                title="Checkout",
+                active=True,
+                new=False,
+                id=0,
+            )
+        ],
+        active_tab="tab-1",
+        mouse=Coordinate(x=viewport.x // 3, y=viewport.y // 2),
+    )
+
+
+def synthetic_history(length: int, state: BrowserState) -> list[BrowserStep]:
+    """A session history cycling through move, click and type actions."""
+    steps = []
+    for index in range(length):
+        if index % 3 == 0:
+            action = BrowserAction(
+                action=BrowserActionType.MOUSE_MOVE,
+                coordinate=Coordinate(x=100 + index % 700, y=80 + index % 500),
+                text=None,
+                reasoning="Move to the next field",
+                id=f"toolu_{index:04d}",
+            )
+        elif index % 3 == 1:
+            action = BrowserAction(
+                action=BrowserActionType.LEFT_CLICK,
+                coordinate=None,
+                text=None,
+                reasoning="Focus the field",
+                id=f"toolu_{index:04d}",
+            )
+        else:
+            action = BrowserAction(
+                action=BrowserActionType.TYPE,
+                coordinate=None,
+                text=f"value {index}",
+                reasoning="Fill in the field",
+                id=f"toolu_{index:04d}",
+            )
+        steps.append(BrowserStep(state=state, action=action))
+    return steps
+
+
+def cases(planner: AnthropicPlanner) -> Iterator[tuple[str, Callable[[], Any]]]:
+    """Yields the named benchmark cases."""
+    base_state = synthetic_state(VIEWPORTS[0])
+
+    for length in HISTORY_LENGTHS:
+        history = synthetic_history(length, base_state)
+        yield (
+            f"format_into_messages[history={length}]",
+            functools.partial(
+                planner.format_into_messages,
+                "Buy a USB-C cable",
+                "None",
+                base_state,
+                history,
+            ),
+        )
+
+    full = MsgOptions(mouse_position=True, screenshot=True, tabs=True)
+    for viewport in VIEWPORTS:
+        for dpr in DEVICE_PIXEL_RATIOS:
+            state = synthetic_state(viewport, dpr)
+            size = f"{viewport.x}x{viewport.y}@{dpr}x"
+            yield (
+                f"format_state_into_msg[{size}]",
+                functools.partial(
+                    planner.format_state_into_msg, "toolu_01", state, full
+                ),
+            )
+            yield (
+                f"estimate_next_request_tokens[{size}]",
+                functools.partial(
+                    planner.estimate_next_request_tokens,
+                    "Buy a USB-C cable",
+                    "None",
+                    [],
+                    state,
+                    synthetic_history(10, state),
+                ),
+            )
+
+    screenshot = base64.b64decode(base_state.screenshot)
+    yield (
+        "mark_screenshot",
+        functools.partial(
+            planner.mark_screenshot,
+            screenshot,
+            base_state.mouse,
+            base_state.scrollbar,
+        ),
+    )
+    large = base64.b64decode(synthetic_screenshot(2560, 1600))
+    yield "resize_screenshot", functools.partial(planner.resize_screenshot, large)
+
+    def transforms() -> None:
+        scaling = planner.get_scaling_ratio(Coordinate(x=1920, y=1080))
+        for x in range(0, 1920, 16):
+            llm = planner.browser_to_llm_coordinates(Coordinate(x=x, y=x // 2), scaling)
+            planner.llm_to_browser_coordinates(llm, scaling)
+
+    yield "get_scaling_ratio+coordinate_transforms[x120]", transforms
+
+    def keys() -> None:
+        for combo in ("ctrl+shift+t", "Return", "alt+Left", "super+space", "a"):
+            parse_xdotool(combo)
+
+    yield "parse_xdotool[x5]", keys
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """Lists cases whose median time or peak allocation regressed."""
+    expected = {case["name"]: case for case in baseline}
+    regressions = []
+    for result in results:
+        if result.name not in expected:
+            continue
+
+        for metric in ("median_ms", "peak_kib"):
+            before = expected[result.name][metric]
+            after = getattr(result, metric)
+            if before and (after - before) / before > tolerance:
+                regressions.append(
+                    f"{result.name}.{metric}: {after:.3f} vs baseline {before:.3f}"
+                )
+    return regressions
+
+
+def print_table(results: list[BenchmarkResult]) -> None:
+    header = ("mean", "stdev", "median", "p95", "min")
+    print(f"{'case':<48}" + "".join(f"{h + ' ms':>11}" for h in header) + "  peak KiB")
+    for result in results:
+        timings = (
+            result.mean_ms,
+            result.stdev_ms,
+            result.median_ms,
+            result.p95_ms,
+            result.min_ms,
+        )
+        print(
+            f"{result.name:<48}"
+            + "".join(f"{value:>11.3f}" for value in timings)
+            + f"{result.peak_kib:>10.1f}"
+        )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--filter", help="Only run cases containing this text")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--baseline", help="Compare with results written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    # The client is never called, message building is local
+    planner = AnthropicPlanner(AnthropicPlannerOptions(client=object()))  # type: ignore[arg-type]
+
+    results = [
+        measure(name, fn, args.repeat)
+        for name, fn in cases(planner)
+        if not args.filter or args.filter in name
+    ]
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    if not args.baseline:
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, record one with --json")
+        return 2
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print("Regression:", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,21 @@
 from .browser import *
+from .actions import *
+from .cdp import *
+from .screencast import *
+from .tabs import *
+from .network import *
+from .targets import *
+from .loops import *
+from .budgets import *
 from .utils import *
+from .tracing import *
+from .recorder import *
+from .checkpoint import *
+from .frames import *
+from .replay import *
+from .blobs import *
+from .trajectories import *
+from .exporter import *
 from .planners.anthropic import *
+from .planners.hedging import *
+from .planners.trajectory_cache import *
@@ -0,0 +1,140 @@
+"""Compilation of browser actions into W3C Actions requests.
+
+This module provides the ActionCompiler class which turns one or more BrowserActions
+into a single precompiled W3C Actions payload, so a step costs one WebDriver round
+trip no matter how many key, pointer and wheel primitives it needs. Primitives run
+strictly in order: after each one, the other input sources are padded with pauses
+so that no two primitives share a tick.
+
+Typical usage example:
+
+    compiler = ActionCompiler(driver)
+    compiler.perform([move_action, click_action], last_state)
+"""
+
+from collections.abc import Sequence
+
+from cerebellum.browser import BrowserAction, BrowserActionType, BrowserState
+from cerebellum.utils import parse_xdotool
+from selenium.webdriver.common.actions.action_builder import ActionBuilder
+from selenium.webdriver.remote.webdriver import WebDriver
+
+COMPILABLE_ACTIONS = frozenset(
+    {
+        BrowserActionType.KEY,
+        BrowserActionType.TYPE,
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.LEFT_CLICK,
+        BrowserActionType.LEFT_CLICK_DRAG,
+        BrowserActionType.RIGHT_CLICK,
+        BrowserActionType.DOUBLE_CLICK,
+        BrowserActionType.SCROLL_DOWN,
+        BrowserActionType.SCROLL_UP,
+    }
+)
+
+
+class ActionCompiler:
+    """Compiles BrowserActions into one W3C Actions request.
+
+    Args:
+        driver: Selenium WebDriver instance the actions are performed on.
+    """
+
+    def __init__(self, driver: WebDriver) -> None:
+        self.driver = driver
+
+    def _align(self, builder: ActionBuilder) -> None:
+        """Pads every input source with pauses up to the longest one."""
+        sources = (builder.key_action, builder.pointer_action, builder.wheel_action)
+        ticks = max(len(action.source.actions) for action in sources)
+        for action in sources:
+            for _ in range(ticks - len(action.source.actions)):
+                action.pause(0)
+
+    def _add(
+        self, builder: ActionBuilder, action: BrowserAction, last_state: BrowserState
+    ) -> None:
+        if action.action == BrowserActionType.KEY:
+            if not action.text:
+                raise ValueError("Text is required for key action")
+
+            key_strokes = parse_xdotool(action.text)
+
+            for modifier in key_strokes.modifiers:
+                builder.key_action.key_down(modifier)
+            for key in key_strokes.keys:
+                builder.key_action.send_keys(key)
+            for modifier in reversed(key_strokes.modifiers):
+                builder.key_action.key_up(modifier)
+
+        elif action.action == BrowserActionType.TYPE:
+            if not action.text:
+                raise ValueError("Text is required for type action")
+            builder.key_action.send_keys(action.text)
+
+        elif action.action == BrowserActionType.MOUSE_MOVE:
+            if not action.coordinate:
+                raise ValueError("Coordinate is required for mouse_move action")
+            builder.pointer_action.move_to_location(
+                action.coordinate.x, action.coordinate.y
+            )
+
+        elif action.action == BrowserActionType.LEFT_CLICK:
+            builder.pointer_action.click()
+
+        elif action.action == BrowserActionType.LEFT_CLICK_DRAG:
+            if not action.coordinate:
+                raise ValueError("Coordinate is required for left_click_drag action")
+            builder.pointer_action.click_and_hold()
+            builder.pointer_action.move_by(action.coordinate.x, action.coordinate.y)
+            builder.pointer_action.release()
+
+        elif action.action == BrowserActionType.RIGHT_CLICK:
+            builder.pointer_action.context_click()
+
+        elif action.action == BrowserActionType.DOUBLE_CLICK:
+            builder.pointer_action.double_click()
+
+        elif action.action == BrowserActionType.SCROLL_DOWN:
+            builder.wheel_action.scroll(0, 0, 0, int(3 * last_state.height / 4))
+
+        elif action.action == BrowserActionType.SCROLL_UP:
+            builder.wheel_action.scroll(0, 0, 0, int(3 * -last_state.height / 4))
+
+        else:
+            raise ValueError(f"Action cannot be compiled: {action.action}")
+
+    def compile(
+        self, actions: Sequence[BrowserAction], last_state: BrowserState
+    ) -> ActionBuilder:
+        """Builds one actions payload running the given actions in order.
+
+        Args:
+            actions: Actions whose type is in COMPILABLE_ACTIONS.
+            last_state: Browser state the actions are planned against.
+
+        Returns:
+            An ActionBuilder holding the compiled payload.
+
+        Raises:
+            ValueError: If an action cannot be compiled or is missing its text or
+                coordinate.
+        """
+        builder = ActionBuilder(self.driver)
+        for action in actions:
+            self._add(builder, action, last_state)
+            self._align(builder)
+
+        # Drop sources that only hold padding so they are not sent at all
+        for device in builder.devices:
+            encoded = device.encode()["actions"]
+            if all(item["type"] == "pause" for item in encoded):
+                device.clear_actions()
+        return builder
+
+    def perform(
+        self, actions: Sequence[BrowserAction], last_state: BrowserState
+    ) -> None:
+        """Compiles the actions and sends them in a single W3C Actions request."""
+        self.compile(actions, last_state).perform()
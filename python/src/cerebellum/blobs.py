@@ -0,0 +1,239 @@
+"""Memory-mapped store of encoded screenshots.
+
+This module provides the BlobStore class which gives random access to millions of
+encoded frames without parsing any JSON. Frames are keyed by task id and step
+number and returned as zero-copy memoryview slices of a memory-mapped blob file,
+so a data loader sampling across the whole store only touches the pages it reads.
+
+On-disk layout:
+
+    <prefix>.bin      Encoded frames, back to back. Identical frames are stored once.
+    <prefix>.blobidx  Index, memory-mapped as well:
+                        magic         8 bytes, b"CBLOBS01"
+                        task count    uint64
+                        frame count   uint64
+                        task starts   uint64 per task + 1, first frame of each task
+                        frames        uint64 offset and length per frame
+                        task ids      JSON list, UTF-8
+
+Both files are written to temporary names and renamed on close.
+
+Typical usage example:
+
+    with BlobStoreWriter("data/frames") as writer:
+        writer.begin("task-1")
+        writer.add(jpeg_bytes)
+
+    store = BlobStore("data/frames")
+    frame = store.get("task-1", 0)
+    image = Image.open(io.BytesIO(frame))
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Optional
+
+BLOBS_EXTENSION = ".bin"
+INDEX_EXTENSION = ".blobidx"
+MAGIC = b"CBLOBS01"
+HEADER = struct.Struct("<8sQQ")
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """Location of an encoded frame in a blob file."""
+
+    offset: int
+    length: int
+
+
+class BlobStoreWriter:
+    """Appends frames to a blob store, task by task.
+
+    Args:
+        prefix: Path of the store without extension.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self._blobs = open(prefix + BLOBS_EXTENSION + ".tmp", "wb")
+        self._task_ids: list[str] = []
+        self._task_starts = array("Q", [0])
+        self._frames = array("Q")
+        self._refs: dict[bytes, ImageRef] = {}
+
+    def begin(self, task_id: str) -> None:
+        """Starts the frames of a new task, numbered from step 0."""
+        if self._task_ids:
+            self._task_starts.append(len(self._frames) // 2)
+        self._task_ids.append(task_id)
+
+    def add(self, data: bytes) -> ImageRef:
+        """Appends the next frame of the current task.
+
+        Returns:
+            Location of the frame, shared with an identical earlier frame.
+        """
+        if not self._task_ids:
+            raise RuntimeError("No task was begun")
+
+        digest = hashlib.sha1(data).digest()
+        ref = self._refs.get(digest)
+        if ref is None:
+            ref = ImageRef(self._blobs.tell(), len(data))
+            self._refs[digest] = ref
+            self._blobs.write(data)
+
+        self._frames.extend([ref.offset, ref.length])
+        return ref
+
+    def discard(self) -> None:
+        """Drops the current task from the index.
+
+        Its frames stay in the blob file, where identical later frames reuse them.
+        """
+        if not self._task_ids:
+            return
+        self._task_ids.pop()
+        start = self._task_starts.pop() if self._task_ids else 0
+        del self._frames[2 * start :]
+
+    def close(self) -> None:
+        """Writes the index and makes the store visible to readers."""
+        if self._blobs.closed:
+            return
+        self._blobs.close()
+
+        task_starts = array("Q", self._task_starts)
+        if self._task_ids:
+            task_starts.append(len(self._frames) // 2)
+
+        with open(self.prefix + INDEX_EXTENSION + ".tmp", "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self._task_ids), len(self._frames) // 2))
+            task_starts.tofile(f)
+            self._frames.tofile(f)
+            f.write(json.dumps(self._task_ids).encode())
+
+        for extension in (BLOBS_EXTENSION, INDEX_EXTENSION):
+            os.replace(self.prefix + extension + ".tmp", self.prefix + extension)
+
+    def __enter__(self) -> "BlobStoreWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def map_file(path: str) -> tuple[Optional[mmap.mmap], memoryview]:
+    """Memory-maps a file read-only. Empty files cannot be mapped."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(b"")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped)
+
+
+class BlobStore:
+    """Random access reader of a blob store.
+
+    Frames can be addressed by task id and step, or by their global frame number
+    for uniform sampling.
+
+    Args:
+        prefix: Path of the store without extension.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self._blobs_map, self._blobs = map_file(prefix + BLOBS_EXTENSION)
+        self._index_map, self._index = map_file(prefix + INDEX_EXTENSION)
+        index = self._index
+
+        magic, task_count, frame_count = HEADER.unpack_from(index)
+        if magic != MAGIC:
+            raise ValueError(f"{prefix}{INDEX_EXTENSION} is not a blob store index")
+
+        starts_end = HEADER.size + 8 * (task_count + 1)
+        frames_end = starts_end + 16 * frame_count
+        self._task_starts = index[HEADER.size : starts_end].cast("Q")
+        self._frames = index[starts_end:frames_end].cast("Q")
+        self.task_ids: list[str] = json.loads(bytes(index[frames_end:]))
+        self._task_numbers: Optional[dict[str, int]] = None
+
+    def __len__(self) -> int:
+        """Number of frames in the store."""
+        return len(self._frames) // 2
+
+    def ref(self, frame: int) -> ImageRef:
+        """Location of a frame in the blob file."""
+        if not 0 <= frame < len(self):
+            raise IndexError("frame index out of range")
+        return ImageRef(self._frames[2 * frame], self._frames[2 * frame + 1])
+
+    def read(self, ref: ImageRef) -> memoryview:
+        """Zero-copy view of the bytes at a location."""
+        return self._blobs[ref.offset : ref.offset + ref.length]
+
+    def __getitem__(self, frame: int) -> memoryview:
+        """Zero-copy view of a frame by its global number."""
+        return self.read(self.ref(frame))
+
+    def step_count(self, task_id: str) -> int:
+        """Number of frames of a task."""
+        number = self.task_number(task_id)
+        return int(self._task_starts[number + 1] - self._task_starts[number])
+
+    def task_number(self, task_id: str) -> int:
+        if self._task_numbers is None:
+            self._task_numbers = {
+                task_id: number for number, task_id in enumerate(self.task_ids)
+            }
+        return self._task_numbers[task_id]
+
+    def get(self, task_id: str, step: int) -> memoryview:
+        """Zero-copy view of a frame by task id and step number.
+
+        Raises:
+            KeyError: If the task is not in the store.
+            IndexError: If the task has no such step.
+        """
+        number = self.task_number(task_id)
+        start, end = self._task_starts[number], self._task_starts[number + 1]
+        if not 0 <= step < end - start:
+            raise IndexError(f"Task {task_id} has no step {step}")
+        return self[start + step]
+
+    def key(self, frame: int) -> tuple[str, int]:
+        """Task id and step number of a frame, e.g. after sampling uniformly."""
+        if not 0 <= frame < len(self):
+            raise IndexError("frame index out of range")
+        number = bisect_right(self._task_starts, frame) - 1
+        return self.task_ids[number], frame - self._task_starts[number]
+
+    def close(self) -> None:
+        """Unmaps the files.
+
+        A file stays mapped until every view returned from it is released, so
+        views still in use remain valid.
+        """
+        for view in (self._task_starts, self._frames, self._index, self._blobs):
+            view.release()
+        for mapped in (self._blobs_map, self._index_map):
+            if mapped is None:
+                continue
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # Unmapped once the remaining views are garbage collected
+
+    def __enter__(self) -> "BlobStore":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -9,13 +9,128 @@ import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Optional, Union
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-from cerebellum.utils import parse_xdotool, pause_for_input
+from anthropic import APITimeoutError
+from cerebellum.tracing import NoopTracer, Tracer
+from cerebellum.utils import pause_for_input
 from selenium.webdriver import ActionChains
-from selenium.webdriver.common.actions.action_builder import ActionBuilder
 from selenium.webdriver.remote.webdriver import WebDriver
 
+if TYPE_CHECKING:
+    from cerebellum.budgets import SessionBudget
+    from cerebellum.cdp import CDPTransport
+    from cerebellum.checkpoint import SessionCheckpointer
+    from cerebellum.loops import LoopDetector
+    from cerebellum.network import RequestBlocker
+    from cerebellum.recorder import SessionRecorder
+    from cerebellum.screencast import ScreencastBuffer
+    from cerebellum.tabs import TabTracker
+    from cerebellum.targets import TargetSnapper
+
+
+# Viewport size in CSS pixels, with the device pixel ratio and page offset needed to
+# clip a CSS pixel screenshot
+VIEWPORT_SCRIPT = """
+return {
+    x: window.innerWidth,
+    y: window.innerHeight,
+    dpr: window.devicePixelRatio,
+    left: window.scrollX,
+    top: window.scrollY,
+};
+"""
+
+# Checks that the focused element accepts text and, if arguments[1] is true, inserts
+# arguments[0] at the caret with the events a real keystroke would fire
+INSERT_TEXT_SCRIPT = """
+const text = arguments[0];
+const insert = arguments[1];
+const el = document.activeElement;
+if (!el || el.disabled || el.readOnly) return false;
+const textTypes = ["", "text", "search", "email", "url", "tel", "password", "number"];
+const isField = el.tagName === "TEXTAREA" || (el.tagName === "INPUT" &&
+    textTypes.includes((el.getAttribute("type") || "").toLowerCase()));
+if (!isField && !el.isContentEditable) return false;
+if (!insert) return true;
+if (!isField) return document.execCommand("insertText", false, text);
+
+const proto = el.tagName === "TEXTAREA"
+    ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+const setValue = Object.getOwnPropertyDescriptor(proto, "value").set;
+const start = el.selectionStart ?? el.value.length;
+const end = el.selectionEnd ?? el.value.length;
+setValue.call(el, el.value.slice(0, start) + text + el.value.slice(end));
+try { el.setSelectionRange(start + text.length, start + text.length); } catch (e) {}
+el.dispatchEvent(new InputEvent("input",
+    { bubbles: true, inputType: "insertText", data: text }));
+el.dispatchEvent(new Event("change", { bubbles: true }));
+return true;
+"""
+
+# Most elements listed by DOM_SNAPSHOT_SCRIPT, in document order
+MAX_DOM_ELEMENTS = 150
+
+# Lists visible, unoccluded interactive elements as [role, name, left, top, width,
+# height, value] rows in CSS pixels relative to the viewport, at most arguments[0]
+DOM_SNAPSHOT_SCRIPT = """
+const limit = arguments[0];
+const selector = "a[href], button, input, select, textarea, summary, [role], " +
+    "[contenteditable=''], [contenteditable='true'], [onclick], [tabindex]";
+const inputRoles = { checkbox: "checkbox", radio: "radio", range: "slider",
+    search: "searchbox", button: "button", submit: "button", reset: "button",
+    image: "button", number: "spinbutton" };
+const clip = (text) => (text || "").replace(/\\s+/g, " ").trim().slice(0, 80);
+const roleOf = (el) => {
+    const role = el.getAttribute("role");
+    if (role) return role.split(" ")[0];
+    const tag = el.tagName.toLowerCase();
+    if (tag === "a") return "link";
+    if (tag === "select") return el.multiple ? "listbox" : "combobox";
+    if (tag === "textarea" || el.isContentEditable) return "textbox";
+    if (tag === "input") return inputRoles[el.type] || "textbox";
+    return tag === "summary" ? "button" : tag;
+};
+const nameOf = (el) => {
+    const labelledBy = el.getAttribute("aria-labelledby");
+    const label = labelledBy && labelledBy.split(" ")
+        .map((id) => document.getElementById(id))
+        .filter(Boolean).map((node) => node.innerText).join(" ");
+    return clip(el.getAttribute("aria-label") || label ||
+        (el.labels && el.labels.length ? el.labels[0].innerText : "") ||
+        el.getAttribute("alt") || el.getAttribute("title") ||
+        el.getAttribute("placeholder") || el.innerText ||
+        (el.type === "submit" || el.type === "button" ? el.value : ""));
+};
+const valueOf = (el) => {
+    if (el.type === "checkbox" || el.type === "radio")
+        return el.checked ? "checked" : "unchecked";
+    if (el.type === "password") return el.value ? "********" : "";
+    if (el.tagName === "SELECT")
+        return clip(el.selectedOptions.length ? el.selectedOptions[0].text : "");
+    if ("value" in el && el.tagName !== "BUTTON" && el.tagName !== "LI")
+        return clip(String(el.value));
+    return el.isContentEditable ? clip(el.innerText) : null;
+};
+const rows = [];
+for (const el of document.querySelectorAll(selector)) {
+    if (rows.length >= limit) break;
+    if (el.disabled || el.getAttribute("aria-hidden") === "true") continue;
+    const rect = el.getBoundingClientRect();
+    if (rect.width < 1 || rect.height < 1 || rect.bottom <= 0 || rect.right <= 0 ||
+        rect.top >= window.innerHeight || rect.left >= window.innerWidth) continue;
+    const style = window.getComputedStyle(el);
+    if (style.visibility === "hidden" || style.opacity === "0") continue;
+    const x = Math.min(Math.max(rect.left + rect.width / 2, 0), window.innerWidth - 1);
+    const y = Math.min(Math.max(rect.top + rect.height / 2, 0), window.innerHeight - 1);
+    const hit = document.elementFromPoint(x, y);
+    if (hit && hit !== el && !el.contains(hit) && !hit.contains(el)) continue;
+    rows.push([roleOf(el), nameOf(el), Math.round(rect.left), Math.round(rect.top),
+        Math.round(rect.width), Math.round(rect.height), valueOf(el)]);
+}
+return rows;
+"""
+
 
 class BrowserGoalState(str, Enum):
     """Enumeration of browser automation states.
@@ -27,12 +142,14 @@ class BrowserGoalState(str, Enum):
         RUNNING: Currently executing browser actions
         SUCCESS: Goal successfully achieved
         FAILED: Goal could not be achieved
+        BUDGET_EXCEEDED: Stopped before a session budget was exceeded
     """
 
     INITIAL = "initial"
     RUNNING = "running"
     SUCCESS = "success"
     FAILED = "failed"
+    BUDGET_EXCEEDED = "budget_exceeded"
 
 
 @dataclass(frozen=True)
@@ -71,6 +188,19 @@ class BrowserTab:
     id: int
 
 
+@dataclass(frozen=True)
+class DomElement:
+    """A visible interactive element, with its bounding box in CSS pixels"""
+
+    role: str
+    name: str
+    left: int
+    top: int
+    width: int
+    height: int
+    value: Optional[str] = None
+
+
 @dataclass
 class BrowserState:
     """Comprehensive capture of browser state"""
@@ -82,6 +212,16 @@ class BrowserState:
     tabs: list[BrowserTab]
     active_tab: str
     mouse: Coordinate
+    # Only captured with the dom_snapshot option
+    elements: Optional[list[DomElement]] = None
+
+    @property
+    def active_url(self) -> Optional[str]:
+        """URL of the active tab, if it is listed in tabs."""
+        for tab in self.tabs:
+            if tab.handle == self.active_tab:
+                return tab.url
+        return None
 
 
 from enum import Enum
@@ -127,7 +267,17 @@ class BrowserStep:
 
 
 class ActionPlanner(ABC):
-    """Abstract base class for new action planners."""
+    """Abstract base class for new action planners.
+
+    Attributes:
+        near_budget: Whether a session budget is nearly used up, so the planner
+            should economise where it can
+        request_timeout_s: Longest a single request may take, for planners that
+            send requests with a timeout
+    """
+
+    near_budget = False
+    request_timeout_s: Optional[float] = None
 
     @abstractmethod
     def plan_action(
@@ -152,6 +302,33 @@ class ActionPlanner(ABC):
         """
         pass
 
+    def estimate_next_request_tokens(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> Optional[int]:
+        """Estimate the input tokens of the next plan_action call.
+
+        Takes the same arguments as plan_action. Planners that cannot estimate
+        their requests return None.
+        """
+        return None
+
+    def set_near_budget(self, near_budget: bool) -> None:
+        """Ask the planner to economise while a session budget is nearly used up."""
+        self.near_budget = near_budget
+
+    def set_request_timeout(self, timeout_s: Optional[float]) -> None:
+        """Limit how long a single request may take. None removes the limit."""
+        self.request_timeout_s = timeout_s
+
+    def reset(self) -> None:  # noqa: B027 Optional hook for stateful planners
+        """Forget per-session state before planning for a new agent."""
+        pass
+
 
 @dataclass(frozen=True)
 class BrowserAgentOptions:
@@ -162,6 +339,19 @@ class BrowserAgentOptions:
     wait_after_step_ms: Optional[int] = None
     pause_after_each_action: Optional[bool] = None
     max_steps: Optional[int] = None
+    tracer: Optional[Tracer] = None
+    recorder: Optional["SessionRecorder"] = None
+    fast_text_entry: Optional[bool] = None
+    cdp: Optional["CDPTransport"] = None
+    css_pixel_screenshots: Optional[bool] = None
+    screencast: Optional["ScreencastBuffer"] = None
+    tab_tracker: Optional["TabTracker"] = None
+    request_blocker: Optional["RequestBlocker"] = None
+    dom_snapshot: Optional[bool] = None
+    target_snapper: Optional["TargetSnapper"] = None
+    loop_detector: Optional["LoopDetector"] = None
+    checkpointer: Optional["SessionCheckpointer"] = None
+    budget: Optional["SessionBudget"] = None
 
 
 class BrowserAgent:
@@ -186,6 +376,7 @@ class BrowserAgent:
     ) -> None:
         self.driver = driver
         self.planner = action_planner
+        self.planner.reset()
         self.goal = goal
         self.additional_context = "None"
         self.additional_instructions: list[str] = []
@@ -195,6 +386,38 @@ class BrowserAgent:
         self._status = BrowserGoalState.INITIAL
         self.history: list[BrowserStep] = []
         self.tabs: dict[str, BrowserTab] = {}
+        self._next_tab_id = 0
+        self.tracer: Tracer = NoopTracer()
+        self.recorder: Optional[SessionRecorder] = None
+        self.fast_text_entry = False
+        self.cdp: Optional[CDPTransport] = None
+        self.css_pixel_screenshots = False
+        self.screencast: Optional[ScreencastBuffer] = None
+        self._last_action_at = 0.0
+        self.tab_tracker: Optional[TabTracker] = None
+        self.request_blocker: Optional[RequestBlocker] = None
+        self.dom_snapshot = False
+        self.target_snapper: Optional[TargetSnapper] = None
+        # Distance the snapper moved the action about to be taken, for its span
+        self._snap_distance: Optional[float] = None
+        self.loop_detector: Optional[LoopDetector] = None
+        self._loop_hint: Optional[str] = None
+        self.checkpointer: Optional[SessionCheckpointer] = None
+        self.budget: Optional[SessionBudget] = None
+        self.budget_exceeded_reason: Optional[str] = None
+        # Success or failure step that ended the session, which history leaves out
+        self.final_step: Optional[BrowserStep] = None
+        self._started_at: Optional[float] = None
+        self._planner_calls = 0
+        # Session totals, kept here since the planner may be wrapped or replaced
+        self.input_token_usage = 0
+        self.output_token_usage = 0
+        self._planner_usage = self._read_planner_usage()
+
+        # Imported here since the compiler module depends on the types above
+        from cerebellum.actions import ActionCompiler
+
+        self.action_compiler = ActionCompiler(driver)
 
         # Set options if supplied
         if options:
@@ -211,32 +434,175 @@ class BrowserAgent:
                 self.pause_after_each_action = options.pause_after_each_action
             if options.max_steps:
                 self.max_steps = options.max_steps
+            if options.tracer:
+                self.tracer = options.tracer
+            if options.recorder:
+                self.recorder = options.recorder
+            if options.fast_text_entry:
+                self.fast_text_entry = options.fast_text_entry
+            if options.cdp:
+                self.cdp = options.cdp
+            if options.css_pixel_screenshots:
+                self.css_pixel_screenshots = options.css_pixel_screenshots
+            if options.screencast:
+                self.screencast = options.screencast
+            if options.tab_tracker:
+                self.tab_tracker = options.tab_tracker
+            if options.request_blocker:
+                self.request_blocker = options.request_blocker
+            if options.dom_snapshot:
+                self.dom_snapshot = options.dom_snapshot
+            if options.target_snapper:
+                self.target_snapper = options.target_snapper
+            if options.loop_detector:
+                self.loop_detector = options.loop_detector
+                self.loop_detector.reset()
+            if options.checkpointer:
+                self.checkpointer = options.checkpointer
+            if options.budget:
+                self.budget = options.budget
+
+    def get_state(self, screenshot: Optional[str] = None) -> BrowserState:
+        """Get current browser state.
+
+        Args:
+            screenshot: Screenshot of the current page taken by the caller, used
+                instead of capturing another one.
+        """
+        with self.tracer.span("capture"):
+            return self._get_state(screenshot)
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        """Run a script in the active tab, over CDP when a transport is set."""
+        if self.cdp:
+            return self.cdp.execute_script(script, *args)
+        return self.driver.execute_script(script, *args)
+
+    def capture_screenshot(self, viewport: Optional[dict[str, Any]] = None) -> str:
+        """Capture the viewport as a base64 PNG, over CDP when a transport is set.
+
+        With css_pixel_screenshots enabled on a HiDPI Chromium page, the browser
+        scales the image down to CSS pixels before it is encoded, instead of
+        returning device pixels that the planner would resize anyway.
+
+        With a screencast buffer set, the newest streamed frame taken after the
+        last action is returned instead of requesting a new screenshot.
 
-    def get_state(self) -> BrowserState:
-        """Get current browser state."""
-        viewport = self.driver.execute_script(
-            "return { x: window.innerWidth, y: window.innerHeight }"
+        Args:
+            viewport: Viewport metrics returned by VIEWPORT_SCRIPT. Needed for
+                CSS pixel captures.
+        """
+        if self.screencast:
+            frame = self.screencast.wait_for_frame(self._last_action_at)
+            if frame:
+                return frame.data
+
+        clip = None
+        if self.css_pixel_screenshots and viewport and viewport.get("dpr", 1) != 1:
+            clip = {
+                "x": viewport["left"],
+                "y": viewport["top"],
+                "width": viewport["x"],
+                "height": viewport["y"],
+                "scale": 1 / viewport["dpr"],
+            }
+
+        if self.cdp:
+            return self.cdp.capture_screenshot(clip)
+        if clip and hasattr(self.driver, "execute_cdp_cmd"):
+            result = self.driver.execute_cdp_cmd(
+                "Page.captureScreenshot", {"format": "png", "clip": clip}
+            )
+            return str(result["data"])
+        return self.driver.get_screenshot_as_base64()
+
+    def _get_state(self, screenshot: Optional[str] = None) -> BrowserState:
+        if self.request_blocker:
+            # Follows the agent to newly activated tabs
+            self.request_blocker.apply()
+
+        with self.tracer.span("capture.viewport"):
+            viewport = self.execute_script(VIEWPORT_SCRIPT)
+        if screenshot is None:
+            with self.tracer.span("capture.screenshot"):
+                screenshot = self.capture_screenshot(viewport)
+
+        with self.tracer.span("capture.mouse"):
+            mouse_position = self.get_mouse_position()
+        with self.tracer.span("capture.scroll"):
+            scroll_position = self.get_scroll_position()
+
+        with self.tracer.span("capture.tabs"):
+            browser_tabs, current_tab = self._get_tabs()
+
+        elements = None
+        if self.dom_snapshot or self.target_snapper:
+            with self.tracer.span("capture.elements"):
+                elements = self.capture_elements()
+            if self.target_snapper:
+                self.target_snapper.update(elements)
+
+        return BrowserState(
+            screenshot=screenshot,
+            height=viewport["y"],
+            width=viewport["x"],
+            scrollbar=scroll_position,
+            tabs=browser_tabs,
+            active_tab=current_tab,
+            mouse=mouse_position,
+            elements=elements if self.dom_snapshot else None,
         )
-        screenshot = self.driver.get_screenshot_as_base64()
 
-        mouse_position = self.get_mouse_position()
-        scroll_position = self.get_scroll_position()
+    def capture_elements(self) -> list[DomElement]:
+        """List the visible interactive elements of the page in one script call.
+
+        Hidden, disabled and covered elements are pruned in the page, so only a
+        compact list of what the user could interact with is transferred.
+        """
+        rows = self.execute_script(DOM_SNAPSHOT_SCRIPT, MAX_DOM_ELEMENTS)
+        return [DomElement(*row) for row in rows or []]
+
+    def _get_tabs(self) -> tuple[list[BrowserTab], str]:
+        if self.tab_tracker:
+            if self.cdp:
+                current_tab = self.cdp.target_id
+            else:
+                current_tab = self.driver.current_window_handle
+            pages = [
+                (page.handle, page.url, page.title) for page in self.tab_tracker.pages()
+            ]
+            return self._update_tabs(pages, current_tab), current_tab
 
         tabs = self.driver.window_handles
         current_tab = self.driver.current_window_handle
-        browser_tabs = []
+        pages = []
 
         for tab in tabs:
             self.driver.switch_to.window(tab)
-            tab_url = self.driver.current_url
-            tab_title = self.driver.title
+            pages.append((tab, self.driver.current_url, self.driver.title))
+
+        # Switch back to the original active tab
+        self.driver.switch_to.window(current_tab)
+        if self.cdp:
+            self.cdp.activate(current_tab)
+
+        return self._update_tabs(pages, current_tab), current_tab
+
+    def _update_tabs(
+        self, pages: list[tuple[str, str, str]], current_tab: str
+    ) -> list[BrowserTab]:
+        browser_tabs = []
+
+        for tab, tab_url, tab_title in pages:
             is_active = tab == current_tab
 
             if tab in self.tabs:
                 tab_id = self.tabs[tab].id
                 is_new = False
             else:
-                tab_id = len(self.tabs)
+                # Ids are never reused, even after a tab is closed
+                tab_id = self._next_tab_id
+                self._next_tab_id += 1
                 is_new = True
 
             # Update / create tab information
@@ -249,22 +615,12 @@ class BrowserAgent:
                 id=tab_id,
             )
 
-            self.tabs[tab] = browser_tab
-
             browser_tabs.append(browser_tab)
 
-        # Switch back to the original active tab
-        self.driver.switch_to.window(current_tab)
+        # Closed tabs are dropped
+        self.tabs = {tab.handle: tab for tab in browser_tabs}
 
-        return BrowserState(
-            screenshot=screenshot,
-            height=viewport["y"],
-            width=viewport["x"],
-            scrollbar=scroll_position,
-            tabs=browser_tabs,
-            active_tab=current_tab,
-            mouse=mouse_position,
-        )
+        return browser_tabs
 
     def get_action(self, current_state: BrowserState) -> BrowserAction:
         """Get next action from planner based on current state."""
@@ -278,7 +634,7 @@ class BrowserAgent:
 
     def get_scroll_position(self) -> ScrollBar:
         """Get current scroll position information."""
-        offset, height = self.driver.execute_script(
+        offset, height = self.execute_script(
             "return [window.pageYOffset/document.documentElement.scrollHeight,"
             "window.innerHeight/document.documentElement.scrollHeight]"
         )
@@ -286,6 +642,10 @@ class BrowserAgent:
 
     def get_mouse_position(self) -> Coordinate:
         """Get current mouse cursor position."""
+        if self.cdp:
+            # All pointer input goes through the transport, which tracks it
+            return self.cdp.mouse
+
         script = """
         window.last_mouse_x = 0;
         window.last_mouse_y = 0;
@@ -297,10 +657,9 @@ class BrowserAgent:
         """
         self.driver.execute_script(script)
 
-        # Small mouse movement to trigger event
+        # Small mouse movement to trigger event, sent as a single actions request
         actions = ActionChains(self.driver)
-        actions.move_by_offset(3, 3).perform()
-        actions.move_by_offset(-3, -3).perform()
+        actions.move_by_offset(3, 3).move_by_offset(-3, -3).perform()
 
         # Give time for event to register
         time.sleep(0.1)
@@ -314,79 +673,68 @@ class BrowserAgent:
 
         return Coordinate(x=0, y=0)
 
-    def take_action(self, action: BrowserAction, last_state: BrowserState) -> None:
-        """Execute the specified browser action."""
-        action_builder = ActionBuilder(self.driver)
+    def insert_text(self, text: str) -> bool:
+        """Insert text into the focused editable element in a single operation.
 
-        if action.action == BrowserActionType.KEY:
-            if not action.text:
-                raise ValueError("Text is required for key action")
+        Uses CDP Input.insertText on Chromium drivers and a scripted value update
+        with input and change events elsewhere. Text containing control characters
+        or Selenium special keys is left to per-key typing.
 
-            key_strokes = parse_xdotool(action.text)
+        Returns:
+            True if the text was inserted, False if per-key typing is needed.
+        """
+        if any(char in "\n\r\t" or "\ue000" <= char <= "\uf8ff" for char in text):
+            return False
 
-            for modifier in key_strokes.modifiers:
-                action_builder.key_action.key_down(modifier)
-            for key in key_strokes.keys:
-                action_builder.key_action.send_keys(key)
-            for modifier in reversed(key_strokes.modifiers):
-                action_builder.key_action.key_up(modifier)
+        if self.cdp:
+            if not self.cdp.execute_script(INSERT_TEXT_SCRIPT, text, False):
+                return False
+            self.cdp.session.send("Input.insertText", {"text": text})
+            return True
 
-            action_builder.perform()
+        if hasattr(self.driver, "execute_cdp_cmd"):
+            if not self.driver.execute_script(INSERT_TEXT_SCRIPT, text, False):
+                return False
+            self.driver.execute_cdp_cmd("Input.insertText", {"text": text})
+            return True
 
-        elif action.action == BrowserActionType.TYPE:
+        return bool(self.driver.execute_script(INSERT_TEXT_SCRIPT, text, True))
+
+    def take_action(self, action: BrowserAction, last_state: BrowserState) -> None:
+        """Execute the specified browser action."""
+        attributes: dict[str, Any] = {"action": action.action}
+        if self._snap_distance is not None:
+            attributes["snap_distance"] = self._snap_distance
+            self._snap_distance = None
+        with self.tracer.span("act", **attributes):
+            self._take_action(action, last_state)
+        self._last_action_at = time.monotonic()
+
+    def _take_action(self, action: BrowserAction, last_state: BrowserState) -> None:
+        from cerebellum.actions import COMPILABLE_ACTIONS
+
+        if action.action == BrowserActionType.TYPE:
             if not action.text:
                 raise ValueError("Text is required for type action")
-            action_builder.key_action.send_keys(action.text)
-            action_builder.perform()
-
-        elif action.action == BrowserActionType.MOUSE_MOVE:
-            if not action.coordinate:
-                raise ValueError("Coordinate is required for mouse_move action")
-            action_builder.pointer_action.move_to_location(
-                action.coordinate.x, action.coordinate.y
-            )
-            action_builder.perform()
-
-        elif action.action == BrowserActionType.LEFT_CLICK:
-            action_builder.pointer_action.click()
-            action_builder.perform()
-
-        elif action.action == BrowserActionType.LEFT_CLICK_DRAG:
-            if not action.coordinate:
-                raise ValueError("Coordinate is required for left_click_drag action")
-            action_builder.pointer_action.click_and_hold()
-            action_builder.pointer_action.move_by(
-                action.coordinate.x, action.coordinate.y
-            )
-            action_builder.pointer_action.release()
-            action_builder.perform()
+            if self.fast_text_entry and self.insert_text(action.text):
+                return
 
-        elif action.action == BrowserActionType.RIGHT_CLICK:
-            action_builder.pointer_action.context_click()
-            action_builder.perform()
+        if self.cdp and self.cdp.perform(action, last_state):
+            return
+
+        if action.action in COMPILABLE_ACTIONS:
+            self.action_compiler.perform([action], last_state)
 
         elif action.action == BrowserActionType.MIDDLE_CLICK:
             print("Middle mouse click not supported")
 
-        elif action.action == BrowserActionType.DOUBLE_CLICK:
-            action_builder.pointer_action.double_click()
-            action_builder.perform()
-
-        elif (
-            action.action
-            == BrowserActionType.SCREENSHOT | BrowserActionType.CURSOR_POSITION
+        elif action.action in (
+            BrowserActionType.SCREENSHOT,
+            BrowserActionType.CURSOR_POSITION,
         ):
             # These are handled automatically
             pass
 
-        elif action.action == BrowserActionType.SCROLL_DOWN:
-            action_builder.wheel_action.scroll(0, 0, 0, int(3 * last_state.height / 4))
-            action_builder.perform()
-
-        elif action.action == BrowserActionType.SCROLL_UP:
-            action_builder.wheel_action.scroll(0, 0, 0, int(3 * -last_state.height / 4))
-            action_builder.perform()
-
         elif action.action == BrowserActionType.SWITCH_TAB:
             if not action.text:
                 raise ValueError("Text is required for switch_tab action")
@@ -401,42 +749,227 @@ class BrowserAgent:
             if tab_handle is None:
                 raise ValueError(f"No tab found with id: {action.text}")
             self.driver.switch_to.window(tab_handle)
+            if self.cdp:
+                self.cdp.activate(tab_handle)
 
         else:
             raise ValueError(f"Unsupported action: {action.action}")
 
     def step(self) -> None:
         """Execute a single step of browser automation."""
+        with self.tracer.span("step", step=len(self.history)):
+            self._step()
+
+    def _step(self) -> None:
         current_state = self.get_state()
-        next_action = self.get_action(current_state)
+        self._checkpoint()
+        if (self.loop_detector and self._handle_loop(current_state)) or (
+            self.budget and self._enforce_budget(current_state)
+        ):
+            self._checkpoint()
+            return
+
+        try:
+            with self.tracer.span("plan"):
+                next_action = self.get_action(current_state)
+        except (APITimeoutError, TimeoutError):
+            if self.budget is None or self.budget.max_step_latency_s is None:
+                raise
+            self._count_token_usage()
+            self.budget_exceeded_reason = (
+                "the planner request took longer than "
+                f"{self.budget.max_step_latency_s}s"
+            )
+            self._stop(
+                current_state,
+                BrowserGoalState.BUDGET_EXCEEDED,
+                f"Stopped when the budget was exceeded: {self.budget_exceeded_reason}",
+            )
+            self._checkpoint()
+            return
+        self._planner_calls += 1
+        self._count_token_usage()
+        if self.target_snapper:
+            next_action = self.target_snapper.snap(next_action)
+            self._snap_distance = self.target_snapper.last_distance
+
+        step = BrowserStep(state=current_state, action=next_action)
 
         if next_action.action == "success":
             self._status = BrowserGoalState.SUCCESS
+            self.final_step = step
+            self._record(step)
+            self._checkpoint()
             return
         elif next_action.action == "failure":
             self._status = BrowserGoalState.FAILED
+            self.final_step = step
+            self._record(step)
+            self._checkpoint()
             return
         else:
             self._status = BrowserGoalState.RUNNING
             self.take_action(next_action, current_state)
 
-        self.history.append(BrowserStep(state=current_state, action=next_action))
+        self.history.append(step)
+        self._record(step)
+
+    def _handle_loop(self, current_state: BrowserState) -> bool:
+        """Applies the loop detector's response to a detected loop.
+
+        Returns:
+            True if the session was stopped.
+        """
+        from cerebellum.loops import LoopResponse
+
+        assert self.loop_detector is not None
+        reason = self.loop_detector.check(self.history, current_state)
+        if reason is None:
+            return False
+
+        response = self.loop_detector.respond(self.history, reason)
+        with self.tracer.span("loop", reason=reason, response=response.value):
+            if response == LoopResponse.HINT:
+                # Replaces the hint of an earlier detection
+                instructions = [
+                    instruction
+                    for instruction in self.additional_instructions
+                    if instruction != self._loop_hint
+                ]
+                self._loop_hint = self.loop_detector.hint(reason)
+                self.additional_instructions = [*instructions, self._loop_hint]
+                return False
+
+            if response == LoopResponse.ESCALATE:
+                assert self.loop_detector.escalation_planner is not None
+                self._count_token_usage()
+                self.planner = self.loop_detector.escalation_planner
+                self.planner.reset()
+                self._planner_usage = self._read_planner_usage()
+                return False
+
+        self._stop(
+            current_state, BrowserGoalState.FAILED, f"Stopped since the agent {reason}"
+        )
+        return True
+
+    def _enforce_budget(self, current_state: BrowserState) -> bool:
+        """Checks the session budget before the next planner call.
+
+        Returns:
+            True if the session was stopped.
+        """
+        from cerebellum.budgets import BudgetUsage
+
+        assert self.budget is not None
+        # Also picks up tokens reported after the last call, e.g. by hedged requests
+        self._count_token_usage()
+        input_tokens = self.input_token_usage
+        output_tokens = self.output_token_usage
+
+        if self.budget.limits_tokens:
+            with self.tracer.span("budget.estimate"):
+                estimate = self.planner.estimate_next_request_tokens(
+                    self.goal,
+                    self.additional_context,
+                    self.additional_instructions,
+                    current_state,
+                    self.history,
+                )
+            input_tokens += estimate or 0
+            # The next response is assumed to be as long as the average one
+            if self._planner_calls:
+                output_tokens += output_tokens // self._planner_calls
+
+        usage = BudgetUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            elapsed_s=time.monotonic() - (self._started_at or time.monotonic()),
+        )
+        reason = self.budget.exceeded(usage)
+        if reason:
+            self.budget_exceeded_reason = reason
+            self._stop(
+                current_state,
+                BrowserGoalState.BUDGET_EXCEEDED,
+                f"Stopped before the budget was exceeded: {reason}",
+            )
+            return True
+
+        self.planner.set_near_budget(self.budget.near(usage))
+        self.planner.set_request_timeout(self.budget.max_step_latency_s)
+        return False
+
+    def _read_planner_usage(self) -> tuple[int, int]:
+        """Reads the planner's token counters, treating missing ones as 0."""
+        usage = []
+        for name in ("input_token_usage", "output_token_usage"):
+            value = getattr(self.planner, name, 0)
+            usage.append(value if isinstance(value, int) else 0)
+        return usage[0], usage[1]
+
+    def _count_token_usage(self) -> None:
+        """Adds the tokens the planner used since it was last read to the totals."""
+        input_tokens, output_tokens = self._read_planner_usage()
+        self.input_token_usage += input_tokens - self._planner_usage[0]
+        self.output_token_usage += output_tokens - self._planner_usage[1]
+        self._planner_usage = (input_tokens, output_tokens)
+
+    def _stop(
+        self, current_state: BrowserState, status: BrowserGoalState, reason: str
+    ) -> None:
+        """Ends the session without asking the planner, recording the reason."""
+        step = BrowserStep(
+            state=current_state,
+            action=BrowserAction(
+                action=BrowserActionType.FAILURE,
+                coordinate=None,
+                text=reason,
+                reasoning="",
+                id="",
+            ),
+        )
+        self._status = status
+        self.final_step = step
+        self._record(step)
+
+    def _checkpoint(self) -> None:
+        if self.checkpointer and self.checkpointer.due(self):
+            with self.tracer.span("checkpoint"):
+                self.checkpointer.save(self)
+
+    def _record(self, step: BrowserStep) -> None:
+        if self.recorder:
+            self.recorder.record(step)
 
     def start(self) -> None:
         """Start the browser automation process."""
         # Initialize mouse inside viewport
-        actions = ActionChains(self.driver)
-        actions.move_by_offset(1, 1).perform()
-
-        while (
-            self._status in (BrowserGoalState.INITIAL, BrowserGoalState.RUNNING)
-            and len(self.history) <= self.max_steps
-        ):
-            self.step()
-            time.sleep(self.wait_after_step_ms / 1000)  # Convert to seconds
-
-            if self.pause_after_each_action:
-                pause_for_input()
+        if self.cdp:
+            self.cdp.move_mouse(Coordinate(x=1, y=1))
+        else:
+            actions = ActionChains(self.driver)
+            actions.move_by_offset(1, 1).perform()
+
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+        try:
+            with self.tracer.span("session", goal=self.goal):
+                while (
+                    self._status in (BrowserGoalState.INITIAL, BrowserGoalState.RUNNING)
+                    and len(self.history) < self.max_steps
+                ):
+                    self.step()
+                    with self.tracer.span("wait_after_step"):
+                        time.sleep(self.wait_after_step_ms / 1000)  # Convert to seconds
+
+                    if self.pause_after_each_action:
+                        pause_for_input()
+        finally:
+            self.tracer.flush()
+            if self.recorder:
+                self.recorder.flush()
 
     @property
     def status(self) -> BrowserGoalState:
@@ -0,0 +1,125 @@
+"""Session budgets for browser automation runs.
+
+This module provides the SessionBudget class, a set of hard limits on what a
+single BrowserAgent session may spend: input and output tokens, estimated cost
+and wall-clock time. The agent checks the budget before every planner call against
+the tokens used so far plus an estimate of the next request, and ends the session
+with the BUDGET_EXCEEDED status once a limit would be crossed.
+
+The latency of a single planner call cannot be checked before the call, so it is
+passed to the planner as the timeout of its requests instead.
+
+When any token or cost limit is nearly used up, the planner is told to economise,
+which for AnthropicPlanner means sending smaller screenshots.
+
+Typical usage example:
+
+    budget = SessionBudget(max_cost=0.50, max_duration_s=600)
+    agent = BrowserAgent(driver, planner, goal, BrowserAgentOptions(budget=budget))
+    agent.start()
+    if agent.status == BrowserGoalState.BUDGET_EXCEEDED:
+        print(agent.budget_exceeded_reason)
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class BudgetUsage:
+    """What a session has spent, or will have spent after the next request."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    elapsed_s: float = 0.0
+
+
+@dataclass(frozen=True)
+class SessionBudget:
+    """Limits on the spending of one session. Limits left as None are not checked.
+
+    Args:
+        max_input_tokens: Input tokens across all planner requests.
+        max_output_tokens: Output tokens across all planner requests.
+        max_cost: Estimated cost in US dollars.
+        max_duration_s: Wall-clock time since the session started.
+        max_step_latency_s: Timeout of a single planner request, for planners
+            that support one. A request that times out is not retried and ends
+            the session.
+        input_token_price: US dollars per million input tokens.
+        output_token_price: US dollars per million output tokens.
+        near_budget_fraction: Share of a token or cost limit after which the
+            planner is asked to economise.
+    """
+
+    max_input_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    max_duration_s: Optional[float] = None
+    max_step_latency_s: Optional[float] = None
+    input_token_price: float = 3.0
+    output_token_price: float = 15.0
+    near_budget_fraction: float = 0.8
+
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether a limit depends on the token counts."""
+        return (
+            self.max_input_tokens is not None
+            or self.max_output_tokens is not None
+            or self.max_cost is not None
+        )
+
+    def cost(self, usage: BudgetUsage) -> float:
+        """Estimated cost of the tokens in usage, in US dollars."""
+        return (
+            usage.input_tokens * self.input_token_price
+            + usage.output_tokens * self.output_token_price
+        ) / 1_000_000
+
+    def exceeded(self, usage: BudgetUsage) -> Optional[str]:
+        """Checks usage against every limit.
+
+        Returns:
+            The first limit exceeded, described for the session log, or None.
+        """
+        if self.max_input_tokens is not None and (
+            usage.input_tokens > self.max_input_tokens
+        ):
+            return (
+                f"{usage.input_tokens} input tokens exceed the budget of "
+                f"{self.max_input_tokens}"
+            )
+        if self.max_output_tokens is not None and (
+            usage.output_tokens > self.max_output_tokens
+        ):
+            return (
+                f"{usage.output_tokens} output tokens exceed the budget of "
+                f"{self.max_output_tokens}"
+            )
+        if self.max_cost is not None and self.cost(usage) > self.max_cost:
+            return (
+                f"estimated cost of ${self.cost(usage):.4f} exceeds the budget of "
+                f"${self.max_cost:.4f}"
+            )
+        if self.max_duration_s is not None and usage.elapsed_s > self.max_duration_s:
+            return (
+                f"{usage.elapsed_s:.1f}s elapsed exceed the budget of "
+                f"{self.max_duration_s:.1f}s"
+            )
+        return None
+
+    def fraction_used(self, usage: BudgetUsage) -> float:
+        """Largest share of a token or cost limit used, 0.0 without such limits."""
+        fractions = [0.0]
+        if self.max_input_tokens:
+            fractions.append(usage.input_tokens / self.max_input_tokens)
+        if self.max_output_tokens:
+            fractions.append(usage.output_tokens / self.max_output_tokens)
+        if self.max_cost:
+            fractions.append(self.cost(usage) / self.max_cost)
+        return max(fractions)
+
+    def near(self, usage: BudgetUsage) -> bool:
+        """Whether the planner should economise."""
+        return self.fraction_used(usage) >= self.near_budget_fraction
@@ -0,0 +1,541 @@
+"""Direct Chrome DevTools Protocol transport for Chromium drivers.
+
+WebDriver commands travel over HTTP to chromedriver, which translates them into
+DevTools Protocol calls. This module talks to the browser's DevTools websocket
+directly instead: the CDPTransport class captures screenshots, evaluates scripts
+and dispatches input events with a single websocket message each, which removes
+the chromedriver round trip from every call. Commands for one action are pipelined
+and answered in order.
+
+The transport attaches to the page targets of the driver's window handles, which
+chromedriver uses as DevTools target ids. BrowserAgent falls back to WebDriver for
+anything the transport does not handle.
+
+Typical usage example:
+
+    cdp = CDPTransport.from_driver(driver)
+    agent = BrowserAgent(driver, planner, goal, BrowserAgentOptions(cdp=cdp))
+    try:
+        agent.start()
+    finally:
+        if cdp:
+            cdp.close()
+"""
+
+import itertools
+import json
+import threading
+import urllib.request
+from collections import defaultdict
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, NamedTuple, Optional
+
+import websocket
+from cerebellum.browser import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    Coordinate,
+)
+from cerebellum.utils import parse_xdotool
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.webdriver import WebDriver
+
+CDPListener = Callable[[dict[str, Any], Optional[str]], None]
+CDPCommand = tuple[str, dict[str, Any]]
+
+# Capability keys holding the DevTools address of Chromium based drivers
+DEBUGGER_CAPABILITIES = ("goog:chromeOptions", "ms:edgeOptions")
+
+
+class CDPError(Exception):
+    """Raised when a DevTools command fails or the connection is lost."""
+
+
+class CDPConnection:
+    """Websocket connection to a DevTools endpoint.
+
+    Responses are matched to commands by id on a background reader thread, and
+    events are passed to listeners registered with on().
+
+    Args:
+        url: DevTools websocket URL, usually the browser endpoint.
+        timeout_s: Time to wait for the connection and for each response.
+    """
+
+    def __init__(self, url: str, timeout_s: float = 30) -> None:
+        self.timeout_s = timeout_s
+        self._ws = websocket.create_connection(
+            url, timeout=timeout_s, suppress_origin=True, enable_multithread=True
+        )
+        self._ws.settimeout(None)  # The reader blocks until the next message
+        self._ids = itertools.count(1)
+        self._pending: dict[int, Future[dict[str, Any]]] = {}
+        self._listeners: defaultdict[str, list[CDPListener]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(
+            target=self._read, name="cerebellum-cdp", daemon=True
+        )
+        self._reader.start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message = json.loads(self._ws.recv())
+            except Exception as e:
+                self._fail_pending(CDPError(f"DevTools connection closed: {e}"))
+                return
+
+            if "id" in message:
+                with self._lock:
+                    future = self._pending.pop(message["id"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    error = message["error"]
+                    future.set_exception(
+                        CDPError(f"{error.get('message')} ({error.get('code')})")
+                    )
+                else:
+                    future.set_result(message.get("result", {}))
+            else:
+                for listener in list(self._listeners.get(message.get("method"), [])):
+                    listener(message.get("params", {}), message.get("sessionId"))
+
+    def _fail_pending(self, error: CDPError) -> None:
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(error)
+
+    def send_async(
+        self,
+        method: str,
+        params: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> "Future[dict[str, Any]]":
+        """Sends a command without waiting for its response.
+
+        Returns:
+            A future resolving to the command result.
+
+        Raises:
+            CDPError: If the connection is closed.
+        """
+        future: Future[dict[str, Any]] = Future()
+        message: dict[str, Any] = {"method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+
+        with self._lock:
+            if self._closed:
+                raise CDPError("DevTools connection is closed")
+            message["id"] = next(self._ids)
+            self._pending[message["id"]] = future
+        self._ws.send(json.dumps(message))
+        return future
+
+    def send(
+        self,
+        method: str,
+        params: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Sends a command and waits for its result.
+
+        Raises:
+            CDPError: If the command fails, times out or the connection is lost.
+        """
+        return self.wait(self.send_async(method, params, session_id))
+
+    def wait(self, future: "Future[dict[str, Any]]") -> dict[str, Any]:
+        """Waits for the result of a command sent with send_async."""
+        try:
+            return future.result(timeout=self.timeout_s)
+        except FutureTimeoutError as e:
+            raise CDPError("Timed out waiting for DevTools response") from e
+
+    def on(self, event: str, listener: CDPListener) -> None:
+        """Registers a listener called with the params and session id of events."""
+        self._listeners[event].append(listener)
+
+    def off(self, event: str, listener: CDPListener) -> None:
+        """Removes a listener registered with on()."""
+        if listener in self._listeners[event]:
+            self._listeners[event].remove(listener)
+
+    def close(self) -> None:
+        """Closes the websocket and fails any commands still waiting."""
+        self._ws.close()
+        self._fail_pending(CDPError("DevTools connection is closed"))
+        self._reader.join(timeout=self.timeout_s)
+
+
+class CDPSession:
+    """Commands and events scoped to one attached target.
+
+    Args:
+        connection: Browser connection the target is attached through.
+        session_id: Flattened session id returned by Target.attachToTarget.
+    """
+
+    def __init__(self, connection: CDPConnection, session_id: str) -> None:
+        self.connection = connection
+        self.session_id = session_id
+
+    def send(
+        self, method: str, params: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        """Sends a command to the target and waits for its result."""
+        return self.connection.send(method, params, self.session_id)
+
+    def send_all(self, commands: Sequence[CDPCommand]) -> list[dict[str, Any]]:
+        """Sends commands back to back, then waits for all of their results.
+
+        The target handles the commands in order, so pipelining them costs one
+        round trip instead of one per command.
+        """
+        futures = [
+            self.connection.send_async(method, params, self.session_id)
+            for method, params in commands
+        ]
+        return [self.connection.wait(future) for future in futures]
+
+    def on(self, event: str, listener: Callable[[dict[str, Any]], None]) -> None:
+        """Registers a listener for events from this target only."""
+
+        def scoped(params: dict[str, Any], session_id: Optional[str]) -> None:
+            if session_id == self.session_id:
+                listener(params)
+
+        self.connection.on(event, scoped)
+
+
+def browser_websocket_url(driver: WebDriver, timeout_s: float = 5) -> Optional[str]:
+    """Looks up the browser DevTools websocket URL of a Chromium driver.
+
+    Returns:
+        The websocket URL, or None if the driver does not expose a DevTools
+        address.
+    """
+    capabilities = getattr(driver, "capabilities", None) or {}
+    address = next(
+        (
+            capabilities[key]["debuggerAddress"]
+            for key in DEBUGGER_CAPABILITIES
+            if isinstance(capabilities.get(key), dict)
+            and capabilities[key].get("debuggerAddress")
+        ),
+        None,
+    )
+    if address is None:
+        return None
+
+    with urllib.request.urlopen(
+        f"http://{address}/json/version", timeout=timeout_s
+    ) as response:
+        return str(json.load(response)["webSocketDebuggerUrl"])
+
+
+class KeyDefinition(NamedTuple):
+    """DevTools key event fields for a key."""
+
+    key: str
+    code: str
+    key_code: int
+    text: str = ""
+
+
+# Selenium special keys that can be sent as DevTools key events
+CDP_KEY_DEFINITIONS: dict[str, KeyDefinition] = {
+    Keys.RETURN: KeyDefinition("Enter", "Enter", 13, "\r"),
+    Keys.ENTER: KeyDefinition("Enter", "NumpadEnter", 13, "\r"),
+    Keys.TAB: KeyDefinition("Tab", "Tab", 9),
+    Keys.BACK_SPACE: KeyDefinition("Backspace", "Backspace", 8),
+    Keys.ESCAPE: KeyDefinition("Escape", "Escape", 27),
+    Keys.SPACE: KeyDefinition(" ", "Space", 32, " "),
+    Keys.PAGE_UP: KeyDefinition("PageUp", "PageUp", 33),
+    Keys.PAGE_DOWN: KeyDefinition("PageDown", "PageDown", 34),
+    Keys.END: KeyDefinition("End", "End", 35),
+    Keys.HOME: KeyDefinition("Home", "Home", 36),
+    Keys.ARROW_LEFT: KeyDefinition("ArrowLeft", "ArrowLeft", 37),
+    Keys.ARROW_UP: KeyDefinition("ArrowUp", "ArrowUp", 38),
+    Keys.ARROW_RIGHT: KeyDefinition("ArrowRight", "ArrowRight", 39),
+    Keys.ARROW_DOWN: KeyDefinition("ArrowDown", "ArrowDown", 40),
+    Keys.INSERT: KeyDefinition("Insert", "Insert", 45),
+    Keys.DELETE: KeyDefinition("Delete", "Delete", 46),
+    Keys.SHIFT: KeyDefinition("Shift", "ShiftLeft", 16),
+    Keys.CONTROL: KeyDefinition("Control", "ControlLeft", 17),
+    Keys.ALT: KeyDefinition("Alt", "AltLeft", 18),
+    Keys.META: KeyDefinition("Meta", "MetaLeft", 91),
+    **{
+        getattr(Keys, f"F{n}"): KeyDefinition(f"F{n}", f"F{n}", 111 + n)
+        for n in range(1, 13)
+    },
+}
+
+# DevTools modifier bit flags
+CDP_MODIFIERS = {Keys.ALT: 1, Keys.CONTROL: 2, Keys.META: 4, Keys.SHIFT: 8}
+
+
+def key_definition(key: str) -> Optional[KeyDefinition]:
+    """Returns the DevTools key fields for a Selenium key or a printable character.
+
+    Returns:
+        The key definition, or None if the key has no DevTools equivalent here.
+    """
+    if key in CDP_KEY_DEFINITIONS:
+        return CDP_KEY_DEFINITIONS[key]
+    if key in ("\n", "\r"):
+        return CDP_KEY_DEFINITIONS[Keys.RETURN]
+    if key == "\t":
+        return CDP_KEY_DEFINITIONS[Keys.TAB]
+    if len(key) != 1 or "\ue000" <= key <= "\uf8ff" or not key.isprintable():
+        return None
+
+    upper = key.upper()
+    if "A" <= upper <= "Z":
+        return KeyDefinition(key, f"Key{upper}", ord(upper), key)
+    if "0" <= key <= "9":
+        return KeyDefinition(key, f"Digit{key}", ord(key), key)
+    return KeyDefinition(key, "", 0, key)
+
+
+def key_events(definition: KeyDefinition, modifiers: int = 0) -> list[CDPCommand]:
+    """Builds the key down and up events for one key press."""
+    # Text is only produced when no command modifier is held, as on a keyboard
+    text = definition.text if not modifiers & ~CDP_MODIFIERS[Keys.SHIFT] else ""
+    params = {
+        "key": definition.key,
+        "code": definition.code,
+        "windowsVirtualKeyCode": definition.key_code,
+        "modifiers": modifiers,
+    }
+    return [
+        (
+            "Input.dispatchKeyEvent",
+            {"type": "keyDown" if text else "rawKeyDown", "text": text, **params},
+        ),
+        ("Input.dispatchKeyEvent", {"type": "keyUp", **params}),
+    ]
+
+
+class CDPTransport:
+    """DevTools fast path for capture, scripts and input of a Chromium driver.
+
+    Args:
+        connection: Connection to the browser DevTools endpoint.
+        target_id: Target id of the page to drive, which is the WebDriver handle
+            of its window.
+
+    Attributes:
+        mouse: Last pointer position dispatched through the transport.
+    """
+
+    def __init__(self, connection: CDPConnection, target_id: str) -> None:
+        self.connection = connection
+        self.target_id = target_id
+        self.mouse = Coordinate(x=0, y=0)
+        self._sessions: dict[str, CDPSession] = {}
+
+    @classmethod
+    def from_driver(cls, driver: WebDriver) -> Optional["CDPTransport"]:
+        """Connects to the browser behind a Chromium driver.
+
+        Returns:
+            A transport for the driver's current window, or None if the driver
+            is not Chromium based.
+        """
+        url = browser_websocket_url(driver)
+        if url is None:
+            return None
+        return cls(CDPConnection(url), driver.current_window_handle)
+
+    @property
+    def session(self) -> CDPSession:
+        """Session attached to the active target, attaching on first use."""
+        if self.target_id not in self._sessions:
+            result = self.connection.send(
+                "Target.attachToTarget", {"targetId": self.target_id, "flatten": True}
+            )
+            self._sessions[self.target_id] = CDPSession(
+                self.connection, result["sessionId"]
+            )
+        return self._sessions[self.target_id]
+
+    def activate(self, target_id: str) -> None:
+        """Directs further commands to another page target."""
+        self.target_id = target_id
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        """Runs a WebDriver style script body and returns its value.
+
+        The script sees its arguments as `arguments` and returns with `return`,
+        as with WebDriver.execute_script.
+
+        Raises:
+            CDPError: If the script throws.
+        """
+        expression = f"(function() {{\n{script}\n}}).apply(null, {json.dumps(args)})"
+        result = self.session.send(
+            "Runtime.evaluate", {"expression": expression, "returnByValue": True}
+        )
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = details.get("exception", {}).get("description")
+            raise CDPError(f"Script failed: {description or details.get('text')}")
+        return result["result"].get("value")
+
+    def capture_screenshot(self, clip: Optional[dict[str, Any]] = None) -> str:
+        """Captures the viewport as a base64 encoded PNG.
+
+        Args:
+            clip: Optional Page.captureScreenshot clip, e.g. to scale the image.
+        """
+        params: dict[str, Any] = {"format": "png"}
+        if clip:
+            params["clip"] = clip
+        result = self.session.send("Page.captureScreenshot", params)
+        return str(result["data"])
+
+    def _mouse_event(
+        self, event_type: str, x: int, y: int, **params: Any
+    ) -> CDPCommand:
+        return (
+            "Input.dispatchMouseEvent",
+            {"type": event_type, "x": x, "y": y, **params},
+        )
+
+    def _click(self, button: str, buttons: int, count: int) -> list[CDPCommand]:
+        x, y = self.mouse.x, self.mouse.y
+        events = []
+        for click_count in range(1, count + 1):
+            events += [
+                self._mouse_event(
+                    "mousePressed",
+                    x,
+                    y,
+                    button=button,
+                    buttons=buttons,
+                    clickCount=click_count,
+                ),
+                self._mouse_event(
+                    "mouseReleased", x, y, button=button, clickCount=click_count
+                ),
+            ]
+        return events
+
+    def _key_commands(self, action: BrowserAction) -> Optional[list[CDPCommand]]:
+        if not action.text:
+            return None
+
+        if action.action == BrowserActionType.TYPE:
+            commands = []
+            for char in action.text:
+                definition = key_definition(char)
+                if definition is None:
+                    return None
+                commands += key_events(definition)
+            return commands
+
+        key_strokes = parse_xdotool(action.text)
+        definitions = [key_definition(key) for key in key_strokes.keys]
+        if None in definitions:
+            return None
+
+        modifiers = 0
+        commands = []
+        for modifier in key_strokes.modifiers:
+            modifiers |= CDP_MODIFIERS.get(modifier, 0)
+            down, _ = key_events(CDP_KEY_DEFINITIONS[modifier], modifiers)
+            commands.append(down)
+        for definition in definitions:
+            assert definition is not None
+            commands += key_events(definition, modifiers)
+        for modifier in reversed(key_strokes.modifiers):
+            modifiers &= ~CDP_MODIFIERS.get(modifier, 0)
+            _, up = key_events(CDP_KEY_DEFINITIONS[modifier], modifiers)
+            commands.append(up)
+        return commands
+
+    def _commands(
+        self, action: BrowserAction, last_state: BrowserState
+    ) -> Optional[list[CDPCommand]]:
+        x, y = self.mouse.x, self.mouse.y
+
+        if action.action == BrowserActionType.MOUSE_MOVE:
+            if not action.coordinate:
+                raise ValueError("Coordinate is required for mouse_move action")
+            self.mouse = action.coordinate
+            return [self._mouse_event("mouseMoved", self.mouse.x, self.mouse.y)]
+        if action.action == BrowserActionType.LEFT_CLICK:
+            return self._click("left", 1, 1)
+        if action.action == BrowserActionType.RIGHT_CLICK:
+            return self._click("right", 2, 1)
+        if action.action == BrowserActionType.DOUBLE_CLICK:
+            return self._click("left", 1, 2)
+        if action.action == BrowserActionType.LEFT_CLICK_DRAG:
+            if not action.coordinate:
+                raise ValueError("Coordinate is required for left_click_drag action")
+            # Same relative movement as the WebDriver path
+            self.mouse = Coordinate(
+                x=x + action.coordinate.x, y=y + action.coordinate.y
+            )
+            return [
+                self._mouse_event(
+                    "mousePressed", x, y, button="left", buttons=1, clickCount=1
+                ),
+                self._mouse_event(
+                    "mouseMoved", self.mouse.x, self.mouse.y, button="left", buttons=1
+                ),
+                self._mouse_event(
+                    "mouseReleased",
+                    self.mouse.x,
+                    self.mouse.y,
+                    button="left",
+                    clickCount=1,
+                ),
+            ]
+        if action.action in (
+            BrowserActionType.SCROLL_DOWN,
+            BrowserActionType.SCROLL_UP,
+        ):
+            direction = 1 if action.action == BrowserActionType.SCROLL_DOWN else -1
+            delta = int(3 * direction * last_state.height / 4)
+            return [self._mouse_event("mouseWheel", 0, 0, deltaX=0, deltaY=delta)]
+        if action.action in (BrowserActionType.KEY, BrowserActionType.TYPE):
+            return self._key_commands(action)
+        return None
+
+    def move_mouse(self, coordinate: Coordinate) -> None:
+        """Moves the pointer to a viewport coordinate."""
+        self.mouse = coordinate
+        self.session.send_all(
+            [self._mouse_event("mouseMoved", coordinate.x, coordinate.y)]
+        )
+
+    def perform(self, action: BrowserAction, last_state: BrowserState) -> bool:
+        """Dispatches an action as DevTools input events.
+
+        Args:
+            action: Action to perform.
+            last_state: Browser state the action was planned against.
+
+        Returns:
+            True if the action was performed, False if it has to go through
+            WebDriver instead.
+        """
+        commands = self._commands(action, last_state)
+        if commands is None:
+            return False
+        self.session.send_all(commands)
+        return True
+
+    def close(self) -> None:
+        """Closes the DevTools connection."""
+        self.connection.close()
@@ -0,0 +1,288 @@
+"""Checkpoints of in-flight browser automation sessions.
+
+This module provides the SessionCheckpointer class which saves the state of a
+running BrowserAgent every few steps, and resume_agent which continues such a
+session on a fresh driver after the worker running it died.
+
+A checkpoint holds the goal, the serialisable agent options, the history with
+references to content-addressed screenshot files, the tab map, the current loop
+hint and what the session spent so far: tokens, planner calls and running time, so
+session budgets carry over to the resumed session. It is rewritten atomically, so
+a crash while saving leaves the previous checkpoint intact.
+
+On-disk layout:
+
+    <directory>/checkpoint.json       The latest checkpoint
+    <directory>/screenshots/<sha256>  Decoded screenshot bytes (.png or .jpg)
+
+Typical usage example:
+
+    checkpointer = SessionCheckpointer("runs/session-1")
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(checkpointer=checkpointer))
+    agent.start()
+
+    # After a crash, on a new worker
+    agent = resume_agent(new_driver, planner, "runs/session-1")
+    agent.start()
+"""
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Optional
+
+from cerebellum.browser import (
+    ActionPlanner,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserGoalState,
+    BrowserStep,
+    BrowserTab,
+)
+from cerebellum.recorder import (
+    SCREENSHOTS_DIR,
+    deserialize_step,
+    read_screenshot,
+    serialize_step,
+    write_screenshot,
+)
+from selenium.webdriver.remote.webdriver import WebDriver
+
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_VERSION = 3
+
+# BrowserAgent attributes saved with a checkpoint, named as in BrowserAgentOptions
+SAVED_OPTIONS = (
+    "additional_context",
+    "additional_instructions",
+    "wait_after_step_ms",
+    "pause_after_each_action",
+    "max_steps",
+    "fast_text_entry",
+    "css_pixel_screenshots",
+    "dom_snapshot",
+)
+
+# BrowserAgent token totals saved with a checkpoint
+SAVED_TOKEN_USAGE = ("input_token_usage", "output_token_usage")
+
+
+@dataclass
+class SessionCheckpoint:
+    """Serialisable state of a BrowserAgent session."""
+
+    goal: str
+    status: BrowserGoalState
+    options: dict[str, Any]
+    history: list[BrowserStep]
+    tabs: list[BrowserTab]
+    next_tab_id: int
+    loop_hint: Optional[str]
+    token_usage: dict[str, int]
+    planner_calls: int
+    elapsed_s: float
+    every: int
+    timestamp: float
+
+    @property
+    def last_url(self) -> Optional[str]:
+        """URL of the tab that was active after the last step."""
+        for tab in self.tabs:
+            if tab.active:
+                return tab.url
+        return None
+
+
+class SessionCheckpointer:
+    """Saves the state of a BrowserAgent session every few steps.
+
+    Args:
+        directory: Directory for the checkpoint. Created if missing.
+        every: Number of steps between checkpoints. The final step of a session
+            is always saved.
+
+    Attributes:
+        checkpoints_written: Number of checkpoints saved by this checkpointer.
+    """
+
+    def __init__(self, directory: str, every: int = 1) -> None:
+        self.directory = directory
+        self.every = every
+        self.checkpoints_written = 0
+        self._screenshots_dir = os.path.join(directory, SCREENSHOTS_DIR)
+        os.makedirs(self._screenshots_dir, exist_ok=True)
+        self._known_screenshots: set[str] = set(os.listdir(self._screenshots_dir))
+        # Serialised steps by identity, as history only grows
+        self._serialized: list[tuple[BrowserStep, dict[str, Any]]] = []
+
+    def due(self, agent: BrowserAgent) -> bool:
+        """Whether the agent should be saved now."""
+        if agent.status not in (BrowserGoalState.INITIAL, BrowserGoalState.RUNNING):
+            return True
+        return len(agent.history) % self.every == 0
+
+    def _serialize_history(self, history: list[BrowserStep]) -> list[dict[str, Any]]:
+        # Drop cached steps that are no longer the agent's, e.g. for a new session
+        kept = 0
+        while (
+            kept < min(len(self._serialized), len(history))
+            and self._serialized[kept][0] is history[kept]
+        ):
+            kept += 1
+        del self._serialized[kept:]
+
+        for step in history[kept:]:
+            name = write_screenshot(
+                self._screenshots_dir, step.state.screenshot, self._known_screenshots
+            )
+            self._serialized.append((step, serialize_step(step, name)))
+        return [data for _, data in self._serialized]
+
+    def save(self, agent: BrowserAgent) -> None:
+        """Writes a checkpoint of the agent, replacing the previous one.
+
+        The agent saves itself right after observing the page, so every step in
+        the history has been taken and the tab map shows the current URLs.
+        """
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "goal": agent.goal,
+            "status": agent.status.value,
+            "options": {name: getattr(agent, name) for name in SAVED_OPTIONS},
+            "history": self._serialize_history(agent.history),
+            "tabs": [asdict(tab) for tab in agent.tabs.values()],
+            "next_tab_id": agent._next_tab_id,
+            "loop_hint": agent._loop_hint,
+            "token_usage": {name: getattr(agent, name) for name in SAVED_TOKEN_USAGE},
+            "planner_calls": agent._planner_calls,
+            "elapsed_s": (
+                time.monotonic() - agent._started_at if agent._started_at else 0.0
+            ),
+            "every": self.every,
+            "timestamp": time.time(),
+        }
+
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self.checkpoints_written += 1
+
+
+def load_checkpoint(directory: str) -> SessionCheckpoint:
+    """Reads the checkpoint written by a SessionCheckpointer.
+
+    Raises:
+        FileNotFoundError: If the directory holds no checkpoint.
+        ValueError: If the checkpoint was written by an unknown version.
+    """
+    with open(os.path.join(directory, CHECKPOINT_FILE)) as f:
+        data = json.load(f)
+    if data.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {data.get('version')}")
+
+    screenshots_dir = os.path.join(directory, SCREENSHOTS_DIR)
+    return SessionCheckpoint(
+        goal=data["goal"],
+        status=BrowserGoalState(data["status"]),
+        options=data["options"],
+        history=[
+            deserialize_step(
+                step, read_screenshot(screenshots_dir, step["state"]["screenshot"])
+            )
+            for step in data["history"]
+        ],
+        tabs=[BrowserTab(**tab) for tab in data["tabs"]],
+        next_tab_id=data["next_tab_id"],
+        loop_hint=data["loop_hint"],
+        token_usage=data["token_usage"],
+        planner_calls=data["planner_calls"],
+        elapsed_s=data["elapsed_s"],
+        every=data["every"],
+        timestamp=data["timestamp"],
+    )
+
+
+def reopen_tabs(driver: WebDriver, tabs: list[BrowserTab]) -> dict[str, BrowserTab]:
+    """Opens the checkpointed tabs in a fresh driver, keeping their ids.
+
+    The first tab reuses the driver's current window. The previously active tab
+    is switched to last.
+
+    Returns:
+        The tab map of the agent, keyed by the new window handles.
+    """
+    reopened: dict[str, BrowserTab] = {}
+    active_handle = None
+    for number, tab in enumerate(tabs):
+        if number > 0:
+            driver.switch_to.new_window("tab")
+        handle = driver.current_window_handle
+        if tab.url:
+            driver.get(tab.url)
+        reopened[handle] = replace(tab, handle=handle, new=False)
+        if tab.active:
+            active_handle = handle
+
+    if active_handle is not None and active_handle != driver.current_window_handle:
+        driver.switch_to.window(active_handle)
+    return reopened
+
+
+def resume_agent(
+    driver: WebDriver,
+    action_planner: ActionPlanner,
+    directory: str,
+    options: Optional[BrowserAgentOptions] = None,
+) -> BrowserAgent:
+    """Rebuilds a checkpointed BrowserAgent on a fresh driver.
+
+    The checkpointed tabs are reopened at their last URLs and the session
+    continues after its last saved step, with the tokens and running time spent
+    so far counting against its budget. Page state that a URL does not capture,
+    such as filled in form fields, is lost.
+
+    Args:
+        driver: Fresh Selenium WebDriver instance.
+        action_planner: Planner for the remaining steps.
+        directory: Directory of the checkpoint.
+        options: Options that are not saved in a checkpoint, such as the tracer,
+            recorder or DevTools transport. Saved options set here take
+            precedence. If None, only the saved options are used.
+
+    Returns:
+        The agent, ready to start. Without a checkpointer in options, further
+        checkpoints are written to the same directory at the saved interval.
+    """
+    checkpoint = load_checkpoint(directory)
+
+    options = options or BrowserAgentOptions()
+    overrides: dict[str, Any] = {
+        name: value
+        for name, value in checkpoint.options.items()
+        if getattr(options, name) is None
+    }
+    if options.checkpointer is None:
+        overrides["checkpointer"] = SessionCheckpointer(directory, checkpoint.every)
+    options = replace(options, **overrides)
+
+    agent = BrowserAgent(driver, action_planner, checkpoint.goal, options)
+    agent.history = checkpoint.history
+    agent.tabs = reopen_tabs(driver, checkpoint.tabs)
+    agent._next_tab_id = checkpoint.next_tab_id
+    # The hint is part of the saved instructions, and replaced on the next detection
+    agent._loop_hint = checkpoint.loop_hint
+    if checkpoint.status != BrowserGoalState.INITIAL:
+        agent._status = checkpoint.status
+    for name, value in checkpoint.token_usage.items():
+        setattr(agent, name, value)
+    agent._planner_calls = checkpoint.planner_calls
+    agent._started_at = time.monotonic() - checkpoint.elapsed_s
+
+    if agent.cdp:
+        agent.cdp.activate(driver.current_window_handle)
+    return agent
@@ -0,0 +1,170 @@
+"""Export of browser sessions into the training dataset format.
+
+This module provides the SessionExporter class which writes live BrowserAgent
+sessions and recorded sessions into the sharded trajectory format of
+cerebellum.trajectories. Screenshots get the planner's cursor and scrollbar
+overlays and are downscaled once, when a step is exported, so production runs and
+converted datasets produce identical training images.
+
+Steps are streamed one at a time: each screenshot is prepared and appended to the
+shard's blob file before the next step is read, and only the small step metadata
+of the current session is held in memory.
+
+Typical usage example:
+
+    with SessionExporter("datasets/production") as exporter:
+        agent.start()
+        exporter.export_agent(agent)
+        exporter.export_recording("runs/session-1", goal="Buy a USB-C cable")
+"""
+
+import os
+import re
+import uuid
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from cerebellum.browser import BrowserAgent, BrowserGoalState, BrowserStep
+from cerebellum.recorder import load_session
+from cerebellum.trajectories import (
+    TrainingImageOptions,
+    TrajectoryWriter,
+    shard_complete,
+)
+
+SHARD_PATTERN = re.compile(r"^shard-(\d{5})\.idx$")
+
+
+class SessionExporter:
+    """Writes sessions into numbered trajectory shards.
+
+    Shards are numbered after the complete shards already in the directory, so
+    repeated exports into the same directory accumulate. The open shard becomes
+    visible to readers once it holds shard_size sessions or the exporter closes.
+
+    Args:
+        output_dir: Directory the shards are written to. Created if missing.
+        shard_size: Number of sessions per shard.
+        image_options: Target size and JPEG quality of the exported screenshots.
+            If None, uses 640x400 at quality 85.
+        successful_only: Skip agent sessions that did not end in success.
+
+    Attributes:
+        sessions_exported: Number of sessions written by this exporter.
+        steps_exported: Number of steps written by this exporter.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        shard_size: int = 100,
+        image_options: Optional[TrainingImageOptions] = None,
+        successful_only: bool = False,
+    ) -> None:
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.image_options = image_options or TrainingImageOptions()
+        self.successful_only = successful_only
+        self.sessions_exported = 0
+        self.steps_exported = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        existing = [
+            int(match.group(1))
+            for match in map(SHARD_PATTERN.match, os.listdir(output_dir))
+            if match
+        ]
+        self._next_shard = max(existing) + 1 if existing else 0
+        self._writer: Optional[TrajectoryWriter] = None
+        self._sessions_in_shard = 0
+
+    def _shard_writer(self) -> TrajectoryWriter:
+        if self._writer is None:
+            prefix = os.path.join(self.output_dir, f"shard-{self._next_shard:05d}")
+            while shard_complete(prefix):
+                self._next_shard += 1
+                prefix = os.path.join(self.output_dir, f"shard-{self._next_shard:05d}")
+            self._writer = TrajectoryWriter(prefix, self.image_options)
+            self._sessions_in_shard = 0
+        return self._writer
+
+    def export(
+        self, goal: str, steps: Iterable[BrowserStep], session_id: Optional[str] = None
+    ) -> int:
+        """Exports one session.
+
+        Args:
+            goal: The goal of the session.
+            steps: The session's steps in order, consumed one at a time.
+            session_id: Unique id of the session. If None, a random one is used.
+
+        Returns:
+            Number of steps exported.
+        """
+        writer = self._shard_writer()
+        writer.begin(session_id or uuid.uuid4().hex, goal)
+
+        count = 0
+        try:
+            for step in steps:
+                writer.append(step)
+                count += 1
+        except BaseException:
+            writer.discard()
+            raise
+        writer.end()
+
+        self.sessions_exported += 1
+        self.steps_exported += count
+        self._sessions_in_shard += 1
+        if self._sessions_in_shard >= self.shard_size:
+            self.flush()
+        return count
+
+    def export_agent(
+        self, agent: BrowserAgent, session_id: Optional[str] = None
+    ) -> Optional[int]:
+        """Exports the history of a BrowserAgent session.
+
+        The success or failure step that ended the session is exported last, as
+        it is in a recording of the session.
+
+        Returns:
+            Number of steps exported, or None if the session was skipped.
+        """
+        if self.successful_only and agent.status != BrowserGoalState.SUCCESS:
+            return None
+        steps = agent.history
+        if agent.final_step is not None:
+            steps = [*steps, agent.final_step]
+        return self.export(agent.goal, steps, session_id)
+
+    def export_recording(
+        self, directory: str, goal: str, session_id: Optional[str] = None
+    ) -> int:
+        """Exports a session recorded by SessionRecorder, streaming it from disk.
+
+        Args:
+            directory: Directory of the recorded session.
+            goal: The goal of the session, which is not part of the recording.
+            session_id: Unique id of the session. If None, the directory name.
+        """
+        session_id = session_id or os.path.basename(os.path.normpath(directory))
+        return self.export(goal, load_session(directory), session_id)
+
+    def flush(self) -> None:
+        """Completes the open shard, making its sessions visible to readers."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        self._next_shard += 1
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "SessionExporter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
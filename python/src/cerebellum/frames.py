@@ -0,0 +1,113 @@
+"""Screenshot comparison helpers.
+
+This module reduces screenshots to small grayscale fingerprints that can be compared
+cheaply, and provides a settle helper that waits until consecutive frames stop
+changing.
+"""
+
+import base64
+import io
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+FINGERPRINT_SIZE = (64, 40)
+
+
+def frame_fingerprint(screenshot: str) -> bytes:
+    """Reduces a base64 screenshot to a small grayscale thumbnail.
+
+    Args:
+        screenshot: Base64 encoded PNG or JPEG screenshot.
+
+    Returns:
+        Raw 8-bit grayscale pixels of a FINGERPRINT_SIZE thumbnail.
+    """
+    with Image.open(io.BytesIO(base64.b64decode(screenshot))) as img:
+        img.draft("L", FINGERPRINT_SIZE)  # Cheap JPEG downscale while decoding
+        thumbnail = img.convert("L").resize(FINGERPRINT_SIZE, Image.Resampling.BOX)
+        return thumbnail.tobytes()
+
+
+def fingerprint_difference(a: bytes, b: bytes) -> float:
+    """Computes the mean absolute pixel difference of two fingerprints.
+
+    Args:
+        a: Fingerprint returned by frame_fingerprint.
+        b: Fingerprint returned by frame_fingerprint.
+
+    Returns:
+        Difference between 0.0 (identical) and 1.0 (inverted).
+
+    Raises:
+        ValueError: If the fingerprints have different sizes.
+    """
+    if len(a) != len(b):
+        raise ValueError("Fingerprints have different sizes")
+
+    pixels_a = np.frombuffer(a, dtype=np.uint8).astype(np.int16)
+    pixels_b = np.frombuffer(b, dtype=np.uint8).astype(np.int16)
+    return float(np.abs(pixels_a - pixels_b).mean() / 255)
+
+
+def frame_difference(a: str, b: str) -> float:
+    """Computes the difference between two base64 screenshots.
+
+    Screenshots of different sizes are compared on their fingerprints.
+
+    Returns:
+        Difference between 0.0 (identical) and 1.0 (inverted).
+    """
+    if a == b:
+        return 0.0
+    return fingerprint_difference(frame_fingerprint(a), frame_fingerprint(b))
+
+
+@dataclass(frozen=True)
+class SettleOptions:
+    """Configuration for waiting until the page stops changing.
+
+    Args:
+        threshold: Largest fingerprint difference between consecutive frames that
+            still counts as settled.
+        interval_ms: Delay between frame captures.
+        timeout_ms: Maximum time to wait before returning the latest frame.
+    """
+
+    threshold: float = 0.002
+    interval_ms: int = 100
+    timeout_ms: int = 5000
+
+
+def wait_for_settle(
+    capture: Callable[[], str], options: Optional[SettleOptions] = None
+) -> str:
+    """Captures frames until two consecutive frames match.
+
+    Args:
+        capture: Function returning a base64 screenshot of the page.
+        options: Settle thresholds and timings. If None, uses defaults.
+
+    Returns:
+        The last captured screenshot, settled or not.
+    """
+    options = options or SettleOptions()
+    deadline = time.monotonic() + options.timeout_ms / 1000
+    screenshot = capture()
+    fingerprint = frame_fingerprint(screenshot)
+
+    while time.monotonic() < deadline:
+        time.sleep(options.interval_ms / 1000)
+        next_screenshot = capture()
+        next_fingerprint = frame_fingerprint(next_screenshot)
+        settled = fingerprint_difference(fingerprint, next_fingerprint)
+        screenshot, fingerprint = next_screenshot, next_fingerprint
+
+        if settled <= options.threshold:
+            break
+
+    return screenshot
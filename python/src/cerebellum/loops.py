@@ -0,0 +1,201 @@
+"""Loop and stall detection for browser automation runs.
+
+This module provides the LoopDetector class which looks at the recent history of
+a BrowserAgent before each planner call and recognises three ways a session gets
+stuck:
+
+    repeat     The same action was taken several times on an unchanged page.
+    oscillate  Scrolling alternated between down and up.
+    stall      Neither the URL nor the page changed for several steps.
+
+Pages are compared on the small fingerprints of frames.py, so a check costs a
+thumbnail per new screenshot. Each detection triggers the next of the configured
+responses, and only steps taken after a response count towards the next one.
+BrowserAgent resets the detector when it is given one, so a detector can be reused
+across sessions.
+
+Typical usage example:
+
+    detector = LoopDetector(
+        responses=[LoopResponse.HINT, LoopResponse.ESCALATE, LoopResponse.FAIL],
+        escalation_planner=stronger_planner,
+    )
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(loop_detector=detector))
+    agent.start()
+    print(detector.detections)
+"""
+
+from collections.abc import Sequence
+from enum import Enum
+from typing import Optional
+
+from cerebellum.browser import (
+    ActionPlanner,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+)
+from cerebellum.frames import fingerprint_difference, frame_fingerprint
+
+# Fingerprints kept for screenshots seen recently
+FINGERPRINT_CACHE_SIZE = 64
+
+LOOP_HINT = (
+    "Your recent actions are not making progress: you {reason}. Do not repeat "
+    "them. Try a different element, a keyboard shortcut or another part of the "
+    "page, or call stop_browsing if the goal cannot be reached."
+)
+
+
+class LoopResponse(str, Enum):
+    """What the agent does when a loop is detected.
+
+    Attributes:
+        HINT: Add a corrective hint to the additional instructions
+        ESCALATE: Hand planning over to the escalation planner
+        FAIL: Stop the session as failed, with the loop as the reason
+    """
+
+    HINT = "hint"
+    ESCALATE = "escalate"
+    FAIL = "fail"
+
+
+class LoopDetector:
+    """Detects repeated actions, scroll oscillation and stalled pages.
+
+    Args:
+        responses: Responses to successive detections. The last one is repeated
+            for any further detections.
+        escalation_planner: Planner used by the ESCALATE response. Without one,
+            ESCALATE fails the session.
+        repeats: Identical actions on an unchanged page that count as a loop.
+        oscillations: Alternating scroll actions that count as a loop.
+        stall_steps: Steps without a URL or page change that count as a stall.
+        change_threshold: Largest fingerprint difference between frames that
+            still counts as unchanged.
+
+    Attributes:
+        detections: Reason of every detection since the last reset.
+    """
+
+    def __init__(
+        self,
+        responses: Sequence[LoopResponse] = (LoopResponse.HINT, LoopResponse.FAIL),
+        escalation_planner: Optional[ActionPlanner] = None,
+        repeats: int = 3,
+        oscillations: int = 4,
+        stall_steps: int = 6,
+        change_threshold: float = 0.002,
+    ) -> None:
+        if not responses:
+            raise ValueError("At least one response is required")
+        self.responses = list(responses)
+        self.escalation_planner = escalation_planner
+        self.repeats = repeats
+        self.oscillations = oscillations
+        self.stall_steps = stall_steps
+        self.change_threshold = change_threshold
+        self.detections: list[str] = []
+        self._since = 0
+        # Keyed by the hash of the screenshot, which str caches, so the cache does
+        # not keep the screenshots themselves alive
+        self._fingerprints: dict[int, bytes] = {}
+
+    def reset(self) -> None:
+        """Forgets the detections and steps of the previous session."""
+        self.detections = []
+        self._since = 0
+        self._fingerprints.clear()
+
+    def _fingerprint(self, screenshot: str) -> bytes:
+        key = hash(screenshot)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            if len(self._fingerprints) >= FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.clear()
+            fingerprint = frame_fingerprint(screenshot)
+            self._fingerprints[key] = fingerprint
+        return fingerprint
+
+    def _unchanged(self, states: list[BrowserState]) -> bool:
+        """Whether every state shows the same URL and page as the last one."""
+        last = states[-1]
+        last_fingerprint = self._fingerprint(last.screenshot)
+        return all(
+            state.active_url == last.active_url
+            and (
+                state.screenshot == last.screenshot
+                or fingerprint_difference(
+                    self._fingerprint(state.screenshot), last_fingerprint
+                )
+                <= self.change_threshold
+            )
+            for state in states[:-1]
+        )
+
+    def check(
+        self, history: list[BrowserStep], current_state: BrowserState
+    ) -> Optional[str]:
+        """Looks for a loop in the steps taken since the last response.
+
+        Args:
+            history: Steps of the session so far.
+            current_state: State after the last step.
+
+        Returns:
+            The reason, phrased to follow "you", or None if no loop was found.
+        """
+        steps = history[self._since :]
+
+        if self.repeats and len(steps) >= self.repeats:
+            recent = steps[-self.repeats :]
+            action = recent[0].action
+            if all(
+                step.action.action == action.action
+                and step.action.coordinate == action.coordinate
+                and step.action.text == action.text
+                for step in recent
+            ) and self._unchanged([step.state for step in recent] + [current_state]):
+                return (
+                    f"repeated the {action.action.value} action {self.repeats} "
+                    "times without changing the page"
+                )
+
+        if self.oscillations and len(steps) >= self.oscillations:
+            scrolls = [step.action.action for step in steps[-self.oscillations :]]
+            if all(
+                {a, b} == {BrowserActionType.SCROLL_DOWN, BrowserActionType.SCROLL_UP}
+                for a, b in zip(scrolls, scrolls[1:])
+            ):
+                return f"scrolled down and up {self.oscillations} times in a row"
+
+        if self.stall_steps and len(steps) >= self.stall_steps:
+            recent = steps[-self.stall_steps :]
+            if self._unchanged([step.state for step in recent] + [current_state]):
+                return f"took {self.stall_steps} steps without changing the page"
+
+        return None
+
+    def respond(self, history: list[BrowserStep], reason: str) -> LoopResponse:
+        """Records a detection and picks its response.
+
+        Args:
+            history: Steps of the session so far.
+            reason: Reason returned by check.
+
+        Returns:
+            The response for this detection.
+        """
+        response = self.responses[min(len(self.detections), len(self.responses) - 1)]
+        self.detections.append(reason)
+        self._since = len(history)
+
+        if response == LoopResponse.ESCALATE and self.escalation_planner is None:
+            return LoopResponse.FAIL
+        return response
+
+    def hint(self, reason: str) -> str:
+        """Corrective instruction for the planner."""
+        return LOOP_HINT.format(reason=reason)
@@ -0,0 +1,184 @@
+"""Parallel conversion of Multimodal-Mind2Web into cerebellum training data.
+
+The dataset is streamed with screenshots left encoded and grouped into tasks as it
+is read. Each task is then sent to a worker process, which decodes the page
+screenshot, simulates the viewport with decompose_task and encodes the crops, so
+all JPEG work runs on every core. Only a bounded number of tasks are in flight at
+once, which keeps memory flat however large the split is.
+
+Converted tasks are written in dataset order to numbered trajectory shards of
+shard_size tasks each, see cerebellum.trajectories. The workers also prepare the
+training image of every step, so the main process only appends bytes. A shard is
+only visible once complete, so a rerun skips it.
+
+Typical usage example:
+
+    python -m cerebellum.mind2web.convert --dataset osunlp/Multimodal-Mind2Web \\
+        --split train --output-dir mind2web --workers 16
+
+    examples = TrajectoryExamples(["mind2web/shard-00000"])
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from cerebellum.browser import BrowserStep
+from cerebellum.mind2web.tasks import Task, decompose_task, group_tasks, load_rows
+from cerebellum.trajectories import (
+    TrainingImageOptions,
+    TrajectoryWriter,
+    prepare_screenshot,
+    shard_complete,
+    strip_screenshot,
+)
+
+SHARD_SIZE = 100
+
+ConvertedSteps = list[tuple[BrowserStep, bytes]]
+
+
+def shard_prefix(output_dir: str, index: int) -> str:
+    return os.path.join(output_dir, f"shard-{index:05d}")
+
+
+def convert_task(
+    task: Task, image_options: Optional[TrainingImageOptions]
+) -> ConvertedSteps:
+    """Converts a task into steps paired with their training images.
+
+    Runs in the worker processes. The steps are returned without their base64
+    screenshots, which the images replace.
+    """
+    steps = []
+    for expected in decompose_task(task):
+        step = expected.step
+        steps.append(
+            (strip_screenshot(step), prepare_screenshot(step.state, image_options))
+        )
+    return steps
+
+
+@dataclass
+class ConversionStats:
+    """Counters of a conversion run."""
+
+    tasks_converted: int = 0
+    tasks_skipped: int = 0
+    steps_written: int = 0
+    shards_written: int = 0
+
+
+def convert(
+    tasks: Iterable[Task],
+    output_dir: str,
+    shard_size: int = SHARD_SIZE,
+    workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    image_options: Optional[TrainingImageOptions] = None,
+) -> ConversionStats:
+    """Converts tasks into trajectory shards on a process pool.
+
+    Args:
+        tasks: Tasks in dataset order, e.g. from group_tasks.
+        output_dir: Directory the shards are written to.
+        shard_size: Number of tasks per shard.
+        workers: Number of worker processes. If None, uses one per CPU.
+        max_in_flight: Tasks submitted but not yet written. If None, uses twice
+            the number of workers.
+        image_options: How the training images are prepared. If None, uses
+            defaults.
+
+    Returns:
+        Counters of the run. Tasks in shards that already existed are counted as
+        skipped without being converted.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = ConversionStats()
+    writer: Optional[TrajectoryWriter] = None
+    writer_shard = -1
+
+    workers = workers or os.cpu_count() or 1
+    limit = max_in_flight or 2 * workers
+
+    def finish_shard() -> None:
+        nonlocal writer
+        if writer is not None:
+            writer.close()
+            writer = None
+            stats.shards_written += 1
+
+    with ProcessPoolExecutor(workers) as executor:
+        in_flight: deque[tuple[int, str, str, Future[ConvertedSteps]]] = deque()
+
+        def write_oldest() -> None:
+            nonlocal writer, writer_shard
+            shard, annotation_id, goal, future = in_flight.popleft()
+            steps = future.result()
+
+            if shard != writer_shard:
+                finish_shard()
+                writer = TrajectoryWriter(shard_prefix(output_dir, shard))
+                writer_shard = shard
+            assert writer is not None
+            writer.write(annotation_id, goal, steps)
+            stats.tasks_converted += 1
+            stats.steps_written += len(steps)
+
+        try:
+            for index, task in enumerate(tasks):
+                shard = index // shard_size
+                if shard_complete(shard_prefix(output_dir, shard)):
+                    stats.tasks_skipped += 1
+                    continue
+
+                # Results are written in submission order to keep shards stable
+                future = executor.submit(convert_task, task, image_options)
+                in_flight.append((shard, task.annotation_id, task.goal, future))
+                if len(in_flight) >= limit:
+                    write_oldest()
+
+            while in_flight:
+                write_oldest()
+            finish_shard()
+        finally:
+            for *_, future in in_flight:
+                future.cancel()
+
+    return stats
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", required=True, help="Local dataset copy")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--workers", type=int, help="Defaults to one per CPU")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+
+    stats = convert(
+        group_tasks(load_rows(args.dataset, args.split)),
+        args.output_dir,
+        shard_size=args.shard_size,
+        workers=args.workers,
+    )
+    print(
+        f"Converted {stats.tasks_converted} tasks into {stats.steps_written} steps "
+        f"across {stats.shards_written} shards, skipped {stats.tasks_skipped} "
+        "already converted tasks"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
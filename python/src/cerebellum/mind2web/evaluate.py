@@ -0,0 +1,428 @@
+"""Offline evaluation of action planners on Multimodal-Mind2Web.
+
+Each task is converted into the steps that perform it with decompose_task and
+replayed to a planner one state at a time. The planner always sees the expected
+history rather than its own earlier predictions (teacher forcing), so every step is
+scored independently and no browser is needed. A prediction is scored on the
+action type, on whether its coordinate hits the target element's bounding box, and
+on the typed text after normalisation.
+
+Tasks run on a thread pool with one planner per worker, since planners keep
+per-instance state such as token counters. Results are appended to a JSONL file as
+tasks finish, and tasks already in the file are skipped, so an interrupted run
+resumes where it stopped.
+
+Typical usage example:
+
+    python -m cerebellum.mind2web.evaluate --dataset ~/data/mind2web \\
+        --split test_task --output results.jsonl --workers 8 --planner anthropic
+
+    python -m cerebellum.mind2web.evaluate --dataset ~/data/mind2web \\
+        --output results.jsonl --planner my_package.planners:create_planner
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from cerebellum.browser import (
+    ActionPlanner,
+    BrowserAction,
+    BrowserActionType,
+    BrowserStep,
+    Coordinate,
+)
+from cerebellum.mind2web.tasks import (
+    Box,
+    ExpectedStep,
+    Task,
+    decompose_task,
+    group_tasks,
+    load_rows,
+)
+from cerebellum.recorder import deserialize_action
+
+PlannerFactory = Callable[[], ActionPlanner]
+
+# Page keys the planner may equally perform with its scroll actions
+SCROLL_KEYS = {
+    "pagedown": BrowserActionType.SCROLL_DOWN,
+    "pageup": BrowserActionType.SCROLL_UP,
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case folds text and collapses whitespace for comparison."""
+    return " ".join((text or "").split()).casefold()
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Normalises a key name so that PAGE_DOWN, Page_Down and pagedown match."""
+    return normalize_text(text).replace("_", "").replace(" ", "")
+
+
+def box_contains(box: Box, point: Coordinate) -> bool:
+    x1, y1, x2, y2 = box
+    return x1 <= point.x <= x2 and y1 <= point.y <= y2
+
+
+@dataclass(frozen=True)
+class StepScore:
+    """Score of one predicted action against the expected one.
+
+    Args:
+        index: Position of the step within its task.
+        expected: The annotated action.
+        predicted: The planner's action, None if the planner raised.
+        action_match: Whether the action types match.
+        target_hit: Whether the predicted pointer position lies in the target
+            element, None for steps without a target.
+        text_match: Whether the typed text or key matches, None for steps without
+            text.
+        latency_s: Wall-clock time of the planner call.
+    """
+
+    index: int
+    expected: BrowserAction
+    predicted: Optional[BrowserAction]
+    action_match: bool
+    target_hit: Optional[bool]
+    text_match: Optional[bool]
+    latency_s: float
+
+    @property
+    def correct(self) -> bool:
+        """Whether the prediction matches on every scored dimension."""
+        return (
+            self.action_match
+            and self.target_hit is not False
+            and self.text_match is not False
+        )
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    """Scores of every step of one task."""
+
+    annotation_id: str
+    goal: str
+    steps: list[StepScore]
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        """Whether every step of the task was predicted correctly."""
+        return self.error is None and all(step.correct for step in self.steps)
+
+
+def score_step(
+    index: int,
+    expected: ExpectedStep,
+    predicted: Optional[BrowserAction],
+    latency_s: float,
+) -> StepScore:
+    """Scores a predicted action against an expected step.
+
+    Args:
+        index: Position of the step within its task.
+        expected: The expected step with its target box.
+        predicted: The planner's action, None if the planner raised.
+        latency_s: Wall-clock time of the planner call.
+    """
+    action = expected.step.action
+    if predicted is None:
+        return StepScore(index, action, None, False, None, None, latency_s)
+
+    scroll = SCROLL_KEYS.get(normalize_key(action.text))
+    if action.action == BrowserActionType.KEY and predicted.action == scroll:
+        return StepScore(index, action, predicted, True, None, True, latency_s)
+
+    target_hit = None
+    if expected.target is not None:
+        # Clicks without a coordinate act at the current mouse position
+        point = predicted.coordinate or expected.step.state.mouse
+        target_hit = box_contains(expected.target, point)
+
+    text_match = None
+    if action.action == BrowserActionType.KEY:
+        text_match = normalize_key(action.text) == normalize_key(predicted.text)
+    elif action.text is not None:
+        text_match = normalize_text(action.text) == normalize_text(predicted.text)
+
+    return StepScore(
+        index,
+        action,
+        predicted,
+        predicted.action == action.action,
+        target_hit,
+        text_match,
+        latency_s,
+    )
+
+
+def evaluate_task(planner: ActionPlanner, task: Task) -> TaskResult:
+    """Replays a task to a planner and scores each of its predictions."""
+    expected_steps = decompose_task(task)
+    history: list[BrowserStep] = []
+    scores: list[StepScore] = []
+
+    for index, expected in enumerate(expected_steps):
+        started = time.perf_counter()
+        try:
+            predicted = planner.plan_action(
+                task.goal, "None", [], expected.step.state, history
+            )
+        except Exception as e:
+            latency_s = time.perf_counter() - started
+            scores.append(score_step(index, expected, None, latency_s))
+            return TaskResult(task.annotation_id, task.goal, scores, repr(e))
+
+        latency_s = time.perf_counter() - started
+        scores.append(score_step(index, expected, predicted, latency_s))
+        history.append(expected.step)
+
+    return TaskResult(task.annotation_id, task.goal, scores)
+
+
+def serialize_result(result: TaskResult) -> dict[str, Any]:
+    data = asdict(result)
+    data["success"] = result.success
+    return data
+
+
+def deserialize_result(data: dict[str, Any]) -> TaskResult:
+    steps = []
+    for step in data["steps"]:
+        predicted = step["predicted"]
+        steps.append(
+            StepScore(
+                index=step["index"],
+                expected=deserialize_action(step["expected"]),
+                predicted=deserialize_action(predicted) if predicted else None,
+                action_match=step["action_match"],
+                target_hit=step["target_hit"],
+                text_match=step["text_match"],
+                latency_s=step["latency_s"],
+            )
+        )
+    return TaskResult(data["annotation_id"], data["goal"], steps, data.get("error"))
+
+
+def load_results(path: str) -> list[TaskResult]:
+    """Reads the task results written so far, ignoring a truncated last line."""
+    if not os.path.exists(path):
+        return []
+
+    results = []
+    with open(path) as f:
+        for line in f:
+            try:
+                results.append(deserialize_result(json.loads(line)))
+            except json.JSONDecodeError:
+                break  # Interrupted while writing the last result
+    return results
+
+
+def truncate_partial_line(path: str) -> None:
+    """Cuts a partially written last line off the results file before appending."""
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+@dataclass(frozen=True)
+class EvaluationSummary:
+    """Aggregate scores and planner timing of an evaluation run.
+
+    Accuracies are over all steps of all tasks in the results file. Throughput
+    only counts the steps evaluated by this run.
+    """
+
+    tasks: int
+    steps: int
+    task_success_rate: float
+    step_accuracy: float
+    action_accuracy: float
+    element_accuracy: float
+    text_accuracy: float
+    errors: int
+    steps_per_sec: float
+    latency_mean_s: float
+    latency_p50_s: float
+    latency_p95_s: float
+
+
+def rate(values: list[Optional[bool]]) -> float:
+    scored = [value for value in values if value is not None]
+    return sum(scored) / len(scored) if scored else 0.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def summarize(
+    results: list[TaskResult], steps_run: int = 0, elapsed_s: float = 0.0
+) -> EvaluationSummary:
+    """Aggregates task results into an EvaluationSummary.
+
+    Args:
+        results: Results of every evaluated task.
+        steps_run: Number of steps evaluated by the current run.
+        elapsed_s: Wall-clock duration of the current run.
+    """
+    steps = [step for result in results for step in result.steps]
+    latencies = [step.latency_s for step in steps]
+
+    return EvaluationSummary(
+        tasks=len(results),
+        steps=len(steps),
+        task_success_rate=rate([result.success for result in results]),
+        step_accuracy=rate([step.correct for step in steps]),
+        action_accuracy=rate([step.action_match for step in steps]),
+        element_accuracy=rate([step.target_hit for step in steps]),
+        text_accuracy=rate([step.text_match for step in steps]),
+        errors=sum(result.error is not None for result in results),
+        steps_per_sec=steps_run / elapsed_s if elapsed_s else 0.0,
+        latency_mean_s=statistics.fmean(latencies) if latencies else 0.0,
+        latency_p50_s=percentile(latencies, 0.5),
+        latency_p95_s=percentile(latencies, 0.95),
+    )
+
+
+def evaluate(
+    tasks: Iterable[Task],
+    planner_factory: PlannerFactory,
+    output_path: str,
+    workers: int = 4,
+    limit: Optional[int] = None,
+) -> EvaluationSummary:
+    """Evaluates planners on tasks in parallel, appending results to a file.
+
+    Tasks whose annotation_id is already in the output file are skipped. At most
+    twice as many tasks as workers are held in memory at once, so tasks can be
+    streamed from a large dataset.
+
+    Args:
+        tasks: Tasks to evaluate, e.g. from group_tasks.
+        planner_factory: Creates the planner of each worker thread.
+        output_path: JSONL file the task results are appended to.
+        workers: Number of tasks evaluated concurrently.
+        limit: Stop after this many tasks, counting those already in the file.
+
+    Returns:
+        Summary over all results in the output file.
+    """
+    truncate_partial_line(output_path)
+    results = load_results(output_path)
+    completed = {result.annotation_id for result in results}
+
+    local = threading.local()
+
+    def run(task: Task) -> TaskResult:
+        if not hasattr(local, "planner"):
+            local.planner = planner_factory()
+        return evaluate_task(local.planner, task)
+
+    def pending() -> Iterator[Task]:
+        remaining = None if limit is None else limit - len(completed)
+        for task in tasks:
+            if remaining is not None and remaining <= 0:
+                return
+            if task.annotation_id in completed:
+                continue
+            if remaining is not None:
+                remaining -= 1
+            yield task
+
+    steps_run = 0
+    started = time.perf_counter()
+    with open(output_path, "a") as output, ThreadPoolExecutor(workers) as executor:
+        in_flight: set[Future[TaskResult]] = set()
+        queue = pending()
+
+        def drain(futures: set[Future[TaskResult]]) -> None:
+            nonlocal steps_run
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                steps_run += len(result.steps)
+                output.write(json.dumps(serialize_result(result)) + "\n")
+                output.flush()
+
+        for task in queue:
+            in_flight.add(executor.submit(run, task))
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+        drain(set(wait(in_flight).done))
+
+    return summarize(results, steps_run, time.perf_counter() - started)
+
+
+def load_planner_factory(spec: str) -> PlannerFactory:
+    """Resolves the --planner argument to a factory.
+
+    Args:
+        spec: "anthropic" for an AnthropicPlanner with default options, or
+            "module:callable" naming a function that returns a planner.
+    """
+    if spec == "anthropic":
+        from cerebellum.planners.anthropic import AnthropicPlanner
+
+        return AnthropicPlanner
+
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Expected 'anthropic' or 'module:callable', got {spec!r}")
+    factory: PlannerFactory = getattr(importlib.import_module(module_name), attribute)
+    return factory
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", required=True, help="Local dataset copy")
+    parser.add_argument("--split", default="test_task")
+    parser.add_argument("--output", required=True, help="Results JSONL file")
+    parser.add_argument("--planner", default="anthropic")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="Number of tasks to evaluate")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # The dataset must already be cached, never download during an evaluation
+    os.environ.setdefault("HF_DATASETS_OFFLINE", "1")
+    args = parse_args(argv)
+
+    summary = evaluate(
+        group_tasks(load_rows(args.dataset, args.split)),
+        load_planner_factory(args.planner),
+        args.output,
+        workers=args.workers,
+        limit=args.limit,
+    )
+    for name, value in asdict(summary).items():
+        formatted = f"{value:.3f}" if isinstance(value, float) else str(value)
+        print(f"{name:<20}{formatted:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Conversion of Multimodal-Mind2Web rows into cerebellum steps.
+
+Mind2Web records one full-page screenshot per annotated action together with the
+target element's bounding box and operation. This module simulates a 16:10 browser
+viewport over that screenshot: Page Up / Page Down steps scroll until the target is
+visible, then the mouse is moved to the element center, clicked, and text is typed
+for TYPE and SELECT operations.
+
+Rows are plain dicts as produced by the datasets library, with the screenshot
+either decoded to a PIL image or left encoded as {"bytes": ...}.
+"""
+
+import base64
+import io
+import json
+import os
+import random
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cerebellum.browser import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+    BrowserTab,
+    Coordinate,
+    ScrollBar,
+)
+from PIL import Image
+
+# x1, y1, x2, y2
+Box = tuple[float, float, float, float]
+
+VIEWPORT_ASPECT_RATIO = 16 / 10
+JPEG_QUALITY = 85
+TOOL_ID_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+
+@dataclass(frozen=True)
+class ExpectedStep:
+    """A converted step with the target element box in viewport coordinates.
+
+    Args:
+        step: The simulated browser state and the annotated action.
+        target: Box of the target element relative to the viewport, for actions
+            that point at it.
+    """
+
+    step: BrowserStep
+    target: Optional[Box] = None
+
+
+@dataclass(frozen=True)
+class Task:
+    """All annotated rows of one Mind2Web task, in order."""
+
+    annotation_id: str
+    goal: str
+    rows: list[dict[str, Any]]
+
+
+def load_rows(dataset: str, split: str) -> Iterable[dict[str, Any]]:
+    """Streams the rows of a locally available copy of Multimodal-Mind2Web.
+
+    Rows are read lazily and screenshots are left encoded, so neither the split
+    nor its images are ever fully loaded into memory.
+
+    Args:
+        dataset: A directory written by Dataset.save_to_disk, a directory of
+            parquet files, or the name of a dataset in the local Hugging Face cache.
+        split: Dataset split, e.g. "train", "test_task" or "test_website".
+    """
+    try:
+        import datasets
+    except ImportError as e:
+        raise ImportError(
+            "Loading Mind2Web requires the datasets package, install cerebellum "
+            "with the mind2web extra"
+        ) from e
+
+    if os.path.exists(os.path.join(dataset, "dataset_info.json")):
+        rows = datasets.load_from_disk(dataset).to_iterable_dataset()
+    else:
+        rows = datasets.load_dataset(dataset, split=split, streaming=True)
+    return rows.cast_column(  # type: ignore[no-any-return]
+        "screenshot", datasets.Image(decode=False)
+    )
+
+
+def group_tasks(rows: Iterable[dict[str, Any]]) -> Iterator[Task]:
+    """Groups consecutive dataset rows into tasks.
+
+    Rows of a task are contiguous in the dataset, so this streams without holding
+    more than one task in memory.
+    """
+    current: Optional[Task] = None
+
+    for row in rows:
+        if current is None or row["annotation_id"] != current.annotation_id:
+            if current is not None:
+                yield current
+            current = Task(
+                annotation_id=row["annotation_id"],
+                goal=row["confirmed_task"],
+                rows=[],
+            )
+        current.rows.append(row)
+
+    if current is not None:
+        yield current
+
+
+def generate_tool_id(rng: random.Random) -> str:
+    """Generates a tool use id in the format of the Anthropic API."""
+    return "toolu_01" + "".join(rng.choice(TOOL_ID_CHARACTERS) for _ in range(22))
+
+
+def load_screenshot(value: Any) -> Image.Image:
+    """Returns the row screenshot as a PIL image, decoding it if needed."""
+    if isinstance(value, Image.Image):
+        return value
+    return Image.open(io.BytesIO(value["bytes"]))
+
+
+def is_in_viewport(viewport: Box, point: tuple[float, float]) -> bool:
+    x1, y1, x2, y2 = viewport
+    x, y = point
+    return x1 <= x <= x2 and y1 <= y <= y2
+
+
+def scroll_viewport(direction: str, viewport: Box, y_max: float) -> Box:
+    """Moves the viewport by three quarters of its height, within the page."""
+    x1, y1, x2, y2 = viewport
+    height = y2 - y1
+    scroll_amount = 0.75 * height
+
+    if direction == "up":
+        new_y1 = max(1, y1 - scroll_amount)
+        new_y2 = new_y1 + height
+    elif direction == "down":
+        new_y2 = min(y_max, y2 + scroll_amount)
+        new_y1 = new_y2 - height
+    else:
+        raise ValueError("Direction must be 'up' or 'down'")
+
+    # Adjust if the new viewport exceeds bounds while preserving height
+    if new_y1 < 1:
+        new_y1 = 1
+        new_y2 = new_y1 + height
+    if new_y2 > y_max:
+        new_y2 = y_max
+        new_y1 = new_y2 - height
+
+    return (x1, new_y1, x2, new_y2)
+
+
+def viewport_screenshot(screenshot: Image.Image, viewport: Box) -> str:
+    """Crops the viewport out of a page screenshot as a base64 JPEG."""
+    x1, y1, x2, y2 = map(int, viewport)
+    cropped_image = screenshot.crop((x1, y1, x2, y2))
+    if cropped_image.mode != "RGB":
+        cropped_image = cropped_image.convert("RGB")
+
+    buffered = io.BytesIO()
+    cropped_image.save(buffered, format="JPEG", quality=JPEG_QUALITY)
+    return base64.b64encode(buffered.getvalue()).decode()
+
+
+def target_box(row: dict[str, Any]) -> Optional[Box]:
+    """Returns the page box of the row's first positive candidate, if any."""
+    if len(row["pos_candidates"]) == 0:
+        return None
+
+    candidate = json.loads(row["pos_candidates"][0])
+    attributes = json.loads(candidate["attributes"])
+    x, y, width, height = map(float, attributes["bounding_box_rect"].split(","))
+    return (x, y, x + width, y + height)
+
+
+def decompose_step(
+    row: dict[str, Any], mouse: Coordinate, rng: Optional[random.Random] = None
+) -> tuple[list[ExpectedStep], Coordinate]:
+    """Converts one annotated row into the browser steps that perform it.
+
+    Args:
+        row: Mind2Web dataset row.
+        mouse: Mouse position before the row's action.
+        rng: Source of tool use ids. Seeded from the row's action_uid if None, so
+            conversions are reproducible.
+
+    Returns:
+        The expected steps, empty if the row has no usable target, and the mouse
+        position after them.
+    """
+    rng = rng or random.Random(row.get("action_uid"))
+    box = target_box(row)
+    if box is None:
+        return [], mouse
+
+    # Initialize the viewport to the top 16:10 ratio part of the screenshot
+    screenshot = load_screenshot(row["screenshot"])
+    width, height = screenshot.size
+    viewport_height = width / VIEWPORT_ASPECT_RATIO
+    viewport: Box = (0, 0, width, viewport_height)
+    y_max = float(height)
+
+    center_x = (box[0] + box[2]) / 2
+    center_y = (box[1] + box[3]) / 2
+    if not (0 <= center_x <= width and 0 <= center_y <= height):
+        return [], mouse
+
+    # Each viewport is cropped and encoded once, however many steps show it
+    crops: dict[Box, str] = {}
+
+    def state_at(viewport: Box, mouse: Coordinate) -> BrowserState:
+        if viewport not in crops:
+            crops[viewport] = viewport_screenshot(screenshot, viewport)
+        return BrowserState(
+            screenshot=crops[viewport],
+            height=int(viewport_height),
+            width=width,
+            scrollbar=ScrollBar(
+                offset=float(viewport[1]) / y_max, height=viewport_height / y_max
+            ),
+            tabs=[
+                BrowserTab(handle="", url="", title="", active=True, new=False, id=0)
+            ],
+            active_tab="",
+            mouse=mouse,
+        )
+
+    def action(
+        action_type: BrowserActionType,
+        reasoning: str,
+        coordinate: Optional[Coordinate] = None,
+        text: Optional[str] = None,
+    ) -> BrowserAction:
+        return BrowserAction(
+            action=action_type,
+            coordinate=coordinate,
+            text=text,
+            reasoning=reasoning,
+            id=generate_tool_id(rng),
+        )
+
+    steps: list[ExpectedStep] = []
+
+    # Scroll the viewport until the center of the bounding box is in view
+    while not is_in_viewport(viewport, (center_x, center_y)):
+        if center_y < viewport[1]:
+            key, direction = "PAGE_UP", "up"
+        else:
+            key, direction = "PAGE_DOWN", "down"
+
+        scroll = action(
+            BrowserActionType.KEY,
+            f"Press the {key.replace('_', ' ').title()} key to scroll {direction}",
+            text=key,
+        )
+        steps.append(ExpectedStep(BrowserStep(state_at(viewport, mouse), scroll)))
+
+        next_viewport = scroll_viewport(direction, viewport, y_max)
+        if next_viewport == viewport:
+            return [], mouse  # Target can never come into view
+        viewport = next_viewport
+
+    # Remap the element to the current viewport
+    relative: Box = (
+        box[0] - viewport[0],
+        box[1] - viewport[1],
+        box[2] - viewport[0],
+        box[3] - viewport[1],
+    )
+    center = Coordinate(x=int(center_x - viewport[0]), y=int(center_y - viewport[1]))
+
+    move = action(
+        BrowserActionType.MOUSE_MOVE,
+        "Move mouse to the center of the element",
+        coordinate=center,
+    )
+    steps.append(ExpectedStep(BrowserStep(state_at(viewport, mouse), move), relative))
+
+    # Pretend now the mouse was moved
+    mouse = center
+    click = action(BrowserActionType.LEFT_CLICK, "Perform a left click on element")
+    steps.append(ExpectedStep(BrowserStep(state_at(viewport, mouse), click), relative))
+
+    operation = json.loads(row["operation"])
+    if operation["op"] in ("TYPE", "SELECT"):
+        type_action = action(
+            BrowserActionType.TYPE,
+            "Typing text set to desired value",
+            text=operation["value"],
+        )
+        steps.append(ExpectedStep(BrowserStep(state_at(viewport, mouse), type_action)))
+
+    return steps, mouse
+
+
+def process_step(
+    row: dict[str, Any], mouse: Coordinate
+) -> tuple[list[BrowserStep], Coordinate]:
+    """Converts one annotated row into browser steps, see decompose_step."""
+    expected, mouse = decompose_step(row, mouse)
+    return [item.step for item in expected], mouse
+
+
+def decompose_task(task: Task) -> list[ExpectedStep]:
+    """Converts every row of a task, carrying the mouse position across rows."""
+    steps: list[ExpectedStep] = []
+    mouse = Coordinate(x=1, y=1)
+    for row in task.rows:
+        expected, mouse = decompose_step(row, mouse)
+        steps += expected
+    return steps
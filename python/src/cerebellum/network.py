@@ -0,0 +1,204 @@
+"""Network request blocking for Chromium pages.
+
+This module provides the RequestBlocker class which keeps resources the planner
+does not need, such as ads, analytics, web fonts and video, from loading. A profile
+that only lists URL patterns is applied with Network.setBlockedURLs. Resource type
+and third-party rules need Fetch interception, where every request is paused and
+either failed or continued.
+
+Third-party requests are detected by comparing the last two labels of the request
+host with those of the top-level page, which is close enough for blocking but does
+not know about public suffixes such as co.uk.
+
+Typical usage example:
+
+    blocker = RequestBlocker(cdp, DEFAULT_BLOCKING_PROFILE)
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(cdp=cdp, request_blocker=blocker))
+    agent.start()
+    print(blocker.stats.blocked_requests)
+"""
+
+import fnmatch
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+from cerebellum.cdp import CDPSession, CDPTransport
+
+
+@dataclass(frozen=True)
+class RequestBlockingProfile:
+    """Rules for requests that are not loaded.
+
+    Args:
+        url_patterns: Wildcard URL patterns, e.g. "*://*.doubleclick.net/*".
+        resource_types: DevTools resource types, e.g. "Font", "Media", "Image".
+        third_party_only: Only block matching requests to other sites than the
+            top-level page.
+    """
+
+    url_patterns: tuple[str, ...] = ()
+    resource_types: frozenset[str] = frozenset()
+    third_party_only: bool = False
+
+    @property
+    def needs_interception(self) -> bool:
+        """Whether the rules go beyond what Network.setBlockedURLs supports."""
+        return bool(self.resource_types) or self.third_party_only
+
+    def blocks(self, url: str, resource_type: str, page_url: str) -> bool:
+        """Decides whether a request is blocked.
+
+        Args:
+            url: Request URL.
+            resource_type: DevTools resource type of the request.
+            page_url: URL of the top-level page.
+        """
+        if resource_type == "Document":
+            return False  # Navigations are never blocked
+        if self.third_party_only and same_site(url, page_url):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.url_patterns)
+
+
+DEFAULT_BLOCKING_PROFILE = RequestBlockingProfile(
+    url_patterns=(
+        "*://*.doubleclick.net/*",
+        "*://*.googlesyndication.com/*",
+        "*://*.google-analytics.com/*",
+        "*://*.googletagmanager.com/*",
+        "*://*.facebook.net/*",
+        "*://*.hotjar.com/*",
+        "*://*.segment.io/*",
+    ),
+    resource_types=frozenset({"Font", "Media"}),
+)
+
+
+def site(url: str) -> str:
+    """Approximates the registrable domain of a URL by its last two host labels."""
+    host = urlsplit(url).hostname or ""
+    return ".".join(host.split(".")[-2:])
+
+
+def same_site(url: str, page_url: str) -> bool:
+    """Whether a request URL belongs to the same site as the page."""
+    return site(url) == site(page_url)
+
+
+@dataclass
+class BlockingStats:
+    """Request counters of a RequestBlocker.
+
+    Blocked requests never reach the network, so their size is unknown. The
+    transferred bytes count what the allowed requests actually loaded.
+    """
+
+    blocked_requests: int = 0
+    allowed_requests: int = 0
+    transferred_bytes: int = 0
+    blocked_by_type: Counter[str] = field(default_factory=Counter)
+
+
+class RequestBlocker:
+    """Applies a RequestBlockingProfile to the pages of a DevTools transport.
+
+    Args:
+        transport: DevTools transport whose pages are filtered.
+        profile: Blocking rules.
+
+    Attributes:
+        stats: Counters across every page the profile was applied to.
+    """
+
+    def __init__(self, transport: CDPTransport, profile: RequestBlockingProfile):
+        self.transport = transport
+        self.profile = profile
+        self.stats = BlockingStats()
+        self._page_urls: dict[str, str] = {}
+        self._applied: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _count(self, blocked: bool, resource_type: str) -> None:
+        with self._lock:
+            if blocked:
+                self.stats.blocked_requests += 1
+                self.stats.blocked_by_type[resource_type] += 1
+            else:
+                self.stats.allowed_requests += 1
+
+    def _on_request_paused(self, session: CDPSession, params: dict[str, Any]) -> None:
+        url = params["request"]["url"]
+        resource_type = params.get("resourceType", "Other")
+        page_url = self._page_urls.get(session.session_id, "")
+
+        blocked = self.profile.blocks(url, resource_type, page_url)
+        self._count(blocked, resource_type)
+
+        # Answer without waiting, this runs on the connection reader thread
+        if blocked:
+            session.connection.send_async(
+                "Fetch.failRequest",
+                {"requestId": params["requestId"], "errorReason": "BlockedByClient"},
+                session.session_id,
+            )
+        else:
+            session.connection.send_async(
+                "Fetch.continueRequest",
+                {"requestId": params["requestId"]},
+                session.session_id,
+            )
+
+    def _on_frame_navigated(self, session: CDPSession, params: dict[str, Any]) -> None:
+        frame = params["frame"]
+        if not frame.get("parentId"):
+            self._page_urls[session.session_id] = frame["url"]
+
+    def _on_loading_failed(self, params: dict[str, Any]) -> None:
+        if params.get("blockedReason") == "inspector":
+            self._count(True, params.get("type", "Other"))
+
+    def _on_loading_finished(self, params: dict[str, Any]) -> None:
+        with self._lock:
+            self.stats.transferred_bytes += int(params.get("encodedDataLength", 0))
+            if not self.profile.needs_interception:
+                self.stats.allowed_requests += 1
+
+    def apply(self) -> None:
+        """Applies the profile to the transport's active page.
+
+        Pages the profile was already applied to are skipped, so this is cheap
+        to call before every observation.
+        """
+        session = self.transport.session
+        if session.session_id in self._applied:
+            return
+        self._applied.add(session.session_id)
+
+        session.on("Network.loadingFinished", self._on_loading_finished)
+        session.send("Network.enable")
+
+        if not self.profile.needs_interception:
+            session.on("Network.loadingFailed", self._on_loading_failed)
+            session.send(
+                "Network.setBlockedURLs", {"urls": list(self.profile.url_patterns)}
+            )
+            return
+
+        session.on(
+            "Page.frameNavigated",
+            lambda params: self._on_frame_navigated(session, params),
+        )
+        session.on(
+            "Fetch.requestPaused",
+            lambda params: self._on_request_paused(session, params),
+        )
+        tree = session.send("Page.getFrameTree")
+        self._page_urls[session.session_id] = tree["frameTree"]["frame"]["url"]
+        session.send("Page.enable")
+        session.send("Fetch.enable", {"patterns": [{"urlPattern": "*"}]})
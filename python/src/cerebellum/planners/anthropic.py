@@ -15,8 +15,10 @@ import base64
 import io
 import json
 import random
+import threading
 from dataclasses import asdict, dataclass
 from datetime import datetime
+from enum import Enum
 from math import floor
 from typing import Any, cast, Optional, Union
 
@@ -35,8 +37,13 @@ from cerebellum.browser import (
     BrowserState,
     BrowserStep,
     Coordinate,
+    DomElement,
     ScrollBar,
 )
+from cerebellum.frames import frame_difference
+from cerebellum.planners.hedging import HedgingOptions, RequestHedger
+from cerebellum.planners.tokens import estimate_image_tokens, estimate_request_tokens
+from cerebellum.tracing import NoopTracer, Tracer
 from PIL import Image
 
 
@@ -53,12 +60,105 @@ class MsgOptions:
     mouse_position: bool
     screenshot: bool
     tabs: bool
+    elements: bool = False
+
+
+class ScreenshotMode(str, Enum):
+    """How the current screenshot is sent to the model.
+
+    Attributes:
+        FULL: At the current screenshot size
+        REDUCED: At the smallest screenshot size
+        SKIP: Not at all, the element list describes the page
+    """
+
+    FULL = "full"
+    REDUCED = "reduced"
+    SKIP = "skip"
+
+
+@dataclass(frozen=True)
+class ScreenshotPolicy:
+    """Decides when states with an element list get a cheaper screenshot.
+
+    A full screenshot is always sent for the first step, after a navigation or tab
+    switch, after an action that missed and when the model asks for a screenshot.
+    Otherwise, when the page barely changed, the screenshot is sent at the smallest
+    size, or skipped after typing and key presses.
+
+    Args:
+        change_threshold: Largest frame difference to the previous step that
+            counts as barely changed.
+        max_skipped: Most consecutive requests sent without a screenshot.
+    """
+
+    change_threshold: float = 0.02
+    max_skipped: int = 3
 
 
 # Base64 encoded cursor image
 CURSOR_64 = "iVBORw0KGgoAAAANSUhEUgAAAAoAAAAQCAYAAAAvf+5AAAAAw3pUWHRSYXcgcHJvZmlsZSB0eXBlIGV4aWYAAHjabVBRDsMgCP33FDuC8ijF49i1S3aDHX9YcLFLX+ITeOSJpOPzfqVHBxVOvKwqVSQbuHKlZoFmRzu5ZD55rvX8Uk9Dz2Ql2A1PVaJ/1MvPwK9m0TIZ6TOE7SpUDn/9M4qH0CciC/YwqmEEcqGEQYsvSNV1/sJ25CvUTxqBjzGJU86rbW9f7B0QHSjIxoD6AOiHE1oXjAlqjQVyxmTMkJjEFnK3p4H0BSRiWUv/cuYLAAABhWlDQ1BJQ0MgcHJvZmlsZQAAeJx9kT1Iw0AYht+2SqVUHCwo0iFD1cWCqIijVqEIFUKt0KqDyaV/0KQhSXFxFFwLDv4sVh1cnHV1cBUEwR8QZwcnRRcp8buk0CLGg7t7eO97X+6+A/yNClPNrnFA1SwjnUwI2dyqEHxFCFEM0DoqMVOfE8UUPMfXPXx8v4vzLO+6P0evkjcZ4BOIZ5luWMQbxNObls55nzjCSpJCfE48ZtAFiR+5Lrv8xrnosJ9nRoxMep44QiwUO1juYFYyVOIp4piiapTvz7qscN7irFZqrHVP/sJwXltZ5jrNKJJYxBJECJBRQxkVWIjTrpFiIk3nCQ//kOMXySWTqwxGjgVUoUJy/OB/8Lu3ZmFywk0KJ4DuF9v+GAaCu0Czbtvfx7bdPAECz8CV1vZXG8DMJ+n1thY7Avq2gYvrtibvAZc7wOCTLhmSIwVo+gsF4P2MvikH9N8CoTW3b61znD4AGepV6gY4OARGipS97vHuns6+/VvT6t8Ph1lyr0hzlCAAAA14aVRYdFhNTDpjb20uYWRvYmUueG1wAAAAAAA8P3hwYWNrZXQgYmVnaW49Iu+7vyIgaWQ9Ilc1TTBNcENlaGlIenJlU3pOVGN6a2M5ZCI/Pgo8eDp4bXBtZXRhIHhtbG5zOng9ImFkb2JlOm5zOm1ldGEvIiB4OnhtcHRrPSJYTVAgQ29yZSA0LjQuMC1FeGl2MiI+CiA8cmRmOlJERiB4bWxuczpyZGY9Imh0dHA6Ly93d3cudzMub3JnLzE5OTkvMDIvMjItcmRmLXN5bnRheC1ucyMiPgogIDxyZGY6RGVzY3JpcHRpb24gcmRmOmFib3V0PSIiCiAgICB4bWxuczp4bXBNTT0iaHR0cDovL25zLmFkb2JlLmNvbS94YXAvMS4wL21tLyIKICAgIHhtbG5zOnN0RXZ0PSJodHRwOi8vbnMuYWRvYmUuY29tL3hhcC8xLjAvc1R5cGUvUmVzb3VyY2VFdmVudCMiCiAgICB4bWxuczpkYz0iaHR0cDovL3B1cmwub3JnL2RjL2VsZW1lbnRzLzEuMS8iCiAgICB4bWxuczpHSU1QPSJodHRwOi8vd3d3LmdpbXAub3JnL3htcC8iCiAgICB4bWxuczp0aWZmPSJodHRwOi8vbnMuYWRvYmUuY29tL3RpZmYvMS4wLyIKICAgIHhtbG5zOnhtcD0iaHR0cDovL25zLmFkb2JlLmNvbS94YXAvMS4wLyIKICAgeG1wTU06RG9jdW1lbnRJRD0iZ2ltcDpkb2NpZDpnaW1wOjFiYzFkZjE3LWM5YmMtNGYzZi1hMmEzLTlmODkyNWNiZjY4OSIKICAgeG1wTU06SW5zdGFuY2VJRD0ieG1wLmlpZDo4YTUyMWJhMC00YmNlLTQzZWEtYjgyYS04ZGM2MTBjYmZlOTgiCiAgIHhtcE1NOk9yaWdpbmFsRG9jdW1lbnRJRD0ieG1wLmRpZDplODQ3ZjUxNC00MWVlLTQ2ZjYtOTllNC1kNjI3MjMxMjhlZTIiCiAgIGRjOkZvcm1hdD0iaW1hZ2UvcG5nIgogICBHSU1QOkFQST0iMi4wIgogICBHSU1QOlBsYXRmb3JtPSJMaW51eCIKICAgR0lNUDpUaW1lU3RhbXA9IjE3MzAxNTc3NjY5MTI3ODciCiAgIEdJTVA6VmVyc2lvbj0iMi4xMC4zOCIKICAgdGlmZjpPcmllbnRhdGlvbj0iMSIKICAgeG1wOkNyZWF0b3JUb29sPSJHSU1QIDIuMTAiCiAgIHhtcDpNZXRhZGF0YURhdGU9IjIwMjQ6MTA6MjhUMTY6MjI6NDYtMDc6MDAiCiAgIHhtcDpNb2RpZnlEYXRlPSIyMDI0OjEwOjI4VDE2OjIyOjQ2LTA3OjAwIj4KICAgPHhtcE1NOkhpc3Rvcnk+CiAgICA8cmRmOlNlcT4KICAgICA8cmRmOmxpCiAgICAgIHN0RXZ0OmFjdGlvbj0ic2F2ZWQiCiAgICAgIHN0RXZ0OmNoYW5nZWQ9Ii8iCiAgICAgIHN0RXZ0Omluc3RhbmNlSUQ9InhtcC5paWQ6ZTVjOTM2ZDYtYjMzYi00NzM4LTlhNWUtYjM3YTA5MzdjZDAxIgogICAgICBzdEV2dDpzb2Z0d2FyZUFnZW50PSJHaW1wIDIuMTAgKExpbnV4KSIKICAgICAgc3RFdnQ6d2hlbj0iMjAyNC0xMC0yOFQxNjoyMjo0Ni0wNzowMCIvPgogICAgPC9yZGY6U2VxPgogICA8L3htcE1NOkhpc3Rvcnk+CiAgPC9yZGY6RGVzY3JpcHRpb24+CiA8L3JkZjpSREY+CjwveDp4bXBtZXRhPgogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgIAogICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgCiAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAgICAKICAgICAgICAgICAgICAgICAgICAgICAgICAgCjw/eHBhY2tldCBlbmQ9InciPz5/5aQ8AAAABmJLR0QAcgByAAAtJLTuAAAACXBIWXMAAABZAAAAWQGqnamGAAAAB3RJTUUH6AocFxYuv5vOJAAAAHhJREFUKM+NzzEOQXEMB+DPYDY5iEVMIpzDfRxC3mZyBK7gChZnELGohaR58f7a7dd8bVq4YaVQgTvWFVjCUcXxA28qcBBHFUcVRwWPPuFfXVsbt0PPnLBL+dKHL+wxxhSPhBcZznuDXYKH1uGzBJ+YtPAZRyy/jTd7qEoydWUQ7QAAAABJRU5ErkJggg=="
 CURSOR_BYTES = base64.b64decode(CURSOR_64)
 
+# Screenshot sizes the planner can send, largest first
+DEFAULT_SCREENSHOT_SIZES = [
+    Coordinate(x=1280, y=800),
+    Coordinate(x=1024, y=640),
+    Coordinate(x=800, y=500),
+    Coordinate(x=640, y=400),
+]
+
+
+def mark_screenshot(
+    img_buffer: bytes, mouse_position: Coordinate, scrollbar: ScrollBar
+) -> bytes:
+    """Adds scrollbar and cursor overlays to a screenshot.
+
+    Args:
+        img_buffer: Raw bytes of the screenshot image
+        mouse_position: Coordinate object containing x,y position of mouse cursor
+        scrollbar: ScrollBar object containing scrollbar dimensions and position
+
+    Returns:
+        Raw bytes of the modified screenshot with overlays added
+
+    Raises:
+        IOError: If there are issues manipulating the image
+    """
+    with Image.open(io.BytesIO(img_buffer)) as img:
+        width, height = img.size
+
+        # Create scrollbar overlay
+        scrollbar_width = 10
+        scrollbar_height = int(height * scrollbar.height)
+        scrollbar_top = int(height * scrollbar.offset)
+
+        # Create gray rectangle for scrollbar
+        # 0.7 opacity = 179 in 8-bit alpha (0.7 * 255 ≈ 179)
+        scrollbar_img = Image.new(
+            "RGBA", (scrollbar_width, scrollbar_height), (128, 128, 128, 179)
+        )
+
+        # Create composite image
+        composite = img.copy()
+        composite.paste(scrollbar_img, (width - scrollbar_width, scrollbar_top))
+
+        # Add cursor
+        cursor_img = Image.open(io.BytesIO(CURSOR_BYTES))
+        composite.paste(
+            cursor_img,
+            (
+                max(0, mouse_position.x - cursor_img.width // 2),
+                max(0, mouse_position.y - cursor_img.height // 2),
+            ),
+            cursor_img,
+        )
+
+        # Convert back to bytes
+        output_buffer = io.BytesIO()
+        composite.save(output_buffer, format="PNG")
+        return output_buffer.getvalue()
+
 
 @dataclass(frozen=True)
 class AnthropicPlannerOptions:
@@ -70,6 +170,14 @@ class AnthropicPlannerOptions:
         api_key: Anthropic API key for authentication.
         client: Pre-configured Anthropic client instance.
         debug_image_path: Path to save debug images.
+        tracer: Tracer receiving spans for the planning sub-phases.
+        input_token_budget: Estimated input tokens allowed per request. The
+            screenshot is downscaled when a request would exceed it.
+        screenshot_sizes: Screenshot sizes to choose from, largest first.
+        screenshot_policy: Sends states that list their elements with a reduced
+            or no screenshot where possible. If None, every screenshot is sent.
+        hedging: Sends a duplicate of requests slower than a percentile of recent
+            latencies. If None, requests are not hedged.
     """
 
     screenshot_history: Optional[int] = None
@@ -77,6 +185,11 @@ class AnthropicPlannerOptions:
     api_key: Optional[str] = None
     client: Optional[Anthropic] = None
     debug_image_path: Optional[str] = None
+    tracer: Optional[Tracer] = None
+    input_token_budget: Optional[int] = None
+    screenshot_sizes: Optional[list[Coordinate]] = None
+    screenshot_policy: Optional[ScreenshotPolicy] = None
+    hedging: Optional[HedgingOptions] = None
 
 
 class AnthropicPlanner(ActionPlanner):
@@ -94,6 +207,16 @@ class AnthropicPlanner(ActionPlanner):
         output_token_usage: Count of tokens used in API responses
         debug_image_path: Optional path to save debug screenshots
         debug: Whether debug mode is enabled
+        tracer: Tracer receiving spans for the planning sub-phases
+        input_token_budget: Estimated input tokens allowed per request
+        screenshot_sizes: Screenshot sizes to choose from, largest first
+        screenshot_size_index: Index of the screenshot size currently in use
+        screenshot_policy: Policy for reduced and skipped screenshots
+        screenshot_mode: How the screenshot of the current request is sent
+        screenshots_skipped: Consecutive requests sent without a screenshot
+        near_budget: Whether a session budget is nearly used up, which limits
+            screenshots to the smallest size
+        hedger: Runs hedged requests, if hedging is enabled
     """
 
     def __init__(self, options: Optional[AnthropicPlannerOptions] = None) -> None:
@@ -128,6 +251,42 @@ class AnthropicPlanner(ActionPlanner):
             options.debug_image_path if options else None
         )
         self.debug: bool = False
+        self.tracer: Tracer = (
+            options.tracer if options and options.tracer else NoopTracer()
+        )
+        self.input_token_budget: Optional[int] = (
+            options.input_token_budget if options else None
+        )
+        self.screenshot_sizes: list[Coordinate] = (
+            options.screenshot_sizes
+            if options and options.screenshot_sizes
+            else DEFAULT_SCREENSHOT_SIZES
+        )
+        self.screenshot_size_index: int = 0
+        self.screenshot_policy: Optional[ScreenshotPolicy] = (
+            options.screenshot_policy if options else None
+        )
+        self.screenshot_mode = ScreenshotMode.FULL
+        self.screenshots_skipped = 0
+        self._screenshot_plan: Optional[tuple[BrowserState, int, ScreenshotMode]] = None
+        self.hedger: Optional[RequestHedger] = (
+            RequestHedger(options.hedging) if options and options.hedging else None
+        )
+        # Abandoned hedged requests report their usage from worker threads
+        self._usage_lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Forgets the screenshot choices made for the previous session."""
+        self.screenshot_mode = ScreenshotMode.FULL
+        self.screenshots_skipped = 0
+        self._screenshot_plan = None
+
+    @property
+    def screenshot_size(self) -> Coordinate:
+        """The bounding size screenshots are currently scaled to for the LLM."""
+        if self.screenshot_mode == ScreenshotMode.REDUCED:
+            return self.screenshot_sizes[-1]
+        return self.screenshot_sizes[self.screenshot_size_index]
 
     def format_system_prompt(
         self, goal: str, additional_context: str, additional_instructions: list[str]
@@ -196,55 +355,11 @@ The user will ask you to perform a task and you should use their browser to do s
     def mark_screenshot(
         self, img_buffer: bytes, mouse_position: Coordinate, scrollbar: ScrollBar
     ) -> bytes:
-        """Adds scrollbar and cursor overlays to a screenshot.
-
-        Args:
-            img_buffer: Raw bytes of the screenshot image
-            mouse_position: Coordinate object containing x,y position of mouse cursor
-            scrollbar: ScrollBar object containing scrollbar dimensions and position
-
-        Returns:
-            Raw bytes of the modified screenshot with overlays added
-
-        Raises:
-            IOError: If there are issues manipulating the image
-        """
-        with Image.open(io.BytesIO(img_buffer)) as img:
-            width, height = img.size
-
-            # Create scrollbar overlay
-            scrollbar_width = 10
-            scrollbar_height = int(height * scrollbar.height)
-            scrollbar_top = int(height * scrollbar.offset)
-
-            # Create gray rectangle for scrollbar
-            # 0.7 opacity = 179 in 8-bit alpha (0.7 * 255 ≈ 179)
-            scrollbar_img = Image.new(
-                "RGBA", (scrollbar_width, scrollbar_height), (128, 128, 128, 179)
-            )
-
-            # Create composite image
-            composite = img.copy()
-            composite.paste(scrollbar_img, (width - scrollbar_width, scrollbar_top))
-
-            # Add cursor
-            cursor_img = Image.open(io.BytesIO(CURSOR_BYTES))
-            composite.paste(
-                cursor_img,
-                (
-                    max(0, mouse_position.x - cursor_img.width // 2),
-                    max(0, mouse_position.y - cursor_img.height // 2),
-                ),
-                cursor_img,
-            )
-
-            # Convert back to bytes
-            output_buffer = io.BytesIO()
-            composite.save(output_buffer, format="PNG")
-            return output_buffer.getvalue()
+        """Adds scrollbar and cursor overlays to a screenshot, see mark_screenshot."""
+        return mark_screenshot(img_buffer, mouse_position, scrollbar)
 
     def resize_screenshot(self, screenshot_buffer: bytes) -> bytes:
-        """Resizes a screenshot to standard dimensions while maintaining aspect ratio.
+        """Resizes a screenshot to fit screenshot_size while maintaining aspect ratio.
 
         Args:
             screenshot_buffer: Raw bytes of the screenshot image
@@ -256,8 +371,8 @@ The user will ask you to perform a task and you should use their browser to do s
             IOError: If there are issues manipulating the image
         """
         with Image.open(io.BytesIO(screenshot_buffer)) as img:
-            target_width = 1280
-            target_height = 800
+            target_width = self.screenshot_size.x
+            target_height = self.screenshot_size.y
 
             # Calculate dimensions that fit within target while maintaining aspect ratio
             img.thumbnail((target_width, target_height), Image.Resampling.LANCZOS)
@@ -276,40 +391,49 @@ The user will ask you to perform a task and you should use their browser to do s
             new_dim: Coordinate object containing target width and height
 
         Returns:
-            Raw bytes of the resized image
+            Raw bytes of the resized image, or the original bytes if the image
+            already has the requested dimensions
 
         Raises:
             IOError: If there are issues manipulating the image
         """
         with Image.open(io.BytesIO(screenshot_buffer)) as img:
+            # Screenshots captured in CSS pixels need no normalisation
+            if img.size == (new_dim.x, new_dim.y):
+                return screenshot_buffer
+
             resized = img.resize((new_dim.x, new_dim.y), Image.Resampling.LANCZOS)
             output_buffer = io.BytesIO()
             resized.save(output_buffer, format="PNG")
             return output_buffer.getvalue()
 
-    def get_scaling_ratio(self, orig_size: Coordinate) -> ScalingRatio:
+    def get_scaling_ratio(
+        self, orig_size: Coordinate, target: Optional[Coordinate] = None
+    ) -> ScalingRatio:
         """Calculates scaling ratios to standardize image dimensions.
 
         This function calculates the scaling ratio to standardize the image dimensions to
-        1280x800 while maintaining the aspect ratio. The ratio is original size / new size.
+        screenshot_size while maintaining the aspect ratio. The ratio is original size / new size.
         To get the new size from the ratio, multiply the original size by the inverse of
         the ratio, or simply divide the original size by the ratio. To go from the new size
         back to the original size, multiply the new size by the ratio.
 
         Args:
             orig_size: Coordinate object containing original width and height
+            target: Bounding size to scale to. If None, uses screenshot_size.
 
         Returns:
             ScalingRatio object containing scale factors and dimensions
         """
         aspect_ratio = orig_size.x / orig_size.y
+        target = target or self.screenshot_size
 
-        if aspect_ratio > 1280 / 800:
-            new_width = 1280
-            new_height = floor(1280 / aspect_ratio)
+        if aspect_ratio > target.x / target.y:
+            new_width = target.x
+            new_height = floor(target.x / aspect_ratio)
         else:
-            new_height = 800
-            new_width = floor(800 * aspect_ratio)
+            new_height = target.y
+            new_width = floor(target.y * aspect_ratio)
 
         width_ratio = orig_size.x / new_width
         height_ratio = orig_size.y / new_height
@@ -392,6 +516,17 @@ The user will ask you to perform a task and you should use their browser to do s
 
             result_text += f"\n\nOpen Browser Tabs: {json.dumps(tabs_as_dicts)}\n\n"
 
+        if options.elements and current_state.elements is not None:
+            img_dim = Coordinate(x=current_state.width, y=current_state.height)
+            result_text += self.format_elements(
+                current_state.elements, self.get_scaling_ratio(img_dim)
+            )
+            if not options.screenshot:
+                result_text += (
+                    "\n\nThe screenshot was omitted since the page barely changed. "
+                    "Take a screenshot if the elements are not enough.\n\n"
+                )
+
         if options.screenshot:
             # result_text += "Here is a screenshot of the browser after the action was performed.\n\n"
             img_buffer = base64.b64decode(current_state.screenshot)
@@ -434,12 +569,43 @@ The user will ask you to perform a task and you should use their browser to do s
             ],
         }
 
+    def format_elements(self, elements: list[DomElement], scaling: ScalingRatio) -> str:
+        """Formats the visible interactive elements as compact text lines.
+
+        Args:
+            elements: Elements captured with the browser state
+            scaling: Scaling ratios from browser to screenshot coordinates
+
+        Returns:
+            One line per element with its role, name, box and value
+        """
+        lines = []
+        for element in elements:
+            top_left = self.browser_to_llm_coordinates(
+                Coordinate(x=element.left, y=element.top), scaling
+            )
+            line = (
+                f"{element.role} {json.dumps(element.name)} "
+                f"[{top_left.x},{top_left.y},"
+                f"{round(element.width / scaling.ratio_x)},"
+                f"{round(element.height / scaling.ratio_y)}]"
+            )
+            if element.value is not None:
+                line += f" value={json.dumps(element.value)}"
+            lines.append(line)
+
+        return (
+            "Visible interactive elements as role, name and [x,y,width,height] in "
+            "screenshot coordinates:\n" + "\n".join(lines) + "\n\n"
+        )
+
     def format_into_messages(
         self,
         goal: str,
         additional_context: str,
         current_state: BrowserState,
         session_history: list[BrowserStep],
+        screenshot: bool = True,
     ) -> list[BetaMessageParam]:
         """Formats a complete conversation history into messages for the LLM.
 
@@ -451,6 +617,8 @@ The user will ask you to perform a task and you should use their browser to do s
             additional_context: Extra context information for the task
             current_state: Current state of the browser
             session_history: List of previous browser steps and actions
+            screenshot: Whether the current screenshot may be included. If False,
+                the messages only hold text, e.g. to estimate their size cheaply.
 
         Returns:
             A list of formatted message objects for the Anthropic API
@@ -526,7 +694,12 @@ Using the supporting contextual data:
         current_state_message = self.format_state_into_msg(
             tool_id,
             current_state,
-            MsgOptions(mouse_position=True, screenshot=True, tabs=True),
+            MsgOptions(
+                mouse_position=True,
+                screenshot=screenshot and self.screenshot_mode != ScreenshotMode.SKIP,
+                tabs=True,
+                elements=True,
+            ),
         )
         messages.append(current_state_message)
 
@@ -819,81 +992,389 @@ Using the supporting contextual data:
         Raises:
             None
         """
-        system_prompt = self.format_system_prompt(
-            goal, additional_context, additional_instructions
-        )
-        messages = self.format_into_messages(
-            goal, additional_context, current_state, session_history
+        with self.tracer.span("plan_action.format_system_prompt"):
+            system_prompt = self.format_system_prompt(
+                goal, additional_context, additional_instructions
+            )
+        self.screenshot_size_index, self.screenshot_mode = self.plan_screenshot(
+            current_state, session_history
         )
+        if self.screenshot_mode == ScreenshotMode.SKIP:
+            self.screenshots_skipped += 1
+        else:
+            self.screenshots_skipped = 0
+
+        with self.tracer.span(
+            "plan_action.format_into_messages", history=len(session_history)
+        ):
+            messages = self.format_into_messages(
+                goal, additional_context, current_state, session_history
+            )
+
+        if (
+            self.input_token_budget is not None
+            and self.screenshot_mode == ScreenshotMode.FULL
+        ):
+            with self.tracer.span("plan_action.fit_token_budget"):
+                if self.fit_token_budget(system_prompt, messages, current_state):
+                    # Coordinates and the screenshot are scaled to the new size
+                    messages = self.format_into_messages(
+                        goal, additional_context, current_state, session_history
+                    )
 
         scaling = self.get_scaling_ratio(
             Coordinate(x=current_state.width, y=current_state.height)
         )
 
-        response = self.client.beta.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            system=system_prompt,
-            max_tokens=1024,
-            tools=[
-                {
-                    "type": "computer_20241022",
-                    "name": "computer",
-                    "display_width_px": current_state.width,
-                    "display_height_px": current_state.height,
-                    "display_number": 1,
-                },
-                {
-                    "name": "switch_tab",
-                    "description": "Call this function to switch the active browser tab to a new one",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            "tab_id": {
-                                "type": "integer",
-                                "description": "The ID of the tab to switch to",
-                            },
-                        },
-                        "required": ["tab_id"],
-                    },
-                },
-                {
-                    "name": "stop_browsing",
-                    "description": "Call this function when you have achieved the goal of the task.",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            "success": {
-                                "type": "boolean",
-                                "description": "Whether the task was successful",
-                            },
-                            "error": {
-                                "type": "string",
-                                "description": "The error message if the task was not successful",
-                            },
-                        },
-                        "required": ["success"],
-                    },
-                },
-            ],
-            # tool_choice = {"type": "any"},
-            messages=messages,
-            betas=["computer-use-2024-10-22"],
-        )
+        tools = self.format_tools(current_state)
+
+        client = self.client
+        if self.request_timeout_s is not None:
+            # A retry would run past the limit, so a timed out request is not retried
+            client = client.with_options(timeout=self.request_timeout_s, max_retries=0)
+
+        def create_message() -> BetaMessage:
+            return client.beta.messages.create(
+                model="claude-3-5-sonnet-20241022",
+                system=system_prompt,
+                max_tokens=1024,
+                tools=tools,
+                # tool_choice = {"type": "any"},
+                messages=messages,
+                betas=["computer-use-2024-10-22"],
+            )
+
+        with self.tracer.span("plan_action.api_request"):
+            if self.hedger:
+                response = self.hedger.call(create_message, self.count_usage)
+            else:
+                response = create_message()
 
         print(
             f"Token usage - Input: {response.usage.input_tokens}, Output: {response.usage.output_tokens}"
         )
-        self.input_token_usage += response.usage.input_tokens
-        self.output_token_usage += response.usage.output_tokens
+        self.count_usage(response)
         print(
             f"Cumulative token usage - Input: {self.input_token_usage}, Output: {self.output_token_usage}, Total: {self.input_token_usage + self.output_token_usage}"
         )
 
-        action = self.parse_action(response, scaling, current_state)
+        with self.tracer.span("plan_action.parse_action"):
+            action = self.parse_action(response, scaling, current_state)
         print(action)
 
         return action
 
+    def estimate_request_tokens(
+        self,
+        system_prompt: str,
+        messages: list[BetaMessageParam],
+        current_state: BrowserState,
+    ) -> int:
+        """Estimates the input tokens of a request without calling the API.
+
+        Args:
+            system_prompt: The formatted system prompt
+            messages: The formatted messages
+            current_state: Current state of the browser, used for the tools
+
+        Returns:
+            Estimated input token count
+        """
+        return estimate_request_tokens(
+            system_prompt, messages, self.format_tools(current_state)
+        )
+
+    def close(self) -> None:
+        """Stops the hedging worker threads. Abandoned requests still finish."""
+        if self.hedger:
+            self.hedger.close()
+
+    def count_usage(self, response: BetaMessage) -> None:
+        """Adds the tokens of a response to the usage counters."""
+        with self._usage_lock:
+            self.input_token_usage += response.usage.input_tokens
+            self.output_token_usage += response.usage.output_tokens
+
+    def estimate_next_request_tokens(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> Optional[int]:
+        """Estimates the input tokens of the next plan_action call.
+
+        The text of the request is formatted without the screenshot, whose cost is
+        estimated from the size plan_action will send it at. No image is rendered.
+
+        Args:
+            goal: The task/goal to accomplish
+            additional_context: Extra context information to help accomplish the goal
+            additional_instructions: List of additional instructions to include
+            current_state: Current state of the browser
+            session_history: List of previous browser actions and their results
+
+        Returns:
+            Estimated input token count
+        """
+        size_index, mode = self.plan_screenshot(current_state, session_history)
+        system_prompt = self.format_system_prompt(
+            goal, additional_context, additional_instructions
+        )
+        messages = self.format_into_messages(
+            goal, additional_context, current_state, session_history, screenshot=False
+        )
+        tokens = self.estimate_request_tokens(system_prompt, messages, current_state)
+        if mode == ScreenshotMode.SKIP:
+            return tokens
+
+        orig_size = Coordinate(x=current_state.width, y=current_state.height)
+        if mode == ScreenshotMode.REDUCED:
+            size_index = len(self.screenshot_sizes) - 1
+        elif self.input_token_budget is not None:
+            size_index = self.fitting_size_index(tokens, orig_size, size_index)
+        return tokens + self.estimate_screenshot_tokens(
+            orig_size, self.screenshot_sizes[size_index]
+        )
+
+    def previous_action_missed(
+        self, current_state: BrowserState, session_history: list[BrowserStep]
+    ) -> bool:
+        """Checks whether the previous action appears to have had no effect.
+
+        A click that left the page unchanged, or a mouse move repeated to the same
+        spot, suggests the model could not see its target clearly.
+
+        Args:
+            current_state: Current state of the browser
+            session_history: List of previous browser steps and actions
+
+        Returns:
+            True if the previous action missed
+        """
+        if not session_history:
+            return False
+
+        last_step = session_history[-1]
+        if last_step.action.action in (
+            BrowserActionType.LEFT_CLICK,
+            BrowserActionType.DOUBLE_CLICK,
+            BrowserActionType.RIGHT_CLICK,
+        ):
+            return (
+                frame_difference(last_step.state.screenshot, current_state.screenshot)
+                < 0.001
+            )
+
+        if last_step.action.action == BrowserActionType.MOUSE_MOVE:
+            return any(
+                step.action.action == BrowserActionType.MOUSE_MOVE
+                and step.action.coordinate == last_step.action.coordinate
+                for step in session_history[-3:-1]
+            )
+
+        return False
+
+    def plan_screenshot(
+        self, current_state: BrowserState, session_history: list[BrowserStep]
+    ) -> tuple[int, ScreenshotMode]:
+        """Chooses how the current screenshot is sent, without changing the planner.
+
+        A missed action steps the screenshot size back up and the screenshot policy
+        picks the mode. Both compare frames, so the choice is cached for the state
+        and estimating a request before planning it does not compare them twice.
+        Without a reduced size or a policy there is nothing to adapt, and frames
+        are not compared.
+
+        Args:
+            current_state: Current state of the browser
+            session_history: List of previous browser steps and actions
+
+        Returns:
+            The screenshot size index and the screenshot mode
+        """
+        cached = self._screenshot_plan
+        if cached is None or cached[0] is not current_state:
+            size_index = self.screenshot_size_index
+            missed = (
+                size_index > 0 or self.screenshot_policy is not None
+            ) and self.previous_action_missed(current_state, session_history)
+            if missed:
+                size_index = max(0, size_index - 1)
+            mode = self.choose_screenshot_mode(current_state, session_history, missed)
+            cached = self._screenshot_plan = (current_state, size_index, mode)
+
+        _, size_index, mode = cached
+        # Applied after the cache, as the budget is checked between the two calls
+        if self.near_budget and mode == ScreenshotMode.FULL:
+            mode = ScreenshotMode.REDUCED
+        return size_index, mode
+
+    def choose_screenshot_mode(
+        self,
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+        missed: bool = False,
+    ) -> ScreenshotMode:
+        """Applies the screenshot policy to the current state.
+
+        Args:
+            current_state: Current state of the browser
+            session_history: List of previous browser steps and actions
+            missed: Whether the previous action missed its target
+
+        Returns:
+            How the current screenshot is sent
+        """
+        policy = self.screenshot_policy
+        if (
+            policy is None
+            or current_state.elements is None
+            or not session_history
+            or missed
+        ):
+            return ScreenshotMode.FULL
+
+        last_step = session_history[-1]
+        if last_step.action.action in (
+            BrowserActionType.SCREENSHOT,
+            BrowserActionType.SWITCH_TAB,
+        ):
+            return ScreenshotMode.FULL
+
+        if (
+            last_step.state.active_url != current_state.active_url
+            or last_step.state.active_tab != current_state.active_tab
+        ):
+            return ScreenshotMode.FULL
+
+        difference = frame_difference(
+            last_step.state.screenshot, current_state.screenshot
+        )
+        if difference > policy.change_threshold:
+            return ScreenshotMode.FULL
+
+        if (
+            last_step.action.action in (BrowserActionType.TYPE, BrowserActionType.KEY)
+            and self.screenshots_skipped < policy.max_skipped
+        ):
+            return ScreenshotMode.SKIP
+        return ScreenshotMode.REDUCED
+
+    def fit_token_budget(
+        self,
+        system_prompt: str,
+        messages: list[BetaMessageParam],
+        current_state: BrowserState,
+    ) -> bool:
+        """Steps screenshot_size down until the request fits the token budget.
+
+        The chosen size is kept for later requests until an action misses.
+
+        Args:
+            system_prompt: The formatted system prompt
+            messages: The formatted messages, ending with the current state
+            current_state: Current state of the browser
+
+        Returns:
+            True if screenshot_size changed and the messages must be rebuilt
+        """
+        estimate = self.estimate_request_tokens(system_prompt, messages, current_state)
+        orig_size = Coordinate(x=current_state.width, y=current_state.height)
+        text_estimate = estimate - self.estimate_screenshot_tokens(
+            orig_size, self.screenshot_size
+        )
+
+        start_index = self.screenshot_size_index
+        self.screenshot_size_index = self.fitting_size_index(
+            text_estimate, orig_size, start_index
+        )
+        return self.screenshot_size_index != start_index
+
+    def fitting_size_index(
+        self, text_tokens: int, orig_size: Coordinate, size_index: int
+    ) -> int:
+        """Steps a screenshot size index down until the request fits the budget.
+
+        Args:
+            text_tokens: Estimated tokens of the request without the screenshot
+            orig_size: Size of the screenshot in the browser
+            size_index: Index of the screenshot size to start from
+
+        Returns:
+            The first index at or after size_index that fits, or the smallest size
+        """
+        assert self.input_token_budget is not None
+        while (
+            text_tokens
+            + self.estimate_screenshot_tokens(
+                orig_size, self.screenshot_sizes[size_index]
+            )
+            > self.input_token_budget
+            and size_index < len(self.screenshot_sizes) - 1
+        ):
+            size_index += 1
+        return size_index
+
+    def estimate_screenshot_tokens(
+        self, orig_size: Coordinate, target: Coordinate
+    ) -> int:
+        """Estimates the tokens of a screenshot scaled to fit target."""
+        new_size = self.get_scaling_ratio(orig_size, target).new_size
+        return estimate_image_tokens(new_size.x, new_size.y)
+
+    def format_tools(self, current_state: BrowserState) -> list[dict[str, Any]]:
+        """Builds the tool definitions sent with each request.
+
+        Args:
+            current_state: Current state of the browser, used for the display size
+
+        Returns:
+            A list of tool definitions for the Anthropic API
+        """
+        return [
+            {
+                "type": "computer_20241022",
+                "name": "computer",
+                "display_width_px": current_state.width,
+                "display_height_px": current_state.height,
+                "display_number": 1,
+            },
+            {
+                "name": "switch_tab",
+                "description": "Call this function to switch the active browser tab to a new one",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "tab_id": {
+                            "type": "integer",
+                            "description": "The ID of the tab to switch to",
+                        },
+                    },
+                    "required": ["tab_id"],
+                },
+            },
+            {
+                "name": "stop_browsing",
+                "description": "Call this function when you have achieved the goal of the task.",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "success": {
+                            "type": "boolean",
+                            "description": "Whether the task was successful",
+                        },
+                        "error": {
+                            "type": "string",
+                            "description": "The error message if the task was not successful",
+                        },
+                    },
+                    "required": ["success"],
+                },
+            },
+        ]
+
     def flatten_browser_step_to_action(self, step: BrowserStep) -> dict[str, Any]:
         if step.action.action == BrowserActionType.SCROLL_DOWN:
             return {"action": "key", "text": "Page_Down"}
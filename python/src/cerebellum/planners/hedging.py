@@ -0,0 +1,230 @@
+"""Hedged requests for planners.
+
+A planner request that has not returned by a high percentile of recent latencies
+is likely stuck behind a slow server. The RequestHedger then sends one duplicate
+request and returns whichever of the two finishes first.
+
+The synchronous Anthropic client cannot abort a request in flight, so the slower
+request is abandoned rather than interrupted: it runs to completion on its worker
+thread and its result is handed to a callback, e.g. to count the tokens it used.
+A process-wide HedgeLimiter caps the abandoned requests in flight, which bounds the
+extra cost however many planners a process runs. Requests that cannot start on a
+free worker at once run on the calling thread without hedging, so requests never
+queue behind abandoned ones.
+
+Typical usage example:
+
+    planner = AnthropicPlanner(AnthropicPlannerOptions(hedging=HedgingOptions()))
+"""
+
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from math import ceil
+from typing import Optional, TypeVar
+
+_T = TypeVar("_T")
+
+
+class LatencyHistogram:
+    """Latencies of the most recent requests.
+
+    Args:
+        window: Number of latencies kept.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> float:
+        """Latency below which the given percentage of recent requests finished.
+
+        Raises:
+            ValueError: If no latency was recorded.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            raise ValueError("No latencies recorded")
+        rank = ceil(percentile / 100 * len(latencies))
+        return latencies[min(max(rank, 1), len(latencies)) - 1]
+
+
+class HedgeLimiter:
+    """Caps the extra requests in flight across the planners sharing it.
+
+    A permit is taken when a duplicate is sent and returned once the slower of
+    the two requests finishes, whichever of them was sent first.
+
+    Args:
+        max_in_flight: Most extra requests running at once.
+    """
+
+    def __init__(self, max_in_flight: int = 4) -> None:
+        self.max_in_flight = max_in_flight
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def try_acquire(self) -> bool:
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+# Shared by every planner of the process that does not set its own limiter
+DEFAULT_HEDGE_LIMITER = HedgeLimiter()
+
+
+@dataclass(frozen=True)
+class HedgingOptions:
+    """Configuration of hedged requests.
+
+    Args:
+        percentile: Percentile of recent latencies after which a duplicate
+            request is sent.
+        min_samples: Latencies recorded before hedging starts.
+        window: Number of recent latencies the percentile is computed over.
+        limiter: Cap on extra requests in flight. If None, uses the cap shared by
+            the whole process.
+        max_workers: Worker threads of each hedger, shared by its requests and the
+            abandoned requests still finishing.
+    """
+
+    percentile: float = 95.0
+    min_samples: int = 20
+    window: int = 200
+    limiter: Optional[HedgeLimiter] = None
+    max_workers: int = 4
+
+
+class RequestHedger:
+    """Runs requests on worker threads and hedges the slow ones.
+
+    Args:
+        options: Hedging configuration. If None, uses defaults.
+
+    Attributes:
+        latencies: Latencies of completed requests, including abandoned ones,
+            measured from the start of the original request.
+        hedges_sent: Number of duplicate requests sent.
+        hedges_won: Number of duplicate requests that finished first.
+    """
+
+    def __init__(self, options: Optional[HedgingOptions] = None) -> None:
+        self.options = options or HedgingOptions()
+        self.limiter = self.options.limiter or DEFAULT_HEDGE_LIMITER
+        self.latencies = LatencyHistogram(self.options.window)
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.options.max_workers, thread_name_prefix="cerebellum-hedge"
+        )
+        self._busy_workers = 0
+        self._lock = threading.Lock()
+        # Frees the workers of a hedger that is dropped without being closed
+        self._finalizer = weakref.finalize(self, self._executor.shutdown, wait=False)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a duplicate is sent, or None while warming up."""
+        if len(self.latencies) < self.options.min_samples:
+            return None
+        return self.latencies.percentile(self.options.percentile)
+
+    def _timed(self, request: Callable[[], _T], started_at: float) -> _T:
+        result = request()
+        self.latencies.record(time.monotonic() - started_at)
+        return result
+
+    def _free_workers(self) -> int:
+        with self._lock:
+            return self.options.max_workers - self._busy_workers
+
+    def _worker_done(self, _: Future[_T]) -> None:
+        with self._lock:
+            self._busy_workers -= 1
+
+    def _submit(self, request: Callable[[], _T], started_at: float) -> Future[_T]:
+        with self._lock:
+            self._busy_workers += 1
+        future = self._executor.submit(self._timed, request, started_at)
+        future.add_done_callback(self._worker_done)
+        return future
+
+    def call(
+        self,
+        request: Callable[[], _T],
+        on_abandoned: Optional[Callable[[_T], None]] = None,
+    ) -> _T:
+        """Runs a request, sending a duplicate if it is slow.
+
+        While warming up, or while abandoned requests leave no room for both
+        copies, the request runs on the calling thread without hedging.
+
+        Args:
+            request: Sends the request and returns its result. Called from worker
+                threads, at most twice.
+            on_abandoned: Receives the result of the slower request once it
+                finishes, if it succeeds.
+
+        Returns:
+            The result of the first request that succeeded.
+
+        Raises:
+            Exception: The error of the original request if both failed.
+        """
+        started_at = time.monotonic()
+        delay = self.hedge_delay()
+        if delay is None or self._free_workers() < 2:
+            return self._timed(request, started_at)
+
+        primary = self._submit(request, started_at)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        if not self._free_workers() or not self.limiter.try_acquire():
+            return primary.result()
+
+        hedge = self._submit(request, started_at)
+        self.hedges_sent += 1
+
+        winner: Optional[Future[_T]] = None
+        pending = {primary, hedge}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in (primary, hedge):
+                if future in done and future.exception() is None:
+                    winner = future
+                    break
+
+        if winner is None:
+            self.limiter.release()
+            return primary.result()  # Raises the original error
+
+        loser = hedge if winner is primary else primary
+        if winner is hedge:
+            self.hedges_won += 1
+        loser.cancel()
+
+        def abandoned(future: Future[_T]) -> None:
+            # The permit covers whichever request is left running
+            self.limiter.release()
+            if on_abandoned and not future.cancelled() and future.exception() is None:
+                on_abandoned(future.result())
+
+        loser.add_done_callback(abandoned)
+        return winner.result()
+
+    def close(self) -> None:
+        """Stops the worker threads once abandoned requests finish."""
+        self._finalizer()
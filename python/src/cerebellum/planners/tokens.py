@@ -0,0 +1,93 @@
+"""Local token cost estimates for Anthropic requests.
+
+The estimates follow Anthropic's published sizing rules: an image costs about
+width * height / 750 tokens and text about one token per four characters. They are
+meant for budgeting before a request is sent, not for billing.
+"""
+
+import base64
+import io
+import json
+from collections.abc import Iterable
+from math import ceil
+from typing import Any
+
+from PIL import Image
+
+CHARS_PER_TOKEN = 4
+PIXELS_PER_IMAGE_TOKEN = 750
+# Fixed cost of the computer use tool definition and its beta system prompt
+COMPUTER_TOOL_TOKENS = 683 + 466
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimates the token count of a text string."""
+    return ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimates the token count of an image from its pixel dimensions."""
+    return ceil(width * height / PIXELS_PER_IMAGE_TOKEN)
+
+
+def image_dimensions(data: str) -> tuple[int, int]:
+    """Reads the pixel dimensions of a base64 encoded image without decoding it."""
+    with Image.open(io.BytesIO(base64.b64decode(data))) as img:
+        return img.size
+
+
+def estimate_content_tokens(content: Any) -> int:
+    """Estimates the token count of message content.
+
+    Args:
+        content: A string or a list of content blocks as sent to the Messages API.
+            Nested tool_result content is included.
+
+    Returns:
+        Estimated token count.
+    """
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+
+    tokens = 0
+    for block in content:
+        block_type = block.get("type")
+        if block_type == "text":
+            tokens += estimate_text_tokens(block["text"])
+        elif block_type == "image":
+            tokens += estimate_image_tokens(*image_dimensions(block["source"]["data"]))
+        elif block_type == "tool_use":
+            tokens += estimate_text_tokens(json.dumps(block["input"]))
+        elif block_type == "tool_result":
+            tokens += estimate_content_tokens(block.get("content", []))
+    return tokens
+
+
+def estimate_request_tokens(
+    system: str,
+    messages: Iterable[Any],
+    tools: Iterable[dict[str, Any]] = (),
+) -> int:
+    """Estimates the input token count of a Messages API request.
+
+    Args:
+        system: System prompt.
+        messages: Messages in Messages API format.
+        tools: Tool definitions. The computer use tool is counted at its fixed
+            documented cost, other tools by the size of their JSON schema.
+
+    Returns:
+        Estimated input token count.
+    """
+    tokens = estimate_text_tokens(system)
+
+    for message in messages:
+        tokens += estimate_content_tokens(message["content"])
+
+    for tool in tools:
+        if str(tool.get("type", "")).startswith("computer_"):
+            tokens += COMPUTER_TOOL_TOKENS
+        else:
+            tokens += estimate_text_tokens(json.dumps(tool))
+
+    return tokens
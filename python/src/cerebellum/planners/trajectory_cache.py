@@ -0,0 +1,409 @@
+"""Trajectory cache planner for repeated goal templates.
+
+This module provides the CachingPlanner class which wraps another ActionPlanner and
+reuses action sequences from earlier successful runs. Runs are keyed on the site
+origin, the goal text and the viewport size; per-run parameters are expected in
+additional_context. Values from a JSON additional_context are replaced by
+placeholders when a trajectory is stored and filled in again on replay, so a cached
+form fill types the parameters of the current run.
+
+While replaying, each live frame is compared to the frame recorded for that step.
+The first mismatch hands control to the wrapped planner for the rest of the run and
+counts as a failure of the cached trajectory. Trajectories are evicted once they
+exceed a maximum age or failure count.
+
+Typical usage example:
+
+    cache = TrajectoryCache("trajectories")
+    planner = CachingPlanner(AnthropicPlanner(), cache)
+    agent = BrowserAgent(driver, planner, "Book a table for {party} people",
+                         BrowserAgentOptions(additional_context={"party": "4"}))
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+from cerebellum.browser import (
+    ActionPlanner,
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+)
+from cerebellum.frames import fingerprint_difference, frame_fingerprint
+from cerebellum.recorder import deserialize_action
+
+
+@dataclass(frozen=True)
+class TrajectoryKey:
+    """Identifies runs that can share a trajectory."""
+
+    origin: str
+    goal: str
+    width: int
+    height: int
+
+    @classmethod
+    def from_state(cls, goal: str, state: BrowserState) -> "TrajectoryKey":
+        """Builds the key for a run starting from the given browser state."""
+        url = next((tab.url for tab in state.tabs if tab.active), "")
+        parts = urlsplit(url)
+        return cls(
+            origin=f"{parts.scheme}://{parts.netloc}",
+            goal=goal,
+            width=state.width,
+            height=state.height,
+        )
+
+    def digest(self) -> str:
+        """Stable file-safe identifier for the key."""
+        return hashlib.sha256(json.dumps(asdict(self)).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedStep:
+    """One cached action and the fingerprint of the frame it was taken on."""
+
+    action: BrowserAction
+    fingerprint: bytes
+
+
+@dataclass
+class Trajectory:
+    """A successful action sequence for a TrajectoryKey."""
+
+    key: TrajectoryKey
+    steps: list[CachedStep]
+    created_at: float = field(default_factory=time.time)
+    failures: int = 0
+
+
+def context_parameters(additional_context: str) -> dict[str, str]:
+    """Extracts scalar parameters from a JSON object additional_context.
+
+    Returns:
+        Parameter names mapped to their string values, or an empty dict if the
+        context is not a JSON object.
+    """
+    try:
+        data = json.loads(additional_context)
+    except ValueError:
+        return {}
+
+    if not isinstance(data, dict):
+        return {}
+    return {
+        key: str(value)
+        for key, value in data.items()
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool)
+    }
+
+
+def templatize_text(text: str, params: dict[str, str]) -> str:
+    """Replaces parameter values in text with {{name}} placeholders."""
+    # Longest values first so a value containing another is replaced whole
+    for name, value in sorted(params.items(), key=lambda item: -len(item[1])):
+        if len(value) > 1:
+            text = text.replace(value, "{{" + name + "}}")
+    return text
+
+
+def render_text(text: str, params: dict[str, str]) -> Optional[str]:
+    """Fills {{name}} placeholders with parameter values.
+
+    Returns:
+        The rendered text, or None if a placeholder has no matching parameter.
+    """
+    for name, value in params.items():
+        text = text.replace("{{" + name + "}}", value)
+    if "{{" in text and "}}" in text:
+        return None
+    return text
+
+
+class TrajectoryCache:
+    """File-backed store of successful trajectories, one JSON file per key.
+
+    Args:
+        directory: Directory holding the cache. Created if missing.
+        max_age_s: Trajectories older than this are evicted.
+        max_failures: Trajectories that diverged this many times are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_age_s: float = 7 * 24 * 60 * 60,
+        max_failures: int = 3,
+    ) -> None:
+        self.directory = directory
+        self.max_age_s = max_age_s
+        self.max_failures = max_failures
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: TrajectoryKey) -> str:
+        return os.path.join(self.directory, key.digest() + ".json")
+
+    def _is_expired(self, trajectory: Trajectory) -> bool:
+        return (
+            time.time() - trajectory.created_at > self.max_age_s
+            or trajectory.failures >= self.max_failures
+        )
+
+    def _load(self, path: str) -> Trajectory:
+        with open(path) as f:
+            data = json.load(f)
+
+        return Trajectory(
+            key=TrajectoryKey(**data["key"]),
+            steps=[
+                CachedStep(
+                    action=deserialize_action(step["action"]),
+                    fingerprint=base64.b64decode(step["fingerprint"]),
+                )
+                for step in data["steps"]
+            ],
+            created_at=data["created_at"],
+            failures=data["failures"],
+        )
+
+    def _save(self, trajectory: Trajectory) -> None:
+        data = {
+            "key": asdict(trajectory.key),
+            "steps": [
+                {
+                    "action": asdict(step.action),
+                    "fingerprint": base64.b64encode(step.fingerprint).decode(),
+                }
+                for step in trajectory.steps
+            ],
+            "created_at": trajectory.created_at,
+            "failures": trajectory.failures,
+        }
+
+        path = self._path(trajectory.key)
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def get(self, key: TrajectoryKey) -> Optional[Trajectory]:
+        """Looks up the trajectory for a key, evicting it if it is expired.
+
+        Returns:
+            The cached trajectory, or None.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        trajectory = self._load(path)
+        if self._is_expired(trajectory):
+            os.remove(path)
+            return None
+        return trajectory
+
+    def put(self, key: TrajectoryKey, steps: list[CachedStep]) -> None:
+        """Stores a successful trajectory, replacing any existing one."""
+        self._save(Trajectory(key=key, steps=steps))
+
+    def record_failure(self, key: TrajectoryKey) -> None:
+        """Counts a divergence against the trajectory for a key."""
+        trajectory = self.get(key)
+        if trajectory is None:
+            return
+
+        trajectory.failures += 1
+        if self._is_expired(trajectory):
+            os.remove(self._path(key))
+        else:
+            self._save(trajectory)
+
+    def evict_expired(self) -> int:
+        """Removes every expired trajectory.
+
+        Returns:
+            The number of trajectories removed.
+        """
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+
+            path = os.path.join(self.directory, name)
+            if self._is_expired(self._load(path)):
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class CachingPlanner(ActionPlanner):
+    """Planner that replays cached trajectories and falls back to another planner.
+
+    Args:
+        planner: Planner used when no trajectory is cached or after divergence.
+        cache: Store of successful trajectories.
+        diff_threshold: Largest frame difference accepted for a cached step.
+
+    Attributes:
+        cache_hits: Number of actions served from the cache.
+        cache_misses: Number of actions delegated to the wrapped planner.
+    """
+
+    def __init__(
+        self,
+        planner: ActionPlanner,
+        cache: TrajectoryCache,
+        diff_threshold: float = 0.05,
+    ) -> None:
+        super().__init__()
+        self.planner = planner
+        self.cache = cache
+        self.diff_threshold = diff_threshold
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._key: Optional[TrajectoryKey] = None
+        self._trajectory: Optional[Trajectory] = None
+        self._fingerprints: list[bytes] = []
+
+    @property
+    def input_token_usage(self) -> int:
+        """Input tokens used by the wrapped planner."""
+        return getattr(self.planner, "input_token_usage", 0)
+
+    @property
+    def output_token_usage(self) -> int:
+        """Output tokens used by the wrapped planner."""
+        return getattr(self.planner, "output_token_usage", 0)
+
+    def estimate_next_request_tokens(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> Optional[int]:
+        """Returns the wrapped planner's estimate, as a cached step may diverge."""
+        return self.planner.estimate_next_request_tokens(
+            goal,
+            additional_context,
+            additional_instructions,
+            current_state,
+            session_history,
+        )
+
+    def set_near_budget(self, near_budget: bool) -> None:
+        self.planner.set_near_budget(near_budget)
+
+    def set_request_timeout(self, timeout_s: Optional[float]) -> None:
+        self.planner.set_request_timeout(timeout_s)
+
+    def reset(self) -> None:
+        self.planner.reset()
+
+    def _start_run(self, goal: str, current_state: BrowserState) -> None:
+        self._key = TrajectoryKey.from_state(goal, current_state)
+        self._trajectory = self.cache.get(self._key)
+        self._fingerprints = []
+
+    def _cached_action(
+        self, step_index: int, fingerprint: bytes, params: dict[str, str]
+    ) -> Optional[BrowserAction]:
+        if self._trajectory is None or step_index >= len(self._trajectory.steps):
+            return None
+
+        cached = self._trajectory.steps[step_index]
+        if fingerprint_difference(fingerprint, cached.fingerprint) <= (
+            self.diff_threshold
+        ):
+            action = cached.action
+            if action.text is None:
+                return action
+
+            text = render_text(action.text, params)
+            if text is not None:
+                return BrowserAction(
+                    action=action.action,
+                    coordinate=action.coordinate,
+                    text=text,
+                    reasoning=action.reasoning,
+                    id=action.id,
+                )
+
+        # Diverged from the cached trajectory, the wrapped planner takes over
+        assert self._key is not None
+        self.cache.record_failure(self._key)
+        self._trajectory = None
+        return None
+
+    def _store(
+        self,
+        session_history: list[BrowserStep],
+        final: BrowserAction,
+        params: dict[str, str],
+    ) -> None:
+        assert self._key is not None
+        actions = [step.action for step in session_history] + [final]
+        steps = [
+            CachedStep(
+                action=BrowserAction(
+                    action=action.action,
+                    coordinate=action.coordinate,
+                    text=templatize_text(action.text, params) if action.text else None,
+                    reasoning=action.reasoning,
+                    id=action.id,
+                ),
+                fingerprint=fingerprint,
+            )
+            for action, fingerprint in zip(actions, self._fingerprints)
+        ]
+        self.cache.put(self._key, steps)
+
+    def plan_action(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> BrowserAction:
+        """Returns the cached action for this step, or asks the wrapped planner.
+
+        A new run is detected by an empty session history. When a run ends in
+        success its full action sequence is stored in the cache.
+        """
+        step_index = len(session_history)
+        if step_index == 0:
+            self._start_run(goal, current_state)
+
+        params = context_parameters(additional_context)
+        fingerprint = frame_fingerprint(current_state.screenshot)
+        del self._fingerprints[step_index:]
+        self._fingerprints.append(fingerprint)
+
+        action = self._cached_action(step_index, fingerprint, params)
+        if action is not None:
+            self.cache_hits += 1
+            return action
+
+        self.cache_misses += 1
+        action = self.planner.plan_action(
+            goal,
+            additional_context,
+            additional_instructions,
+            current_state,
+            session_history,
+        )
+
+        # Only complete runs observed from their first step can be cached
+        complete_run = len(self._fingerprints) == len(session_history) + 1
+        if action.action == BrowserActionType.SUCCESS and complete_run:
+            self._store(session_history, action, params)
+
+        return action
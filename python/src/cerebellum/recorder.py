@@ -0,0 +1,283 @@
+"""Session recording for browser automation runs.
+
+This module provides the SessionRecorder class which streams each BrowserStep of a
+session to disk as it runs. Step metadata is appended to a JSONL log and screenshots
+are stored once in content-addressed files, so repeated frames cost no extra space.
+All disk writes happen on a background thread.
+
+On-disk layout:
+
+    <directory>/steps.jsonl           One JSON object per recorded step
+    <directory>/screenshots/<sha256>  Decoded screenshot bytes (.png or .jpg)
+
+Typical usage example:
+
+    with SessionRecorder("runs/session-1") as recorder:
+        agent = BrowserAgent(driver, planner, goal,
+                             BrowserAgentOptions(recorder=recorder))
+        agent.start()
+
+    for step in load_session("runs/session-1"):
+        print(step.action)
+"""
+
+import base64
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict
+from typing import Any, Optional
+
+from cerebellum.browser import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+    BrowserTab,
+    Coordinate,
+    DomElement,
+    ScrollBar,
+)
+
+STEPS_FILE = "steps.jsonl"
+SCREENSHOTS_DIR = "screenshots"
+
+
+def screenshot_extension(data: bytes) -> str:
+    """Returns the file extension matching the encoded image bytes."""
+    if data.startswith(b"\xff\xd8"):
+        return ".jpg"
+    return ".png"
+
+
+def serialize_step(step: BrowserStep, screenshot_ref: str) -> dict[str, Any]:
+    """Converts a BrowserStep into a JSON serialisable dict.
+
+    Args:
+        step: The step to serialise.
+        screenshot_ref: Value stored in place of the base64 screenshot, e.g. the
+            name of the content-addressed screenshot file.
+
+    Returns:
+        A dict with "state" and "action" entries.
+    """
+    state = asdict(step.state)
+    state["screenshot"] = screenshot_ref
+    return {"state": state, "action": asdict(step.action)}
+
+
+def deserialize_step(data: dict[str, Any], screenshot: str) -> BrowserStep:
+    """Rebuilds a BrowserStep from a dict created by serialize_step.
+
+    Args:
+        data: The serialised step.
+        screenshot: Base64 encoded screenshot to place into the state.
+
+    Returns:
+        The reconstructed BrowserStep.
+    """
+    state = data["state"]
+    elements = state.get("elements")
+
+    return BrowserStep(
+        state=BrowserState(
+            screenshot=screenshot,
+            height=state["height"],
+            width=state["width"],
+            scrollbar=ScrollBar(**state["scrollbar"]),
+            tabs=[BrowserTab(**tab) for tab in state["tabs"]],
+            active_tab=state["active_tab"],
+            mouse=Coordinate(**state["mouse"]),
+            elements=(
+                [DomElement(**element) for element in elements]
+                if elements is not None
+                else None
+            ),
+        ),
+        action=deserialize_action(data["action"]),
+    )
+
+
+def deserialize_action(data: dict[str, Any]) -> BrowserAction:
+    """Rebuilds a BrowserAction from a dict created with dataclasses.asdict.
+
+    Args:
+        data: The serialised action.
+
+    Returns:
+        The reconstructed BrowserAction.
+    """
+    coordinate = data.get("coordinate")
+
+    return BrowserAction(
+        action=BrowserActionType(data["action"]),
+        coordinate=Coordinate(**coordinate) if coordinate else None,
+        text=data.get("text"),
+        reasoning=data.get("reasoning", ""),
+        id=data.get("id", ""),
+    )
+
+
+def write_screenshot(screenshots_dir: str, screenshot: str, known: set[str]) -> str:
+    """Stores a base64 screenshot in a content-addressed file, once.
+
+    Args:
+        screenshots_dir: Directory of the screenshot files.
+        screenshot: Base64 encoded screenshot.
+        known: Names of the files already in the directory. Updated in place.
+
+    Returns:
+        Name of the screenshot file.
+    """
+    data = base64.b64decode(screenshot)
+    name = hashlib.sha256(data).hexdigest() + screenshot_extension(data)
+
+    if name not in known:
+        path = os.path.join(screenshots_dir, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        known.add(name)
+
+    return name
+
+
+def read_screenshot(screenshots_dir: str, name: str) -> str:
+    """Reads a screenshot file written by write_screenshot as base64."""
+    with open(os.path.join(screenshots_dir, name), "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+class SessionRecorder:
+    """Streams browser steps to an append-only log on a background thread.
+
+    Each recorded step is written and flushed to the log before the next one is
+    taken from the queue, so a crash loses at most the step being written.
+
+    Args:
+        directory: Directory for the session log. Created if missing. An existing
+            log in the directory is appended to, after dropping a partial last
+            line.
+
+    Attributes:
+        directory: Directory holding the session log.
+        steps_recorded: Number of complete steps in the log.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._screenshots_dir = os.path.join(directory, SCREENSHOTS_DIR)
+        os.makedirs(self._screenshots_dir, exist_ok=True)
+
+        log_path = os.path.join(directory, STEPS_FILE)
+        self.steps_recorded = 0
+        if os.path.exists(log_path):
+            with open(log_path, "rb+") as f:
+                complete = 0
+                for line in f:
+                    if line.endswith(b"\n"):
+                        self.steps_recorded += 1
+                        complete += len(line)
+                # Drops a partial last line left by a crash, which the next step
+                # would otherwise be appended to
+                f.truncate(complete)
+
+        self._known_screenshots: set[str] = set(os.listdir(self._screenshots_dir))
+        self._log = open(log_path, "a")
+        self._queue: queue.Queue[Optional[BrowserStep]] = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="cerebellum-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, step: BrowserStep) -> None:
+        """Queues a step to be written. Returns without waiting for disk I/O.
+
+        Args:
+            step: The step to record.
+
+        Raises:
+            RuntimeError: If the recorder is closed or the writer thread failed.
+        """
+        if self._closed:
+            raise RuntimeError("SessionRecorder is closed")
+        if self._error:
+            raise RuntimeError("SessionRecorder writer failed") from self._error
+
+        self._queue.put(step)
+
+    def flush(self) -> None:
+        """Blocks until every queued step has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes remaining steps, stops the writer thread and closes the log."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._log.close()
+
+    def __enter__(self) -> "SessionRecorder":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            step = self._queue.get()
+            try:
+                if step is None:
+                    return
+                if self._error is None:
+                    self._write_step(step)
+            except Exception as e:  # Surface on the next record() call
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_step(self, step: BrowserStep) -> None:
+        name = write_screenshot(
+            self._screenshots_dir, step.state.screenshot, self._known_screenshots
+        )
+        entry = serialize_step(step, name)
+        entry["index"] = self.steps_recorded
+        entry["timestamp"] = time.time()
+
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self.steps_recorded += 1
+
+
+def load_session(directory: str) -> Iterator[BrowserStep]:
+    """Reads the steps of a recorded session in order.
+
+    A trailing partial line left by a crash is ignored.
+
+    Args:
+        directory: Directory written by a SessionRecorder.
+
+    Yields:
+        BrowserStep objects with base64 encoded screenshots.
+    """
+    screenshots_dir = os.path.join(directory, SCREENSHOTS_DIR)
+
+    with open(os.path.join(directory, STEPS_FILE)) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+
+            data = json.loads(line)
+            screenshot = read_screenshot(screenshots_dir, data["state"]["screenshot"])
+            yield deserialize_step(data, screenshot)
@@ -0,0 +1,164 @@
+"""Deterministic replay of recorded browser sessions.
+
+This module provides the ReplayRunner class which re-executes the actions of a
+recorded session through BrowserAgent.take_action without calling a planner. Before
+each action the page is allowed to settle and the new frame is compared to the
+recorded one; the first frame that differs by more than the threshold stops the
+replay and is reported as a divergence.
+
+Typical usage example:
+
+    agent = BrowserAgent(driver, planner, goal)
+    result = ReplayRunner(agent).run(load_session("runs/session-1"))
+    if not result.success:
+        print("Diverged at step", result.divergence.step_index)
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cerebellum.browser import (
+    VIEWPORT_SCRIPT,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserState,
+    BrowserStep,
+)
+from cerebellum.frames import SettleOptions, frame_difference, wait_for_settle
+
+FINAL_ACTIONS = (BrowserActionType.SUCCESS, BrowserActionType.FAILURE)
+
+
+@dataclass(frozen=True)
+class ReplayOptions:
+    """Configuration options for replaying a session.
+
+    Args:
+        diff_threshold: Largest difference between the recorded and live frame
+            accepted before an action is replayed.
+        settle: Settle strategy used before each frame is compared.
+    """
+
+    diff_threshold: float = 0.05
+    settle: SettleOptions = field(default_factory=SettleOptions)
+
+
+@dataclass(frozen=True)
+class ReplayDivergence:
+    """The first point where the live page no longer matched the recording."""
+
+    step_index: int
+    difference: float
+    expected: BrowserStep
+    actual: BrowserState
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    """Outcome of a replay run."""
+
+    steps_replayed: int
+    divergence: Optional[ReplayDivergence]
+
+    @property
+    def success(self) -> bool:
+        """Whether every recorded action was replayed without divergence."""
+        return self.divergence is None
+
+
+class ReplayRunner:
+    """Replays recorded actions through a BrowserAgent without a planner.
+
+    Replayed steps are appended to the agent's history with their live state, so
+    a planner can continue the session from where the replay stopped.
+
+    Args:
+        agent: Agent whose driver and tab map execute the actions.
+        options: Replay thresholds. If None, uses defaults.
+    """
+
+    def __init__(
+        self, agent: BrowserAgent, options: Optional[ReplayOptions] = None
+    ) -> None:
+        self.agent = agent
+        self.options = options or ReplayOptions()
+
+    def capture_settled_state(self) -> BrowserState:
+        """Waits for the page to settle and captures its state.
+
+        The last settle frame becomes the state's screenshot, so the page is not
+        captured again.
+        """
+        with self.agent.tracer.span("replay.settle"):
+            viewport = self.agent.execute_script(VIEWPORT_SCRIPT)
+            screenshot = wait_for_settle(
+                lambda: self.agent.capture_screenshot(viewport), self.options.settle
+            )
+        return self.agent.get_state(screenshot)
+
+    def verify_frame(
+        self, index: int, step: BrowserStep
+    ) -> tuple[BrowserState, Optional[ReplayDivergence]]:
+        """Compares the settled live frame to the frame of a recorded step.
+
+        Args:
+            index: Position of the step in the recording.
+            step: The recorded step.
+
+        Returns:
+            The live state, and a ReplayDivergence if the frames did not match.
+        """
+        state = self.capture_settled_state()
+        difference = frame_difference(state.screenshot, step.state.screenshot)
+
+        if difference > self.options.diff_threshold:
+            return state, ReplayDivergence(
+                step_index=index, difference=difference, expected=step, actual=state
+            )
+        return state, None
+
+    def replay_step(self, index: int, step: BrowserStep) -> Optional[ReplayDivergence]:
+        """Verifies the live frame against one recorded step and replays its action.
+
+        Success and failure steps are only verified since they have no browser
+        action.
+
+        Args:
+            index: Position of the step in the recording.
+            step: The recorded step.
+
+        Returns:
+            A ReplayDivergence if the live frame did not match, otherwise None.
+        """
+        state, divergence = self.verify_frame(index, step)
+        if divergence or step.action.action in FINAL_ACTIONS:
+            return divergence
+
+        self.agent.take_action(step.action, state)
+        self.agent.history.append(BrowserStep(state=state, action=step.action))
+        return None
+
+    def run(self, steps: Iterable[BrowserStep]) -> ReplayResult:
+        """Replays recorded steps until the recording ends or diverges.
+
+        Args:
+            steps: Recorded steps in order, e.g. from load_session.
+
+        Returns:
+            A ReplayResult with the number of replayed actions and any divergence.
+        """
+        replayed = 0
+
+        with self.agent.tracer.span("replay"):
+            for index, step in enumerate(steps):
+                with self.agent.tracer.span("replay.step", step=index):
+                    divergence = self.replay_step(index, step)
+
+                if divergence:
+                    return ReplayResult(steps_replayed=replayed, divergence=divergence)
+                if step.action.action in FINAL_ACTIONS:
+                    break
+                replayed += 1
+
+        return ReplayResult(steps_replayed=replayed, divergence=None)
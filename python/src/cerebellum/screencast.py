@@ -0,0 +1,152 @@
+"""Screencast-backed frame buffer for Chromium pages.
+
+This module provides the ScreencastBuffer class which keeps the most recent frames
+pushed by Page.startScreencast in a ring buffer. Observation then reads the newest
+frame instead of requesting a screenshot, waiting only until a frame newer than the
+last action has arrived. Chromium only sends frames when the page repaints, so a
+page that did not change after an action keeps its latest frame, which is returned
+once the wait times out.
+
+Typical usage example:
+
+    cdp = CDPTransport.from_driver(driver)
+    screencast = ScreencastBuffer(cdp)
+    screencast.start()
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(cdp=cdp, screencast=screencast))
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cerebellum.cdp import CDPSession, CDPTransport
+
+
+@dataclass(frozen=True)
+class ScreencastFrame:
+    """One frame pushed by the browser.
+
+    Args:
+        data: Base64 encoded image.
+        received_at: time.monotonic() when the frame arrived.
+        metadata: Page.screencastFrame metadata, e.g. page scale and offsets.
+    """
+
+    data: str
+    received_at: float
+    metadata: dict[str, Any]
+
+
+class ScreencastBuffer:
+    """Ring buffer of the latest screencast frames of the active page.
+
+    Args:
+        transport: DevTools transport of the page to stream.
+        capacity: Number of recent frames kept.
+        image_format: "jpeg" or "png".
+        quality: JPEG quality from 0 to 100.
+        frame_timeout_ms: Longest wait for a frame newer than a given time.
+    """
+
+    def __init__(
+        self,
+        transport: CDPTransport,
+        capacity: int = 8,
+        image_format: str = "jpeg",
+        quality: int = 80,
+        frame_timeout_ms: int = 250,
+    ) -> None:
+        self.transport = transport
+        self.image_format = image_format
+        self.quality = quality
+        self.frame_timeout_ms = frame_timeout_ms
+        self._frames: deque[ScreencastFrame] = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._session: Optional[CDPSession] = None
+        self._target_id: Optional[str] = None
+        self._listening: set[str] = set()
+
+    def _on_frame(self, session: CDPSession, params: dict[str, Any]) -> None:
+        if session is not self._session:
+            return  # Late frame from a page that is no longer streamed
+
+        frame = ScreencastFrame(
+            data=params["data"],
+            received_at=time.monotonic(),
+            metadata=params.get("metadata", {}),
+        )
+        with self._condition:
+            self._frames.append(frame)
+            self._condition.notify_all()
+
+        # Acknowledge without waiting, this runs on the connection reader thread
+        session.connection.send_async(
+            "Page.screencastFrameAck",
+            {"sessionId": params["sessionId"]},
+            session.session_id,
+        )
+
+    def start(self) -> None:
+        """Starts streaming the transport's active page."""
+        session = self.transport.session
+        if session.session_id not in self._listening:
+            session.on(
+                "Page.screencastFrame", lambda params: self._on_frame(session, params)
+            )
+            self._listening.add(session.session_id)
+
+        with self._condition:
+            self._frames.clear()
+            self._session = session
+            self._target_id = self.transport.target_id
+
+        session.send(
+            "Page.startScreencast",
+            {"format": self.image_format, "quality": self.quality},
+        )
+
+    def stop(self) -> None:
+        """Stops streaming. Buffered frames stay readable."""
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        session.send("Page.stopScreencast")
+
+    def latest(self) -> Optional[ScreencastFrame]:
+        """Returns the newest buffered frame, or None before the first frame."""
+        with self._condition:
+            return self._frames[-1] if self._frames else None
+
+    def frames(self) -> list[ScreencastFrame]:
+        """Returns the buffered frames, oldest first."""
+        with self._condition:
+            return list(self._frames)
+
+    def wait_for_frame(self, after: float) -> Optional[ScreencastFrame]:
+        """Waits for a frame that arrived after the given time.
+
+        Follows the transport to another page first if the active tab changed.
+
+        Args:
+            after: time.monotonic() value, e.g. when the last action was taken.
+
+        Returns:
+            The newest frame if one arrived after the given time within
+            frame_timeout_ms, otherwise the newest frame of an unchanged page.
+            None if the page has not sent a frame yet.
+        """
+        if self._session is not None and self._target_id != self.transport.target_id:
+            self.stop()
+            self.start()
+
+        deadline = time.monotonic() + self.frame_timeout_ms / 1000
+        with self._condition:
+            while not self._frames or self._frames[-1].received_at <= after:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._frames[-1] if self._frames else None
@@ -0,0 +1,82 @@
+"""Event-driven tab tracking for Chromium browsers.
+
+This module provides the TabTracker class which subscribes to DevTools target
+discovery and keeps a live table of open pages. Observation reads the table instead
+of switching through every WebDriver window to poll its URL and title. Page target
+ids are the WebDriver window handles on Chromium.
+
+Typical usage example:
+
+    cdp = CDPTransport.from_driver(driver)
+    tracker = TabTracker(cdp.connection)
+    tracker.start()
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(cdp=cdp, tab_tracker=tracker))
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cerebellum.cdp import CDPConnection
+
+TARGET_EVENTS = (
+    "Target.targetCreated",
+    "Target.targetInfoChanged",
+    "Target.targetDestroyed",
+)
+
+
+@dataclass(frozen=True)
+class PageTarget:
+    """An open page as reported by target discovery."""
+
+    handle: str
+    url: str
+    title: str
+
+
+class TabTracker:
+    """Live table of the browser's open pages.
+
+    Args:
+        connection: Browser level DevTools connection.
+    """
+
+    def __init__(self, connection: CDPConnection) -> None:
+        self.connection = connection
+        self._pages: dict[str, PageTarget] = {}  # Insertion ordered by discovery
+        self._lock = threading.Lock()
+
+    def _on_target(self, params: dict[str, Any], session_id: Optional[str]) -> None:
+        if session_id:
+            return  # Only browser level discovery events are tracked
+
+        with self._lock:
+            if "targetId" in params and "targetInfo" not in params:
+                self._pages.pop(params["targetId"], None)
+                return
+
+            info = params["targetInfo"]
+            if info.get("type") != "page":
+                return
+            self._pages[info["targetId"]] = PageTarget(
+                handle=info["targetId"], url=info["url"], title=info["title"]
+            )
+
+    def start(self) -> None:
+        """Subscribes to target events. Existing pages are reported right away."""
+        for event in TARGET_EVENTS:
+            self.connection.on(event, self._on_target)
+        self.connection.send("Target.setDiscoverTargets", {"discover": True})
+
+    def stop(self) -> None:
+        """Unsubscribes from target events."""
+        self.connection.send("Target.setDiscoverTargets", {"discover": False})
+        for event in TARGET_EVENTS:
+            self.connection.off(event, self._on_target)
+
+    def pages(self) -> list[PageTarget]:
+        """Returns the open pages in the order they were discovered."""
+        with self._lock:
+            return list(self._pages.values())
@@ -0,0 +1,206 @@
+"""Snapping of planner coordinates to interactive elements.
+
+This module provides the TargetSnapper class which moves mouse targets that land
+just outside a button, link or field onto it. The elements of each observation are
+captured with DOM_SNAPSHOT_SCRIPT and kept in a uniform grid, so finding the
+nearest target only compares the few elements in the cells around the point.
+
+A point already on an element is left alone. A point within the tolerance of an
+element is moved to the closest point inside it, kept a few pixels from its edge.
+Points further away are left alone as well, since the model may be aiming at
+something that is not an interactive element, such as text to select.
+
+Typical usage example:
+
+    snapper = TargetSnapper()
+    agent = BrowserAgent(driver, planner, goal,
+                         BrowserAgentOptions(target_snapper=snapper))
+    agent.start()
+    print(snapper.stats.snapped, snapper.stats.mean_distance)
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from math import hypot
+from typing import Optional
+
+from cerebellum.browser import BrowserAction, BrowserActionType, Coordinate, DomElement
+
+DEFAULT_TOLERANCE = 24
+DEFAULT_CELL_SIZE = 64
+# Distance kept from the edge of an element when snapping onto it
+EDGE_INSET = 3
+
+
+def distance_to_element(point: Coordinate, element: DomElement) -> float:
+    """Distance from a point to the closest point of an element's box."""
+    dx = max(element.left - point.x, 0, point.x - (element.left + element.width - 1))
+    dy = max(element.top - point.y, 0, point.y - (element.top + element.height - 1))
+    return hypot(dx, dy)
+
+
+def snap_into_element(point: Coordinate, element: DomElement) -> Coordinate:
+    """Closest point inside an element's box, EDGE_INSET pixels from its edge."""
+    inset_x = min(EDGE_INSET, (element.width - 1) // 2)
+    inset_y = min(EDGE_INSET, (element.height - 1) // 2)
+    return Coordinate(
+        x=min(
+            max(point.x, element.left + inset_x),
+            element.left + element.width - 1 - inset_x,
+        ),
+        y=min(
+            max(point.y, element.top + inset_y),
+            element.top + element.height - 1 - inset_y,
+        ),
+    )
+
+
+class TargetIndex:
+    """Uniform grid of element boxes for nearest-element queries.
+
+    Args:
+        elements: Elements of one observation.
+        cell_size: Side of a grid cell in CSS pixels.
+    """
+
+    def __init__(
+        self, elements: list[DomElement], cell_size: int = DEFAULT_CELL_SIZE
+    ) -> None:
+        self.elements = elements
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+
+        for number, element in enumerate(elements):
+            if element.width < 1 or element.height < 1:
+                continue
+            left, top = self._cell(element.left, element.top)
+            right, bottom = self._cell(
+                element.left + element.width - 1, element.top + element.height - 1
+            )
+            for cell_x in range(left, right + 1):
+                for cell_y in range(top, bottom + 1):
+                    self._cells[(cell_x, cell_y)].append(number)
+
+    def _cell(self, x: int, y: int) -> tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def nearest(
+        self, point: Coordinate, tolerance: float
+    ) -> Optional[tuple[DomElement, float]]:
+        """Finds the element closest to a point.
+
+        Of several elements at the same distance, such as nested elements that
+        both contain the point, the smallest is returned.
+
+        Args:
+            point: Point in CSS pixels relative to the viewport.
+            tolerance: Largest distance to an element that is considered.
+
+        Returns:
+            The element and its distance, or None if no element is within the
+            tolerance.
+        """
+        reach = int(tolerance)
+        left, top = self._cell(point.x - reach, point.y - reach)
+        right, bottom = self._cell(point.x + reach, point.y + reach)
+
+        seen: set[int] = set()
+        best: Optional[tuple[float, int, int]] = None
+        for cell_x in range(left, right + 1):
+            for cell_y in range(top, bottom + 1):
+                for number in self._cells.get((cell_x, cell_y), ()):
+                    if number in seen:
+                        continue
+                    seen.add(number)
+                    element = self.elements[number]
+                    distance = distance_to_element(point, element)
+                    if distance > tolerance:
+                        continue
+                    candidate = (distance, element.width * element.height, number)
+                    if best is None or candidate < best:
+                        best = candidate
+
+        if best is None:
+            return None
+        return self.elements[best[2]], best[0]
+
+
+@dataclass
+class SnapStats:
+    """Counters of a TargetSnapper.
+
+    Distances are in CSS pixels and only cover the snapped coordinates.
+    """
+
+    on_target: int = 0
+    snapped: int = 0
+    no_target: int = 0
+    total_distance: float = 0.0
+    max_distance: float = 0.0
+
+    @property
+    def mean_distance(self) -> float:
+        return self.total_distance / self.snapped if self.snapped else 0.0
+
+
+class TargetSnapper:
+    """Snaps mouse move targets onto the nearest interactive element.
+
+    Args:
+        tolerance: Largest distance in CSS pixels a target is moved.
+        cell_size: Side of a grid cell of the element index.
+
+    Attributes:
+        index: Elements of the latest observation.
+        stats: Counters across every action passed to snap.
+        last_distance: Distance the last action passed to snap was moved, 0 if it
+            was already on target, or None if it was not snapped.
+    """
+
+    def __init__(
+        self, tolerance: float = DEFAULT_TOLERANCE, cell_size: int = DEFAULT_CELL_SIZE
+    ) -> None:
+        self.tolerance = tolerance
+        self.cell_size = cell_size
+        self.index: Optional[TargetIndex] = None
+        self.stats = SnapStats()
+        self.last_distance: Optional[float] = None
+
+    def update(self, elements: list[DomElement]) -> None:
+        """Replaces the index with the elements of a new observation."""
+        self.index = TargetIndex(elements, self.cell_size)
+
+    def snap(self, action: BrowserAction) -> BrowserAction:
+        """Returns the action with its mouse target moved onto the nearest element.
+
+        Only mouse moves are snapped. Clicks happen at the mouse position, which an
+        earlier move already snapped.
+        """
+        self.last_distance = None
+        if (
+            action.action != BrowserActionType.MOUSE_MOVE
+            or action.coordinate is None
+            or self.index is None
+        ):
+            return action
+
+        found = self.index.nearest(action.coordinate, self.tolerance)
+        if found is None:
+            self.stats.no_target += 1
+            return action
+
+        element, distance = found
+        if distance == 0:
+            self.stats.on_target += 1
+            self.last_distance = 0.0
+            return action
+
+        coordinate = snap_into_element(action.coordinate, element)
+        distance = hypot(
+            coordinate.x - action.coordinate.x, coordinate.y - action.coordinate.y
+        )
+        self.stats.snapped += 1
+        self.stats.total_distance += distance
+        self.stats.max_distance = max(self.stats.max_distance, distance)
+        self.last_distance = distance
+        return replace(action, coordinate=coordinate)
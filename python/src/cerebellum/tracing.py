@@ -0,0 +1,133 @@
+"""Tracing hooks for the browser automation loop.
+
+This module provides a small tracer interface used by BrowserAgent and the planners
+to record nested spans (session, step, capture/plan/act and planner sub-phases). The
+default tracer does nothing. ChromeTraceTracer keeps spans in memory and writes them
+in the Chrome trace-event format, viewable in about:tracing or Perfetto.
+
+Typical usage example:
+
+    tracer = ChromeTraceTracer("session.trace.json")
+    agent = BrowserAgent(driver, planner, goal, BrowserAgentOptions(tracer=tracer))
+    agent.start()  # Trace file is written when the session ends
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass(frozen=True)
+class Span:
+    """A finished span with timings in microseconds."""
+
+    name: str
+    start_us: float
+    duration_us: float
+    thread_id: int
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer(ABC):
+    """Abstract base class for tracers."""
+
+    @abstractmethod
+    def span(self, name: str, **attributes: Any) -> AbstractContextManager[None]:
+        """Time the enclosed block as a span.
+
+        Spans opened inside another span on the same thread are nested beneath it.
+
+        Args:
+            name: Name of the span, e.g. "step" or "plan_action.api_request".
+            **attributes: Extra JSON serialisable values attached to the span.
+
+        Returns:
+            A context manager wrapping the traced block.
+        """
+        pass
+
+    def flush(self) -> None:  # noqa: B027 Optional hook for buffering tracers
+        """Export any buffered spans. Default implementation does nothing."""
+        pass
+
+
+class NoopTracer(Tracer):
+    """Tracer that records nothing. Used when no tracer is configured."""
+
+    def span(self, name: str, **attributes: Any) -> AbstractContextManager[None]:
+        return nullcontext()
+
+
+class ChromeTraceTracer(Tracer):
+    """Tracer that records spans and exports them as a Chrome trace-event file.
+
+    Args:
+        path: File the trace is written to on flush. If None, spans are only kept
+            in memory and can be read from the spans attribute.
+
+    Attributes:
+        spans: Finished spans in completion order.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end_ns = time.perf_counter_ns()
+            finished = Span(
+                name=name,
+                start_us=start_ns / 1000,
+                duration_us=(end_ns - start_ns) / 1000,
+                thread_id=threading.get_ident(),
+                attributes=attributes,
+            )
+            with self._lock:
+                self.spans.append(finished)
+
+    def to_trace_events(self) -> dict[str, Any]:
+        """Converts recorded spans to a Chrome trace-event JSON object.
+
+        Returns:
+            A dict with a "traceEvents" list of complete ("X") events.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": "cerebellum",
+                    "ph": "X",
+                    "ts": span.start_us,
+                    "dur": span.duration_us,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": span.attributes,
+                }
+                for span in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def flush(self) -> None:
+        """Writes all recorded spans to the configured path."""
+        if self.path is None:
+            return
+
+        with open(self.path, "w") as f:
+            json.dump(self.to_trace_events(), f, default=str)
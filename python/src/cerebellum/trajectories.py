@@ -0,0 +1,452 @@
+"""Sharded on-disk format for training trajectories.
+
+A trajectory is the goal and step list of one browsing session. Every trajectory is
+stored once, and the training example for each of its step prefixes is built lazily
+when it is read. Expanding prefixes on disk instead repeats the whole history once
+per step, which grows quadratically with the trajectory length.
+
+On-disk layout of a shard:
+
+    <prefix>.jsonl   One trajectory per line, steps hold an [offset, length] image
+                     reference in place of the screenshot
+    <prefix>.bin     Raw encoded screenshot bytes, identical images stored once
+    <prefix>.blobidx Blob store index of the screenshots by trajectory and step,
+                     see cerebellum.blobs
+    <prefix>.idx     Unsigned 64-bit triples of line offset, line length and step
+                     count per trajectory
+
+Screenshots are prepared for training once when written: the planner's cursor and
+scrollbar overlays are drawn and the image is downscaled and saved as JPEG. A shard
+is written to temporary files that are renamed on close, with the .idx index
+renamed last, so a shard whose .idx exists is complete. Screenshots are read
+through a memory-mapped BlobStore, which can also be opened on its own to sample
+frames without reading any trajectory.
+
+Typical usage example:
+
+    with TrajectoryWriter("data/shard-00000") as writer:
+        writer.write(session_id, goal, agent.history)
+
+    examples = TrajectoryExamples(["data/shard-00000"])
+    messages = examples[len(examples) - 1]
+"""
+
+import base64
+import bisect
+import io
+import itertools
+import json
+import os
+import threading
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field, replace
+from typing import Any, Optional, Union, overload
+
+from cerebellum.blobs import BlobStore, BlobStoreWriter, ImageRef
+from cerebellum.browser import BrowserState, BrowserStep, Coordinate
+from cerebellum.planners.anthropic import mark_screenshot
+from cerebellum.recorder import deserialize_step, serialize_step
+from PIL import Image
+
+INDEX_FIELDS = 3
+TRAINING_SYSTEM_PROMPT = """You are an intelligent web browsing agent operating in fullscreen mode to accomplish a specified user goal, detailed in <USER_TASK>.
+* Use only the Page Down or Page Up keys for scrolling.
+* If the webpage is scrollable, a gray rectangular scrollbar will appear on the right edge of the screenshot.
+* Adhere strictly to the instructions in the <IMPORTANT> section below.
+</SYSTEM_CAPABILITY>
+
+Your task is to execute user requests using their browser. After each action, capture a screenshot and thoroughly assess whether the desired outcome has been achieved. Clearly articulate your reasoning for each function call: "I have evaluated step X..." If the result is incorrect, attempt the step again. Proceed to the next step only after confirming successful execution. Always utilize a tool for actions and ensure to return a tool call. Remember to invoke the stop_browsing tool upon achieving the task's goal. Prioritize keyboard shortcuts for navigation whenever feasible.
+
+<IMPORTANT>
+* Utilize the user's <USER_DATA> to complete forms as you progress towards the goal.
+* Ensure a UI element is fully visible before interacting with it.
+</IMPORTANT>"""  # noqa: E501
+
+
+@dataclass(frozen=True)
+class TrainingImageOptions:
+    """How screenshots are prepared for training.
+
+    Args:
+        size: Bounding size the marked screenshot is downscaled to.
+        quality: JPEG quality.
+    """
+
+    size: Coordinate = field(default_factory=lambda: Coordinate(x=640, y=400))
+    quality: int = 85
+
+
+def prepare_screenshot(
+    state: BrowserState, options: Optional[TrainingImageOptions] = None
+) -> bytes:
+    """Draws the cursor and scrollbar overlays and encodes a training JPEG.
+
+    Args:
+        state: Browser state holding the base64 screenshot.
+        options: Target size and quality. If None, uses defaults.
+
+    Returns:
+        JPEG bytes of the marked and downscaled screenshot.
+    """
+    options = options or TrainingImageOptions()
+    marked = mark_screenshot(
+        base64.b64decode(state.screenshot), state.mouse, state.scrollbar
+    )
+    with Image.open(io.BytesIO(marked)) as img:
+        img.thumbnail((options.size.x, options.size.y), Image.Resampling.LANCZOS)
+        output_buffer = io.BytesIO()
+        img.convert("RGB").save(output_buffer, format="JPEG", quality=options.quality)
+        return output_buffer.getvalue()
+
+
+@dataclass(frozen=True)
+class StoredStep:
+    """A trajectory step whose screenshot lives in the blob file.
+
+    The state's screenshot field is empty, load the image through the shard.
+    """
+
+    step: BrowserStep
+    image: ImageRef
+
+
+@dataclass(frozen=True)
+class Trajectory:
+    """A stored trajectory."""
+
+    trajectory_id: str
+    goal: str
+    steps: list[StoredStep]
+
+
+def shard_files(prefix: str) -> tuple[str, str]:
+    """Returns the trajectory and index file paths of a shard."""
+    return prefix + ".jsonl", prefix + ".idx"
+
+
+class TrajectoryWriter:
+    """Writes trajectories into a shard.
+
+    Steps are written incrementally: images go to the blob file as soon as they
+    are appended and only step metadata is held until the trajectory ends.
+
+    Args:
+        prefix: Path of the shard without extension.
+        image_options: How screenshots are prepared when they are not passed in
+            already encoded. If None, uses defaults.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        image_options: Optional[TrainingImageOptions] = None,
+    ) -> None:
+        self.prefix = prefix
+        self.image_options = image_options
+        self._lines = open(shard_files(prefix)[0] + ".tmp", "wb")
+        self._blobs = BlobStoreWriter(prefix)
+        self._index = array("Q")
+        self._current: Optional[dict[str, Any]] = None
+
+    def begin(self, trajectory_id: str, goal: str) -> None:
+        """Starts a new trajectory."""
+        if self._current is not None:
+            raise RuntimeError("The previous trajectory was not ended")
+        self._current = {"id": trajectory_id, "goal": goal, "steps": []}
+        self._blobs.begin(trajectory_id)
+
+    def append(self, step: BrowserStep, image: Optional[bytes] = None) -> None:
+        """Appends a step to the current trajectory.
+
+        Args:
+            step: The step to store.
+            image: Encoded training image of the step. If None, it is prepared
+                from the state's screenshot with prepare_screenshot.
+        """
+        if self._current is None:
+            raise RuntimeError("No trajectory was begun")
+        if image is None:
+            image = prepare_screenshot(step.state, self.image_options)
+
+        ref = self._blobs.add(image)
+        data = serialize_step(step, "")
+        data["state"]["screenshot"] = [ref.offset, ref.length]
+        self._current["steps"].append(data)
+
+    def end(self) -> None:
+        """Writes the current trajectory."""
+        if self._current is None:
+            raise RuntimeError("No trajectory was begun")
+
+        line = json.dumps(self._current).encode() + b"\n"
+        self._index.extend([self._lines.tell(), len(line), len(self._current["steps"])])
+        self._lines.write(line)
+        self._current = None
+
+    def discard(self) -> None:
+        """Drops the current trajectory, e.g. after its steps failed to load."""
+        if self._current is None:
+            return
+        self._current = None
+        self._blobs.discard()
+
+    def write(
+        self,
+        trajectory_id: str,
+        goal: str,
+        steps: Iterable[Union[BrowserStep, tuple[BrowserStep, bytes]]],
+    ) -> None:
+        """Writes a whole trajectory.
+
+        Args:
+            trajectory_id: Unique id of the trajectory.
+            goal: The goal of the session.
+            steps: Steps, optionally paired with their encoded training image.
+        """
+        self.begin(trajectory_id, goal)
+        for item in steps:
+            if isinstance(item, BrowserStep):
+                self.append(item)
+            else:
+                self.append(*item)
+        self.end()
+
+    def close(self) -> None:
+        """Finishes the shard, making it visible to readers."""
+        if self._lines.closed:
+            return
+
+        lines_path, index_path = shard_files(self.prefix)
+        self._lines.close()
+        self._blobs.close()
+        os.replace(lines_path + ".tmp", lines_path)
+        with open(index_path + ".tmp", "wb") as f:
+            self._index.tofile(f)
+        os.replace(index_path + ".tmp", index_path)
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def shard_complete(prefix: str) -> bool:
+    """Whether a shard was fully written."""
+    return os.path.exists(shard_files(prefix)[1])
+
+
+class TrajectoryShard:
+    """Random access reader of a shard.
+
+    Args:
+        prefix: Path of the shard without extension.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        lines_path, index_path = shard_files(prefix)
+        self.prefix = prefix
+        self.index = array("Q")
+        with open(index_path, "rb") as f:
+            self.index.frombytes(f.read())
+
+        self._lines = open(lines_path, "rb")
+        self._lock = threading.Lock()
+        self.blobs = BlobStore(prefix)
+
+    def __len__(self) -> int:
+        return len(self.index) // INDEX_FIELDS
+
+    def step_count(self, index: int) -> int:
+        """Number of steps of a trajectory, without reading it."""
+        return self.index[index * INDEX_FIELDS + 2]
+
+    def _read_line(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            self._lines.seek(offset)
+            return self._lines.read(length)
+
+    def trajectory(self, index: int) -> Trajectory:
+        """Reads one trajectory without its images."""
+        offset, length = self.index[index * INDEX_FIELDS : index * INDEX_FIELDS + 2]
+        data = json.loads(self._read_line(offset, length))
+
+        steps = []
+        for step in data["steps"]:
+            image_offset, image_length = step["state"]["screenshot"]
+            steps.append(
+                StoredStep(
+                    deserialize_step(step, ""), ImageRef(image_offset, image_length)
+                )
+            )
+        return Trajectory(data["id"], data["goal"], steps)
+
+    def image(self, ref: ImageRef) -> memoryview:
+        """Zero-copy view of the encoded bytes of an image."""
+        return self.blobs.read(ref)
+
+    def close(self) -> None:
+        self._lines.close()
+        self.blobs.close()
+
+
+def image_url(data: Union[bytes, memoryview]) -> str:
+    mime = "image/jpeg" if data[:2] == b"\xff\xd8" else "image/png"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def format_action(step: BrowserStep) -> dict[str, Any]:
+    """Formats an action as an assistant tool call with normalised coordinates."""
+    state, action = step.state, step.action
+    arguments: dict[str, Any] = {"reason": action.reasoning}
+
+    if action.coordinate:
+        arguments["coordinate"] = (
+            action.coordinate.x / state.width,
+            action.coordinate.y / state.height,
+        )
+    if action.text:
+        arguments["text"] = action.text
+
+    return {
+        "role": "assistant",
+        "content": "",
+        "tool_calls": [
+            {"name": action.action.value, "arguments": json.dumps(arguments)}
+        ],
+    }
+
+
+def build_example(
+    trajectory: Trajectory, length: int, image: Union[bytes, memoryview]
+) -> list[dict[str, Any]]:
+    """Builds the chat training example for a prefix of a trajectory.
+
+    Only the last step of the prefix carries its screenshot, earlier steps are
+    described by the mouse position alone.
+
+    Args:
+        trajectory: The trajectory.
+        length: Number of steps in the prefix, at least 1.
+        image: Encoded screenshot of the last step of the prefix.
+
+    Returns:
+        Chat messages ending with the tool call of the prefix's last step.
+    """
+    messages: list[dict[str, Any]] = [
+        {"role": "system", "content": TRAINING_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"<USER_TASK>{trajectory.goal}</USER_TASK>\n"
+            "<USER_DATA>NONE</USER_DATA>",
+        },
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [
+                {
+                    "name": "screenshot",
+                    "arguments": json.dumps(
+                        {
+                            "reason": "Take a screenshot of the browser to "
+                            "understand the current webpage"
+                        }
+                    ),
+                }
+            ],
+        },
+    ]
+
+    last_function_name = "screenshot"
+    for index, stored in enumerate(trajectory.steps[:length]):
+        state = stored.step.state
+        messages.append(
+            {
+                "role": "tool",
+                "name": last_function_name,
+                "content": '{"result": "Action completed successfully"}',
+            }
+        )
+
+        content: list[dict[str, Any]] = [
+            {
+                "type": "text",
+                "value": "After action mouse cursor is at "
+                f"X: {state.mouse.x / state.width}, "
+                f"Y: {state.mouse.y / state.height}\n",
+            }
+        ]
+        if index == length - 1:
+            content.append(
+                {"type": "image_url", "image_url": {"url": image_url(image)}}
+            )
+        messages.append({"role": "user", "content": content})
+
+        messages.append(format_action(stored.step))
+        last_function_name = stored.step.action.action.value
+
+    return messages
+
+
+class TrajectoryExamples(Sequence[list[dict[str, Any]]]):
+    """Lazy sequence of prefix training examples over one or more shards.
+
+    Example i is located by binary search over cumulative step counts from the
+    shard indexes, and only its trajectory line and one image are read.
+
+    Args:
+        prefixes: Paths of the shards without extension.
+    """
+
+    def __init__(self, prefixes: Iterable[str]) -> None:
+        self.shards = [TrajectoryShard(prefix) for prefix in prefixes]
+        self._locations = [
+            (shard_index, index)
+            for shard_index, shard in enumerate(self.shards)
+            for index in range(len(shard))
+        ]
+        self._ends = list(
+            itertools.accumulate(
+                self.shards[shard_index].step_count(index)
+                for shard_index, index in self._locations
+            )
+        )
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    @overload
+    def __getitem__(self, i: int) -> list[dict[str, Any]]: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[list[dict[str, Any]]]: ...
+
+    def __getitem__(
+        self, i: Union[int, slice]
+    ) -> Union[list[dict[str, Any]], list[list[dict[str, Any]]]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("example index out of range")
+
+        position = bisect.bisect_right(self._ends, i)
+        start = self._ends[position - 1] if position else 0
+        shard_index, index = self._locations[position]
+        shard = self.shards[shard_index]
+
+        trajectory = shard.trajectory(index)
+        length = i - start + 1
+        image = shard.image(trajectory.steps[length - 1].image)
+        return build_example(trajectory, length, image)
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+
+def strip_screenshot(step: BrowserStep) -> BrowserStep:
+    """Returns the step with an empty screenshot, for handing to other processes."""
+    return replace(step, state=replace(step.state, screenshot=""))
@@ -40,6 +40,81 @@ class KeyMapping(NamedTuple):
     keys: list[str]
 
 
+# Dictionary mapping xdotool keys to Selenium Keys constants
+XDOTOOL_KEY_MAPPING: dict[str, str] = {
+    "ctrl": Keys.CONTROL,
+    "alt": Keys.ALT,
+    "shift": Keys.SHIFT,
+    "super": Keys.META,
+    "command": Keys.META,
+    "meta": Keys.META,
+    "null": Keys.NULL,
+    "cancel": Keys.CANCEL,
+    "help": Keys.HELP,
+    "backspace": Keys.BACK_SPACE,
+    "back_space": Keys.BACK_SPACE,
+    "tab": Keys.TAB,
+    "clear": Keys.CLEAR,
+    "return": Keys.RETURN,
+    "enter": Keys.RETURN,
+    "pause": Keys.PAUSE,
+    "escape": Keys.ESCAPE,
+    "space": Keys.SPACE,
+    "pageup": Keys.PAGE_UP,
+    "page_up": Keys.PAGE_UP,
+    "pagedown": Keys.PAGE_DOWN,
+    "page_down": Keys.PAGE_DOWN,
+    "end": Keys.END,
+    "home": Keys.HOME,
+    "left": Keys.ARROW_LEFT,
+    "arrowleft": Keys.ARROW_LEFT,
+    "arrow_left": Keys.ARROW_LEFT,
+    "up": Keys.ARROW_UP,
+    "arrowup": Keys.ARROW_UP,
+    "arrow_up": Keys.ARROW_UP,
+    "right": Keys.ARROW_RIGHT,
+    "arrowright": Keys.ARROW_RIGHT,
+    "arrow_right": Keys.ARROW_RIGHT,
+    "down": Keys.ARROW_DOWN,
+    "arrowdown": Keys.ARROW_DOWN,
+    "arrow_down": Keys.ARROW_DOWN,
+    "insert": Keys.INSERT,
+    "delete": Keys.DELETE,
+    "semicolon": Keys.SEMICOLON,
+    "equals": Keys.EQUALS,
+    "kp_0": Keys.NUMPAD0,
+    "kp_1": Keys.NUMPAD1,
+    "kp_2": Keys.NUMPAD2,
+    "kp_3": Keys.NUMPAD3,
+    "kp_4": Keys.NUMPAD4,
+    "kp_5": Keys.NUMPAD5,
+    "kp_6": Keys.NUMPAD6,
+    "kp_7": Keys.NUMPAD7,
+    "kp_8": Keys.NUMPAD8,
+    "kp_9": Keys.NUMPAD9,
+    "multiply": Keys.MULTIPLY,
+    "add": Keys.ADD,
+    "separator": Keys.SEPARATOR,
+    "subtract": Keys.SUBTRACT,
+    "decimal": Keys.DECIMAL,
+    "divide": Keys.DIVIDE,
+    "f1": Keys.F1,
+    "f2": Keys.F2,
+    "f3": Keys.F3,
+    "f4": Keys.F4,
+    "f5": Keys.F5,
+    "f6": Keys.F6,
+    "f7": Keys.F7,
+    "f8": Keys.F8,
+    "f9": Keys.F9,
+    "f10": Keys.F10,
+    "f11": Keys.F11,
+    "f12": Keys.F12,
+}
+
+XDOTOOL_MODIFIERS = frozenset({"ctrl", "alt", "shift", "super", "command", "meta"})
+
+
 def parse_xdotool(xdotool_command: str) -> KeyMapping:
     """Parse an xdotool-style key command into Selenium key mappings.
 
@@ -57,88 +132,16 @@ def parse_xdotool(xdotool_command: str) -> KeyMapping:
     # Handle splitting and stripping leading/trailing whitespace
     key_parts = [part.strip().lower() for part in xdotool_command.split("+")]
 
-    # Dictionary mapping xdotool keys to Selenium Keys constants
-    key_mapping = {
-        "ctrl": Keys.CONTROL,
-        "alt": Keys.ALT,
-        "shift": Keys.SHIFT,
-        "super": Keys.META,
-        "command": Keys.META,
-        "meta": Keys.META,
-        "null": Keys.NULL,
-        "cancel": Keys.CANCEL,
-        "help": Keys.HELP,
-        "backspace": Keys.BACK_SPACE,
-        "back_space": Keys.BACK_SPACE,
-        "tab": Keys.TAB,
-        "clear": Keys.CLEAR,
-        "return": Keys.RETURN,
-        "enter": Keys.RETURN,
-        "pause": Keys.PAUSE,
-        "escape": Keys.ESCAPE,
-        "space": Keys.SPACE,
-        "pageup": Keys.PAGE_UP,
-        "page_up": Keys.PAGE_UP,
-        "pagedown": Keys.PAGE_DOWN,
-        "page_down": Keys.PAGE_DOWN,
-        "end": Keys.END,
-        "home": Keys.HOME,
-        "left": Keys.ARROW_LEFT,
-        "arrowleft": Keys.ARROW_LEFT,
-        "arrow_left": Keys.ARROW_LEFT,
-        "up": Keys.ARROW_UP,
-        "arrowup": Keys.ARROW_UP,
-        "arrow_up": Keys.ARROW_UP,
-        "right": Keys.ARROW_RIGHT,
-        "arrowright": Keys.ARROW_RIGHT,
-        "arrow_right": Keys.ARROW_RIGHT,
-        "down": Keys.ARROW_DOWN,
-        "arrowdown": Keys.ARROW_DOWN,
-        "arrow_down": Keys.ARROW_DOWN,
-        "insert": Keys.INSERT,
-        "delete": Keys.DELETE,
-        "semicolon": Keys.SEMICOLON,
-        "equals": Keys.EQUALS,
-        "kp_0": Keys.NUMPAD0,
-        "kp_1": Keys.NUMPAD1,
-        "kp_2": Keys.NUMPAD2,
-        "kp_3": Keys.NUMPAD3,
-        "kp_4": Keys.NUMPAD4,
-        "kp_5": Keys.NUMPAD5,
-        "kp_6": Keys.NUMPAD6,
-        "kp_7": Keys.NUMPAD7,
-        "kp_8": Keys.NUMPAD8,
-        "kp_9": Keys.NUMPAD9,
-        "multiply": Keys.MULTIPLY,
-        "add": Keys.ADD,
-        "separator": Keys.SEPARATOR,
-        "subtract": Keys.SUBTRACT,
-        "decimal": Keys.DECIMAL,
-        "divide": Keys.DIVIDE,
-        "f1": Keys.F1,
-        "f2": Keys.F2,
-        "f3": Keys.F3,
-        "f4": Keys.F4,
-        "f5": Keys.F5,
-        "f6": Keys.F6,
-        "f7": Keys.F7,
-        "f8": Keys.F8,
-        "f9": Keys.F9,
-        "f10": Keys.F10,
-        "f11": Keys.F11,
-        "f12": Keys.F12,
-    }
-
     modifiers = [
-        key_mapping.get(part.lower(), part)
+        XDOTOOL_KEY_MAPPING.get(part, part)
         for part in key_parts
-        if part.lower() in ["ctrl", "alt", "shift", "super", "command", "meta"]
+        if part in XDOTOOL_MODIFIERS
     ]
 
     keys = [
-        key_mapping.get(part.lower(), part)
+        XDOTOOL_KEY_MAPPING.get(part, part)
         for part in key_parts
-        if part.lower() not in ["ctrl", "alt", "shift", "super", "command", "meta"]
+        if part not in XDOTOOL_MODIFIERS
     ]
 
     return KeyMapping(modifiers=modifiers, keys=keys)
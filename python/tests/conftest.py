@@ -1,5 +1,22 @@
+import base64
+import io
+import json
+import queue
+from typing import Any, Optional, Union
 from unittest.mock import patch
+
 import pytest
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+    BrowserTab,
+    CDPError,
+    Coordinate,
+    ScrollBar,
+)
+from PIL import Image
 
 
 @pytest.fixture
@@ -23,3 +40,158 @@ def mock_terminal():
             "setraw": mock_setraw,
             "stdin": mock_stdin,
         }
+
+
+def encode_frame(color: tuple[int, int, int], size=(320, 200), fmt="PNG") -> str:
+    """Encodes a single-colour frame as a base64 screenshot."""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def make_state(
+    screenshot: str = "",
+    url: Optional[str] = None,
+    width: int = 320,
+    height: int = 200,
+    mouse: Optional[Coordinate] = None,
+    scrollbar: Optional[ScrollBar] = None,
+) -> BrowserState:
+    """Builds a browser state on the "tab-1" tab, listed only if url is given."""
+    tabs = []
+    if url is not None:
+        tabs.append(
+            BrowserTab(handle="tab-1", url=url, title="", active=True, new=False, id=0)
+        )
+    return BrowserState(
+        screenshot=screenshot,
+        height=height,
+        width=width,
+        scrollbar=scrollbar or ScrollBar(offset=0.0, height=1.0),
+        tabs=tabs,
+        active_tab="tab-1",
+        mouse=mouse or Coordinate(x=0, y=0),
+    )
+
+
+def make_action(
+    action: BrowserActionType,
+    coordinate: Optional[Coordinate] = None,
+    text: Optional[str] = None,
+    reasoning: str = "",
+    id: str = "toolu_01",
+) -> BrowserAction:
+    return BrowserAction(
+        action=action, coordinate=coordinate, text=text, reasoning=reasoning, id=id
+    )
+
+
+def make_step(
+    state: Union[BrowserState, str],
+    action: BrowserActionType,
+    coordinate: Optional[Coordinate] = None,
+    text: Optional[str] = None,
+    reasoning: str = "",
+    id: str = "toolu_01",
+) -> BrowserStep:
+    """Builds a step. A screenshot stands for a default state showing it."""
+    if isinstance(state, str):
+        state = make_state(state)
+    return BrowserStep(
+        state=state, action=make_action(action, coordinate, text, reasoning, id)
+    )
+
+
+def make_overlay_state(color: tuple[int, int, int] = (255, 255, 255)) -> BrowserState:
+    """Builds a state with the cursor and scrollbar overlays in view."""
+    return make_state(
+        encode_frame(color),
+        mouse=Coordinate(x=160, y=100),
+        scrollbar=ScrollBar(offset=0.0, height=0.5),
+    )
+
+
+# Session shared by the trajectory and exporter tests
+STEPS = [
+    make_step(
+        make_overlay_state(),
+        BrowserActionType.MOUSE_MOVE,
+        Coordinate(x=80, y=50),
+        reasoning="Do mouse_move",
+    ),
+    make_step(
+        make_overlay_state(), BrowserActionType.LEFT_CLICK, reasoning="Do left_click"
+    ),
+    make_step(
+        make_overlay_state((0, 0, 255)),
+        BrowserActionType.TYPE,
+        text="hello",
+        reasoning="Do type",
+    ),
+]
+
+
+class FakeWebSocket:
+    """In-memory DevTools endpoint answering commands from a handler."""
+
+    def __init__(self, handler: Any) -> None:
+        self.handler = handler
+        self.sent: list[dict[str, Any]] = []
+        self.incoming: queue.Queue[Optional[str]] = queue.Queue()
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        pass
+
+    def send(self, data: str) -> None:
+        message = json.loads(data)
+        self.sent.append(message)
+        reply = {"id": message["id"]}
+        try:
+            reply["result"] = self.handler(message)
+        except CDPError as e:
+            reply["error"] = {"code": -32000, "message": str(e)}
+        self.incoming.put(json.dumps(reply))
+
+    def emit(
+        self, method: str, params: dict[str, Any], session_id: Optional[str] = None
+    ) -> None:
+        message: dict[str, Any] = {"method": method, "params": params}
+        if session_id:
+            message["sessionId"] = session_id
+        self.incoming.put(json.dumps(message))
+
+    def recv(self) -> str:
+        data = self.incoming.get()
+        if data is None:
+            raise ConnectionError("closed")
+        return data
+
+    def close(self) -> None:
+        self.incoming.put(None)
+
+
+def default_handler(message: dict[str, Any]) -> dict[str, Any]:
+    method = message["method"]
+    if method == "Target.attachToTarget":
+        return {"sessionId": f"session-{message['params']['targetId']}"}
+    if method == "Page.captureScreenshot":
+        return {"data": "c2NyZWVu"}
+    if method == "Runtime.evaluate":
+        return {"result": {"type": "object", "value": {"x": 800, "y": 600}}}
+    if method == "Input.dispatchKeyEvent" and message["params"]["key"] == "Fail":
+        raise CDPError("Invalid key")
+    return {}
+
+
+def install_fake_websocket(
+    monkeypatch: pytest.MonkeyPatch, handler: Any
+) -> FakeWebSocket:
+    """Makes DevTools connections talk to a FakeWebSocket with the given handler."""
+    ws = FakeWebSocket(handler)
+    monkeypatch.setattr("websocket.create_connection", lambda *args, **kwargs: ws)
+    return ws
+
+
+@pytest.fixture
+def fake_ws(monkeypatch: pytest.MonkeyPatch) -> FakeWebSocket:
+    return install_fake_websocket(monkeypatch, default_handler)
@@ -0,0 +1,33 @@
+import io
+import json
+from typing import Any
+
+from PIL import Image
+
+PAGE_WIDTH = 320
+PAGE_HEIGHT = 1000
+
+
+def make_row(
+    annotation_id: str = "task-1",
+    box: tuple[int, int, int, int] = (100, 50, 40, 20),
+    op: str = "CLICK",
+    value: str = "",
+    encoded: bool = False,
+) -> dict[str, Any]:
+    img = Image.new("RGB", (PAGE_WIDTH, PAGE_HEIGHT), (200, 200, 200))
+    screenshot: Any = img
+    if encoded:
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        screenshot = {"bytes": buffer.getvalue()}
+
+    attributes = {"bounding_box_rect": ",".join(str(v) for v in box)}
+    return {
+        "annotation_id": annotation_id,
+        "action_uid": f"{annotation_id}-{box}",
+        "confirmed_task": f"Goal of {annotation_id}",
+        "screenshot": screenshot,
+        "pos_candidates": [json.dumps({"attributes": json.dumps(attributes)})],
+        "operation": json.dumps({"op": op, "value": value}),
+    }
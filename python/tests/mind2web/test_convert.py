@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+from cerebellum import BrowserActionType, TrajectoryExamples, TrajectoryShard
+from cerebellum.mind2web.convert import convert
+from cerebellum.mind2web.tasks import group_tasks
+
+from tests.mind2web.conftest import make_row
+
+
+def make_rows(count: int) -> list[dict]:
+    return [make_row(f"task-{i}", encoded=True) for i in range(count)]
+
+
+def test_convert_writes_ordered_shards(tmp_path: Path) -> None:
+    stats = convert(group_tasks(make_rows(5)), str(tmp_path), shard_size=2, workers=2)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        f"shard-0000{i}.{ext}"
+        for i in range(3)
+        for ext in ("bin", "blobidx", "idx", "jsonl")
+    ]
+    assert stats.tasks_converted == 5
+    assert stats.steps_written == 10
+    assert stats.shards_written == 3
+
+    shards = [TrajectoryShard(str(tmp_path / f"shard-0000{i}")) for i in range(3)]
+    trajectories = [shard.trajectory(i) for shard in shards for i in range(len(shard))]
+    assert [t.trajectory_id for t in trajectories] == [f"task-{i}" for i in range(5)]
+    assert trajectories[0].goal == "Goal of task-0"
+    first = trajectories[0].steps[0]
+    assert first.step.action.action == BrowserActionType.MOUSE_MOVE
+    assert shards[0].image(first.image)[:2] == b"\xff\xd8"
+
+    examples = TrajectoryExamples(str(tmp_path / f"shard-0000{i}") for i in range(3))
+    assert len(examples) == 10
+
+
+def test_convert_resumes_by_shard(tmp_path: Path) -> None:
+    convert(group_tasks(make_rows(5)), str(tmp_path), shard_size=2, workers=1)
+    kept = (tmp_path / "shard-00000.jsonl").stat().st_mtime_ns
+    for ext in ("bin", "blobidx", "idx", "jsonl"):
+        os.remove(tmp_path / f"shard-00001.{ext}")
+    (tmp_path / "shard-00001.jsonl.tmp").write_text("partial")
+
+    stats = convert(group_tasks(make_rows(5)), str(tmp_path), shard_size=2, workers=1)
+
+    assert stats.tasks_skipped == 3
+    assert stats.tasks_converted == 2
+    assert (tmp_path / "shard-00000.jsonl").stat().st_mtime_ns == kept
+    assert not (tmp_path / "shard-00001.jsonl.tmp").exists()
+    shard = TrajectoryShard(str(tmp_path / "shard-00001"))
+    ids = [shard.trajectory(i).trajectory_id for i in range(len(shard))]
+    assert ids == ["task-2", "task-3"]
@@ -0,0 +1,142 @@
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+from cerebellum import (
+    ActionPlanner,
+    BrowserAction,
+    BrowserActionType,
+    BrowserState,
+    BrowserStep,
+    Coordinate,
+)
+from cerebellum.mind2web.evaluate import (
+    evaluate,
+    evaluate_task,
+    load_results,
+    score_step,
+)
+from cerebellum.mind2web.tasks import ExpectedStep, decompose_task, group_tasks
+
+from tests.mind2web.conftest import make_row
+
+
+def predicted(
+    action_type: BrowserActionType,
+    coordinate: Optional[Coordinate] = None,
+    text: Optional[str] = None,
+) -> BrowserAction:
+    return BrowserAction(
+        action=action_type, coordinate=coordinate, text=text, reasoning="", id="id"
+    )
+
+
+class OraclePlanner(ActionPlanner):
+    """Predicts each expected action, with an offset applied to coordinates."""
+
+    def __init__(self, expected: list[ExpectedStep], offset: int = 0) -> None:
+        self.expected = expected
+        self.offset = offset
+        self.histories: list[int] = []
+        self.thread = threading.get_ident()
+
+    def plan_action(
+        self,
+        goal: str,
+        additional_context: str,
+        additional_instructions: list[str],
+        current_state: BrowserState,
+        session_history: list[BrowserStep],
+    ) -> BrowserAction:
+        assert threading.get_ident() == self.thread
+        self.histories.append(len(session_history))
+        action = self.expected[len(session_history)].step.action
+        if action.coordinate:
+            action = predicted(
+                action.action,
+                Coordinate(
+                    x=action.coordinate.x + self.offset,
+                    y=action.coordinate.y + self.offset,
+                ),
+            )
+        return action
+
+
+def test_oracle_predictions_score_perfectly() -> None:
+    task = next(group_tasks([make_row(op="TYPE", value="Hello  World")]))
+    planner = OraclePlanner(decompose_task(task))
+
+    result = evaluate_task(planner, task)
+
+    assert result.success
+    assert planner.histories == [0, 1, 2]  # Teacher forced expected history
+    assert [step.target_hit for step in result.steps] == [True, True, None]
+
+
+def test_misses_outside_the_target_box() -> None:
+    task = next(group_tasks([make_row()]))
+    result = evaluate_task(OraclePlanner(decompose_task(task), offset=50), task)
+
+    assert not result.success
+    assert result.steps[0].action_match
+    assert result.steps[0].target_hit is False
+
+
+def test_text_and_scroll_scoring() -> None:
+    task = next(group_tasks([make_row(box=(10, 900, 40, 20), op="TYPE", value="A b")]))
+    expected = decompose_task(task)
+
+    scroll = score_step(0, expected[0], predicted(BrowserActionType.SCROLL_DOWN), 0.1)
+    key = score_step(
+        0, expected[0], predicted(BrowserActionType.KEY, text="Page_Down"), 0.1
+    )
+    typed = score_step(
+        0, expected[-1], predicted(BrowserActionType.TYPE, text=" a  B "), 0.1
+    )
+    wrong = score_step(0, expected[-1], predicted(BrowserActionType.TYPE, text="c"), 0)
+
+    assert scroll.correct and key.correct and typed.correct
+    assert wrong.action_match and wrong.text_match is False
+
+
+def test_planner_errors_are_recorded() -> None:
+    class FailingPlanner(OraclePlanner):
+        def plan_action(self, *args, **kwargs) -> BrowserAction:  # type: ignore
+            raise RuntimeError("overloaded")
+
+    task = next(group_tasks([make_row()]))
+    result = evaluate_task(FailingPlanner([]), task)
+
+    assert not result.success
+    assert result.error == "RuntimeError('overloaded')"
+    assert result.steps[0].predicted is None
+
+
+def test_evaluate_resumes_from_results_file(tmp_path: Path) -> None:
+    rows = [make_row(f"task-{i}") for i in range(5)]
+    expected = decompose_task(next(group_tasks(rows[:1])))
+    output = str(tmp_path / "results.jsonl")
+    created: list[OraclePlanner] = []
+
+    def factory() -> OraclePlanner:
+        planner = OraclePlanner(expected)
+        created.append(planner)
+        return planner
+
+    first = evaluate(group_tasks(rows), factory, output, workers=2, limit=3)
+    assert first.tasks == 3
+    assert first.task_success_rate == 1.0
+    assert len(created) <= 2
+
+    # A truncated line from an interrupted write is ignored
+    with open(output, "a") as f:
+        f.write('{"annotation_id": "task-')
+    assert len(load_results(output)) == 3
+
+    second = evaluate(group_tasks(rows), factory, output, workers=2)
+    assert second.tasks == 5
+    assert second.steps == 10
+    assert second.latency_p95_s >= second.latency_p50_s
+    ids = [json.loads(line)["annotation_id"] for line in open(output)]
+    assert sorted(ids) == [f"task-{i}" for i in range(5)]
@@ -0,0 +1,76 @@
+from cerebellum import BrowserActionType, Coordinate
+from cerebellum.mind2web.tasks import (
+    decompose_step,
+    decompose_task,
+    group_tasks,
+    process_step,
+    scroll_viewport,
+)
+
+from tests.mind2web.conftest import make_row
+
+
+def test_visible_target_is_moved_to_and_clicked() -> None:
+    steps, mouse = decompose_step(make_row(), Coordinate(x=1, y=1))
+
+    assert [step.step.action.action for step in steps] == [
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.LEFT_CLICK,
+    ]
+    assert steps[0].step.action.coordinate == Coordinate(x=120, y=60)
+    assert steps[0].target == (100, 50, 140, 70)
+    assert steps[1].step.state.mouse == mouse == Coordinate(x=120, y=60)
+    assert steps[0].step.state.height == 200
+
+
+def test_target_below_the_fold_scrolls_down_first() -> None:
+    row = make_row(box=(10, 900, 40, 20), op="TYPE", value="hello", encoded=True)
+    steps, _ = decompose_step(row, Coordinate(x=1, y=1))
+    actions = [step.step.action for step in steps]
+
+    scrolls = [a for a in actions if a.action == BrowserActionType.KEY]
+    assert scrolls and all(a.text == "PAGE_DOWN" for a in scrolls)
+    assert actions[-1].action == BrowserActionType.TYPE
+    assert actions[-1].text == "hello"
+
+    move = steps[len(scrolls)]
+    assert move.target is not None
+    assert 0 <= move.target[1] <= move.step.state.height
+    assert move.step.state.scrollbar.offset > 0
+
+
+def test_conversion_is_deterministic() -> None:
+    row = make_row(box=(10, 900, 40, 20))
+    first, _ = process_step(row, Coordinate(x=1, y=1))
+    second, _ = process_step(row, Coordinate(x=1, y=1))
+
+    assert [step.action.id for step in first] == [step.action.id for step in second]
+    assert all(step.action.id.startswith("toolu_01") for step in first)
+
+
+def test_rows_without_a_target_are_skipped() -> None:
+    row = make_row()
+    row["pos_candidates"] = []
+
+    assert decompose_step(row, Coordinate(x=5, y=5)) == ([], Coordinate(x=5, y=5))
+
+
+def test_scroll_viewport_stays_within_the_page() -> None:
+    assert scroll_viewport("down", (0, 0, 320, 200), 250) == (0, 50, 320, 250)
+    assert scroll_viewport("up", (0, 50, 320, 250), 250) == (0, 1, 320, 201)
+
+
+def test_group_tasks_carries_mouse_across_rows() -> None:
+    rows = [
+        make_row("task-1", box=(100, 50, 40, 20)),
+        make_row("task-1", box=(10, 10, 20, 20)),
+        make_row("task-2"),
+    ]
+    tasks = list(group_tasks(rows))
+
+    assert [task.annotation_id for task in tasks] == ["task-1", "task-2"]
+    assert tasks[0].goal == "Goal of task-1"
+
+    steps = decompose_task(tasks[0])
+    assert len(steps) == 4
+    assert steps[2].step.state.mouse == Coordinate(x=120, y=60)
@@ -1,15 +1,24 @@
+import base64
+import io
+
 import pytest
 from unittest.mock import Mock, patch
 from cerebellum import (
     AnthropicPlanner,
     AnthropicPlannerOptions,
-    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
     BrowserState,
     Coordinate,
-    ScrollBar,
+    DomElement,
+    ScreenshotMode,
+    ScreenshotPolicy,
     ScalingRatio,
 )
 
+from PIL import Image
+from tests.conftest import encode_frame, make_state, make_step
+
 
 @pytest.fixture
 def mock_anthropic_client():
@@ -83,3 +92,289 @@ def test_llm_to_browser_coordinates(planner):
     # Result should be clamped between 1 and old_size
     assert result.x == 100  # min(max(floor(50 * 2), 1), 200)
     assert result.y == 100  # min(max(floor(50 * 2), 1), 200)
+
+
+def test_get_scaling_ratio_follows_screenshot_size(planner):
+    size = Coordinate(x=1280, y=800)
+    assert planner.get_scaling_ratio(size).new_size == size
+
+    planner.screenshot_size_index = len(planner.screenshot_sizes) - 1
+    scaling = planner.get_scaling_ratio(size)
+
+    assert scaling.new_size == Coordinate(x=640, y=400)
+    assert scaling.ratio_x == 2.0
+    assert planner.llm_to_browser_coordinates(
+        Coordinate(x=320, y=200), scaling
+    ) == Coordinate(x=640, y=400)
+
+
+def test_resize_image_to_dimensions_skips_matching_size(planner):
+    css_pixels = base64.b64decode(encode_frame((255, 255, 255), size=(800, 600)))
+    device_pixels = base64.b64decode(encode_frame((255, 255, 255), size=(1600, 1200)))
+    viewport = Coordinate(x=800, y=600)
+
+    assert planner.resize_image_to_dimensions(css_pixels, viewport) is css_pixels
+    resized = planner.resize_image_to_dimensions(device_pixels, viewport)
+    with Image.open(io.BytesIO(resized)) as img:
+        assert img.size == (800, 600)
+
+
+def test_fit_token_budget_downscales(mock_anthropic_client):
+    planner = AnthropicPlanner(
+        AnthropicPlannerOptions(client=mock_anthropic_client, input_token_budget=2500)
+    )
+    state = make_state(
+        encode_frame((255, 255, 255), size=(1280, 800)), width=1280, height=800
+    )
+    system_prompt = planner.format_system_prompt("goal", "None", [])
+    messages = planner.format_into_messages("goal", "None", state, [])
+
+    assert planner.estimate_request_tokens(system_prompt, messages, state) > 2500
+    assert planner.fit_token_budget(system_prompt, messages, state)
+    assert planner.screenshot_size.x < 1280
+
+    messages = planner.format_into_messages("goal", "None", state, [])
+    assert planner.estimate_request_tokens(system_prompt, messages, state) <= 2500
+    assert not planner.fit_token_budget(system_prompt, messages, state)
+
+
+def test_previous_action_missed(planner):
+    white = make_state(encode_frame((255, 255, 255)), width=1280, height=800)
+    black = make_state(encode_frame((0, 0, 0)), width=1280, height=800)
+    target = Coordinate(x=5, y=5)
+
+    assert not planner.previous_action_missed(white, [])
+    assert planner.previous_action_missed(
+        white, [make_step(white, BrowserActionType.LEFT_CLICK)]
+    )
+    assert not planner.previous_action_missed(
+        black, [make_step(white, BrowserActionType.LEFT_CLICK)]
+    )
+    assert planner.previous_action_missed(
+        white,
+        [
+            make_step(white, BrowserActionType.MOUSE_MOVE, target),
+            make_step(white, BrowserActionType.MOUSE_MOVE, target),
+        ],
+    )
+
+
+def test_plan_action_scales_up_after_miss(mock_anthropic_client):
+    planner = AnthropicPlanner(AnthropicPlannerOptions(client=mock_anthropic_client))
+    planner.screenshot_size_index = 2
+    mock_anthropic_client.beta.messages.create.return_value = Mock(
+        usage=Mock(input_tokens=10, output_tokens=5),
+        content=[
+            Mock(
+                type="tool_use",
+                id="toolu_02",
+                input={"action": "mouse_move", "coordinate": [512, 320]},
+            )
+        ],
+    )
+    mock_anthropic_client.beta.messages.create.return_value.content[0].name = "computer"
+    white = make_state(encode_frame((255, 255, 255)), width=1280, height=800)
+
+    action = planner.plan_action(
+        "goal", "None", [], white, [make_step(white, BrowserActionType.LEFT_CLICK)]
+    )
+
+    assert planner.screenshot_size == Coordinate(x=1024, y=640)
+    assert action.coordinate == Coordinate(x=640, y=400)
+
+
+def test_plan_screenshot_skips_frame_comparison_by_default(planner):
+    white = make_state(encode_frame((255, 255, 255)), width=1280, height=800)
+    history = [make_step(white, BrowserActionType.LEFT_CLICK)]
+
+    with patch("cerebellum.planners.anthropic.frame_difference") as difference:
+        assert planner.plan_screenshot(white, history) == (0, ScreenshotMode.FULL)
+        difference.assert_not_called()
+
+        planner.screenshot_size_index = 1
+        planner._screenshot_plan = None
+        difference.return_value = 0.0
+        assert planner.plan_screenshot(white, history) == (0, ScreenshotMode.FULL)
+        difference.assert_called_once()
+
+
+def test_new_agent_resets_screenshot_plan(planner):
+    white = make_state(encode_frame((255, 255, 255)), width=1280, height=800)
+    planner.plan_screenshot(white, [])
+    planner.screenshot_mode = ScreenshotMode.SKIP
+    planner.screenshots_skipped = 1
+
+    BrowserAgent(Mock(), planner, "goal")
+
+    assert planner._screenshot_plan is None
+    assert planner.screenshot_mode == ScreenshotMode.FULL
+    assert planner.screenshots_skipped == 0
+
+
+ELEMENTS = [
+    DomElement("textbox", "Email", 100, 200, 400, 40, "a@b.c"),
+    DomElement("button", "Sign in", 100, 300, 200, 40),
+]
+
+
+def make_page(screenshot: str, url: str = "https://example.com") -> BrowserState:
+    state = make_state(screenshot, url, width=1280, height=800)
+    state.elements = ELEMENTS
+    return state
+
+
+def test_format_elements_in_screenshot_coordinates(planner):
+    planner.screenshot_size_index = 3  # 640x400, half the browser size
+    scaling = planner.get_scaling_ratio(Coordinate(x=1280, y=800))
+
+    text = planner.format_elements(ELEMENTS, scaling)
+
+    assert 'textbox "Email" [50,100,200,20] value="a@b.c"' in text
+    assert 'button "Sign in" [50,150,100,20]\n' in text
+
+
+def test_choose_screenshot_mode(mock_anthropic_client):
+    planner = AnthropicPlanner(
+        AnthropicPlannerOptions(
+            client=mock_anthropic_client,
+            screenshot_policy=ScreenshotPolicy(max_skipped=1),
+        )
+    )
+    white = make_page(encode_frame((255, 255, 255)))
+    black = make_page(encode_frame((0, 0, 0)))
+    typed = [make_step(white, BrowserActionType.TYPE)]
+
+    assert planner.choose_screenshot_mode(white, []) == ScreenshotMode.FULL
+    assert planner.choose_screenshot_mode(white, typed) == ScreenshotMode.SKIP
+    assert planner.choose_screenshot_mode(black, typed) == ScreenshotMode.FULL
+    assert planner.choose_screenshot_mode(white, typed, True) == ScreenshotMode.FULL
+    assert (
+        planner.choose_screenshot_mode(
+            make_page(white.screenshot, "https://example.com/next"), typed
+        )
+        == ScreenshotMode.FULL
+    )
+    assert (
+        planner.choose_screenshot_mode(
+            white, [make_step(white, BrowserActionType.MOUSE_MOVE)]
+        )
+        == ScreenshotMode.REDUCED
+    )
+
+    planner.screenshots_skipped = 1
+    assert planner.choose_screenshot_mode(white, typed) == ScreenshotMode.REDUCED
+
+    # Without an element list the screenshot is the only observation
+    white.elements = None
+    planner.screenshots_skipped = 0
+    assert planner.choose_screenshot_mode(white, typed) == ScreenshotMode.FULL
+
+
+def test_skipped_screenshot_sends_elements_only(mock_anthropic_client):
+    planner = AnthropicPlanner(
+        AnthropicPlannerOptions(
+            client=mock_anthropic_client, screenshot_policy=ScreenshotPolicy()
+        )
+    )
+    mock_anthropic_client.beta.messages.create.return_value = Mock(
+        usage=Mock(input_tokens=10, output_tokens=5),
+        content=[
+            Mock(
+                type="tool_use",
+                id="toolu_02",
+                input={"action": "type", "text": "secret"},
+            )
+        ],
+    )
+    mock_anthropic_client.beta.messages.create.return_value.content[0].name = "computer"
+    white = make_page(encode_frame((255, 255, 255)))
+
+    planner.plan_action(
+        "goal", "None", [], white, [make_step(white, BrowserActionType.TYPE)]
+    )
+
+    assert planner.screenshot_mode == ScreenshotMode.SKIP
+    assert planner.screenshots_skipped == 1
+    messages = mock_anthropic_client.beta.messages.create.call_args.kwargs["messages"]
+    content = messages[-1]["content"][0]["content"]
+    assert [block["type"] for block in content] == ["text"]
+    assert 'button "Sign in"' in content[0]["text"]
+
+
+def test_near_budget_reduces_screenshots(mock_anthropic_client):
+    planner = AnthropicPlanner(AnthropicPlannerOptions(client=mock_anthropic_client))
+    mock_anthropic_client.beta.messages.create.return_value = Mock(
+        usage=Mock(input_tokens=10, output_tokens=5),
+        content=[Mock(type="tool_use", id="toolu_02", input={"action": "screenshot"})],
+    )
+    mock_anthropic_client.beta.messages.create.return_value.content[0].name = "computer"
+    state = make_state(
+        encode_frame((255, 255, 255), size=(1280, 800)), width=1280, height=800
+    )
+    full_estimate = planner.estimate_next_request_tokens("goal", "None", [], state, [])
+
+    planner.set_near_budget(True)
+    planner.plan_action("goal", "None", [], state, [])
+
+    assert planner.screenshot_mode == ScreenshotMode.REDUCED
+    assert planner.screenshot_size == planner.screenshot_sizes[-1]
+    assert (
+        planner.estimate_next_request_tokens("goal", "None", [], state, [])
+        < full_estimate
+    )
+
+
+def test_estimate_next_request_renders_no_image(mock_anthropic_client):
+    planner = AnthropicPlanner(AnthropicPlannerOptions(client=mock_anthropic_client))
+    state = make_state(
+        encode_frame((255, 255, 255), size=(1280, 800)), width=1280, height=800
+    )
+
+    with patch.object(planner, "mark_screenshot") as mark_screenshot:
+        estimate = planner.estimate_next_request_tokens("goal", "None", [], state, [])
+    mark_screenshot.assert_not_called()
+
+    system_prompt = planner.format_system_prompt("goal", "None", [])
+    messages = planner.format_into_messages("goal", "None", state, [])
+    assert estimate == planner.estimate_request_tokens(system_prompt, messages, state)
+
+
+def test_estimate_next_request_uses_next_screenshot_mode(mock_anthropic_client):
+    planner = AnthropicPlanner(
+        AnthropicPlannerOptions(
+            client=mock_anthropic_client, screenshot_policy=ScreenshotPolicy()
+        )
+    )
+    white = make_page(encode_frame((255, 255, 255), size=(1280, 800)))
+    full = planner.estimate_next_request_tokens("goal", "None", [], white, [])
+
+    # The screenshot will be skipped, although the last request sent one
+    typed = make_page(white.screenshot)
+    history = [make_step(white, BrowserActionType.TYPE)]
+    skipped = planner.estimate_next_request_tokens("goal", "None", [], typed, history)
+
+    assert planner.screenshot_mode == ScreenshotMode.FULL
+    assert full - skipped > 1000
+
+
+def test_request_timeout_is_passed_to_client(mock_anthropic_client):
+    planner = AnthropicPlanner(AnthropicPlannerOptions(client=mock_anthropic_client))
+    mock_anthropic_client.beta.messages.create.return_value = Mock(
+        usage=Mock(input_tokens=10, output_tokens=5),
+        content=[Mock(type="tool_use", id="toolu_02", input={"action": "screenshot"})],
+    )
+    mock_anthropic_client.beta.messages.create.return_value.content[0].name = "computer"
+    state = make_state(
+        encode_frame((255, 255, 255), size=(1280, 800)), width=1280, height=800
+    )
+
+    planner.plan_action("goal", "None", [], state, [])
+    mock_anthropic_client.with_options.assert_not_called()
+
+    mock_anthropic_client.with_options.return_value = mock_anthropic_client
+    planner.set_request_timeout(30)
+    planner.plan_action("goal", "None", [], state, [])
+    # Retries would run past the limit
+    mock_anthropic_client.with_options.assert_called_once_with(
+        timeout=30, max_retries=0
+    )
@@ -0,0 +1,184 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    AnthropicPlanner,
+    AnthropicPlannerOptions,
+    HedgeLimiter,
+    HedgingOptions,
+    LatencyHistogram,
+    RequestHedger,
+)
+from tests.conftest import encode_frame, make_state
+
+
+def test_latency_percentile():
+    histogram = LatencyHistogram(window=10)
+    with pytest.raises(ValueError):
+        histogram.percentile(95)
+
+    for latency in range(1, 21):
+        histogram.record(float(latency))
+
+    # Only the last 10 latencies are kept
+    assert len(histogram) == 10
+    assert histogram.percentile(50) == 15.0
+    assert histogram.percentile(95) == 20.0
+    assert histogram.percentile(0) == 11.0
+
+
+def warmed_up_hedger(limiter: HedgeLimiter, max_workers: int = 4) -> RequestHedger:
+    hedger = RequestHedger(
+        HedgingOptions(min_samples=5, limiter=limiter, max_workers=max_workers)
+    )
+    for _ in range(5):
+        hedger.latencies.record(0.01)
+    return hedger
+
+
+def slow_first_request():
+    """Returns a request whose first call blocks until released."""
+    release = threading.Event()
+    calls = []
+
+    def request() -> str:
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    return request, release, calls
+
+
+def test_no_hedge_while_warming_up():
+    hedger = RequestHedger(HedgingOptions(min_samples=5, limiter=HedgeLimiter()))
+
+    assert hedger.hedge_delay() is None
+    assert hedger.call(lambda: "done") == "done"
+    assert hedger.hedges_sent == 0
+    assert len(hedger.latencies) == 1
+
+
+def test_slow_request_is_hedged():
+    limiter = HedgeLimiter(max_in_flight=1)
+    hedger = warmed_up_hedger(limiter)
+    request, release, calls = slow_first_request()
+    abandoned = []
+    finished = threading.Event()
+
+    def on_abandoned(result: str) -> None:
+        abandoned.append(result)
+        finished.set()
+
+    assert hedger.call(request, on_abandoned) == "fast"
+    assert len(calls) == 2
+    assert hedger.hedges_sent == 1
+    assert hedger.hedges_won == 1
+    # Measured from the start of the original request
+    assert hedger.latencies.percentile(100) >= 0.01
+    # The abandoned original request holds the permit while it runs
+    assert not limiter.try_acquire()
+
+    # The slow request still finishes and is reported
+    release.set()
+    assert finished.wait(5)
+    assert abandoned == ["slow"]
+    assert limiter.try_acquire()
+    hedger.close()
+
+
+def test_no_hedge_without_free_workers():
+    hedger = warmed_up_hedger(HedgeLimiter(), max_workers=2)
+    request, release, calls = slow_first_request()
+    assert hedger.call(request) == "fast"
+
+    # The abandoned request still holds a worker, so the next one runs inline
+    threads = []
+
+    def inline() -> str:
+        threads.append(threading.current_thread())
+        return "done"
+
+    assert hedger.call(inline) == "done"
+    assert threads == [threading.current_thread()]
+    assert hedger.hedges_sent == 1
+    release.set()
+    hedger.close()
+
+
+def test_limiter_caps_hedges():
+    limiter = HedgeLimiter(max_in_flight=1)
+    assert limiter.try_acquire()
+    hedger = warmed_up_hedger(limiter)
+    request, release, calls = slow_first_request()
+    threading.Timer(0.2, release.set).start()
+
+    assert hedger.call(request) == "slow"
+    assert len(calls) == 1
+    assert hedger.hedges_sent == 0
+    limiter.release()
+    hedger.close()
+
+
+def test_failed_hedge_falls_back_to_primary():
+    hedger = warmed_up_hedger(HedgeLimiter())
+    calls = []
+
+    def request() -> str:
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            return "slow"
+        raise RuntimeError("overloaded")
+
+    assert hedger.call(request) == "slow"
+    assert hedger.hedges_sent == 1
+    assert hedger.hedges_won == 0
+    hedger.close()
+
+
+def test_planner_counts_abandoned_usage():
+    client = Mock()
+    release = threading.Event()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(None)
+        number = len(calls)
+        if number == 1:
+            release.wait(5)
+        response = Mock(
+            usage=Mock(input_tokens=100, output_tokens=number),
+            content=[
+                Mock(type="tool_use", id="toolu_01", input={"action": "screenshot"})
+            ],
+        )
+        response.content[0].name = "computer"
+        return response
+
+    client.beta.messages.create.side_effect = create
+    planner = AnthropicPlanner(
+        AnthropicPlannerOptions(
+            client=client,
+            hedging=HedgingOptions(min_samples=1, limiter=HedgeLimiter()),
+        )
+    )
+    planner.hedger.latencies.record(0.01)
+    state = make_state(
+        encode_frame((255, 255, 255), size=(1280, 800)), width=1280, height=800
+    )
+
+    planner.plan_action("goal", "None", [], state, [])
+
+    assert planner.hedger.hedges_won == 1
+    assert planner.input_token_usage == 100
+    release.set()
+    deadline = time.monotonic() + 5
+    while planner.input_token_usage < 200 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert planner.input_token_usage == 200
+    assert planner.output_token_usage == 3
+    planner.close()
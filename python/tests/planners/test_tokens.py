@@ -0,0 +1,52 @@
+from cerebellum.planners.tokens import (
+    COMPUTER_TOOL_TOKENS,
+    estimate_content_tokens,
+    estimate_image_tokens,
+    estimate_request_tokens,
+    estimate_text_tokens,
+)
+
+from tests.conftest import encode_frame
+
+
+def test_estimate_text_tokens():
+    assert estimate_text_tokens("") == 0
+    assert estimate_text_tokens("abcd") == 1
+    assert estimate_text_tokens("abcde") == 2
+
+
+def test_estimate_image_tokens():
+    assert estimate_image_tokens(1280, 800) == 1366
+    assert estimate_image_tokens(640, 400) == 342
+
+
+def test_estimate_content_tokens_nested_tool_result():
+    image = {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": "image/png",
+            "data": encode_frame((0, 0, 0), size=(750, 10)),
+        },
+    }
+    content = [
+        {
+            "type": "tool_result",
+            "tool_use_id": "toolu_01",
+            "content": [{"type": "text", "text": "a" * 40}, image],
+        },
+        {"type": "tool_use", "id": "toolu_02", "name": "computer", "input": {}},
+    ]
+
+    # 10 text tokens, 10 image tokens and "{}" as one token
+    assert estimate_content_tokens(content) == 21
+
+
+def test_estimate_request_tokens_counts_tools():
+    computer = {"type": "computer_20241022", "name": "computer"}
+    messages = [{"role": "user", "content": "a" * 8}]
+
+    assert estimate_request_tokens("a" * 4, messages) == 3
+    assert estimate_request_tokens("", messages, [computer]) == (
+        2 + COMPUTER_TOOL_TOKENS
+    )
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserStep,
+    CachingPlanner,
+    Coordinate,
+    TrajectoryCache,
+    TrajectoryKey,
+)
+from cerebellum.planners.trajectory_cache import render_text, templatize_text
+
+from tests.conftest import encode_frame, make_action, make_state
+
+FRAMES = [encode_frame((i * 60, 0, 255 - i * 60)) for i in range(4)]
+
+
+CART_URL = "https://shop.example/cart"
+
+
+def run_session(planner, context: dict, frames=FRAMES) -> list[BrowserAction]:
+    """Drives the planner like BrowserAgent.step until success."""
+    history: list[BrowserStep] = []
+    actions = []
+    for frame in frames:
+        state = make_state(frame, CART_URL)
+        action = planner.plan_action(
+            "Order item", json.dumps(context), [], state, history
+        )
+        actions.append(action)
+        if action.action == BrowserActionType.SUCCESS:
+            break
+        history.append(BrowserStep(state=state, action=action))
+    return actions
+
+
+def make_inner_planner() -> Mock:
+    inner = Mock()
+    inner.plan_action.side_effect = lambda goal, context, *args: [
+        make_action(BrowserActionType.MOUSE_MOVE, Coordinate(x=5, y=6)),
+        make_action(BrowserActionType.TYPE, text=json.loads(context)["name"]),
+        make_action(BrowserActionType.SUCCESS),
+    ][len(args[2])]
+    return inner
+
+
+def test_templatize_and_render_text():
+    """Test parameter values round trip through placeholders."""
+    params = {"name": "Ada Lovelace", "first": "Ada"}
+    template = templatize_text("Ship to Ada Lovelace", params)
+
+    assert template == "Ship to {{name}}"
+    assert render_text(template, {"name": "Alan Turing"}) == "Ship to Alan Turing"
+    assert render_text(template, {}) is None
+
+
+def test_caching_planner_reuses_successful_run(tmp_path):
+    """Test a second run with new parameters is served from the cache."""
+    inner = make_inner_planner()
+    planner = CachingPlanner(inner, TrajectoryCache(str(tmp_path)))
+
+    run_session(planner, {"name": "Ada Lovelace"})
+    assert inner.plan_action.call_count == 3
+
+    actions = run_session(planner, {"name": "Alan Turing"})
+
+    assert inner.plan_action.call_count == 3
+    assert planner.cache_hits == 3
+    assert [a.action for a in actions] == [
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.TYPE,
+        BrowserActionType.SUCCESS,
+    ]
+    assert actions[0].coordinate == Coordinate(x=5, y=6)
+    assert actions[1].text == "Alan Turing"
+
+
+def test_caching_planner_hands_over_on_divergence(tmp_path):
+    """Test the wrapped planner takes over from the first mismatching frame."""
+    inner = make_inner_planner()
+    cache = TrajectoryCache(str(tmp_path))
+    planner = CachingPlanner(inner, cache)
+    run_session(planner, {"name": "Ada"})
+
+    diverged = [FRAMES[0], encode_frame((255, 255, 255)), FRAMES[2]]
+    run_session(planner, {"name": "Ada"}, frames=diverged)
+
+    # First step cached, second step and onward planned by the wrapped planner
+    assert planner.cache_hits == 1
+    assert inner.plan_action.call_count == 5
+
+
+def test_trajectory_cache_evicts_after_failures(tmp_path):
+    """Test a trajectory is dropped once it reaches max_failures."""
+    cache = TrajectoryCache(str(tmp_path), max_failures=2)
+    key = TrajectoryKey(origin="https://a.example", goal="g", width=1, height=1)
+    cache.put(key, [])
+
+    cache.record_failure(key)
+    assert cache.get(key) is not None
+    cache.record_failure(key)
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_trajectory_cache_evicts_by_age(tmp_path):
+    """Test trajectories older than max_age_s are evicted."""
+    cache = TrajectoryCache(str(tmp_path), max_age_s=60)
+    key = TrajectoryKey(origin="https://a.example", goal="g", width=1, height=1)
+    cache.put(key, [])
+    assert cache.evict_expired() == 0
+
+    path = tmp_path / (key.digest() + ".json")
+    data = json.loads(path.read_text())
+    data["created_at"] = time.time() - 120
+    path.write_text(json.dumps(data))
+
+    assert cache.evict_expired() == 1
+    assert cache.get(key) is None
+
+
+def test_trajectory_key_from_state():
+    """Test the key uses the active tab origin and viewport."""
+    key = TrajectoryKey.from_state("goal", make_state(FRAMES[0], CART_URL))
+    assert key == TrajectoryKey(
+        origin="https://shop.example", goal="goal", width=320, height=200
+    )
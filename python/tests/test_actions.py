@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    ActionCompiler,
+    BrowserActionType,
+    BrowserAgent,
+    Coordinate,
+)
+from selenium.webdriver.common.keys import Keys
+
+from tests.conftest import make_action, make_state
+
+
+def sent_actions(driver: Mock) -> dict[str, list[dict]]:
+    """Returns the actions of each input source in the single request sent."""
+    driver.execute.assert_called_once()
+    payload = driver.execute.call_args.args[1]["actions"]
+    return {source["type"]: source["actions"] for source in payload}
+
+
+def test_compile_sequence_into_one_request():
+    """Test a move, click and type are sent in one request, one primitive a tick."""
+    driver = Mock()
+    compiler = ActionCompiler(driver)
+
+    compiler.perform(
+        [
+            make_action(BrowserActionType.MOUSE_MOVE, Coordinate(x=10, y=20)),
+            make_action(BrowserActionType.LEFT_CLICK),
+            make_action(BrowserActionType.TYPE, text="hi"),
+        ],
+        make_state(width=800, height=600),
+    )
+
+    sources = sent_actions(driver)
+    assert set(sources) == {"key", "pointer"}  # Unused wheel source is dropped
+    assert len(sources["key"]) == len(sources["pointer"])
+
+    for key, pointer in zip(sources["key"], sources["pointer"]):
+        assert key["type"] == "pause" or pointer["type"] == "pause"
+
+    pointer_types = [a["type"] for a in sources["pointer"] if a["type"] != "pause"]
+    assert pointer_types == ["pointerMove", "pointerDown", "pointerUp"]
+    key_types = [a["type"] for a in sources["key"] if a["type"] != "pause"]
+    assert key_types == ["keyDown", "keyUp", "keyDown", "keyUp"]
+    # Typing starts only after the click has been released
+    first_key = next(i for i, a in enumerate(sources["key"]) if a["type"] != "pause")
+    assert first_key > 2
+
+
+def test_compile_key_chord():
+    """Test modifiers are held around the keys and released in reverse."""
+    driver = Mock()
+    ActionCompiler(driver).perform(
+        [make_action(BrowserActionType.KEY, text="ctrl+shift+t")],
+        make_state(width=800, height=600),
+    )
+
+    sources = sent_actions(driver)
+    assert list(sources) == ["key"]
+    assert [(a["type"], a["value"]) for a in sources["key"]] == [
+        ("keyDown", Keys.CONTROL),
+        ("keyDown", Keys.SHIFT),
+        ("keyDown", "t"),
+        ("keyUp", "t"),
+        ("keyUp", Keys.SHIFT),
+        ("keyUp", Keys.CONTROL),
+    ]
+
+
+def test_compile_scroll_uses_viewport_height():
+    """Test scrolling moves three quarters of the viewport."""
+    driver = Mock()
+    ActionCompiler(driver).perform(
+        [make_action(BrowserActionType.SCROLL_UP)], make_state(width=800, height=600)
+    )
+
+    sources = sent_actions(driver)
+    assert sources["wheel"][0]["deltaY"] == -450
+
+
+def test_compile_rejects_invalid_actions():
+    """Test uncompilable or incomplete actions raise before anything is sent."""
+    driver = Mock()
+    compiler = ActionCompiler(driver)
+
+    with pytest.raises(ValueError):
+        compiler.perform([make_action(BrowserActionType.SWITCH_TAB, text="1")], Mock())
+    with pytest.raises(ValueError):
+        compiler.perform([make_action(BrowserActionType.MOUSE_MOVE)], Mock())
+    driver.execute.assert_not_called()
+
+
+def test_take_action_ignores_screenshot():
+    """Test screenshot and cursor position actions need no browser input."""
+    driver = Mock()
+    agent = BrowserAgent(driver, Mock(), "goal")
+
+    agent.take_action(
+        make_action(BrowserActionType.SCREENSHOT), make_state(width=800, height=600)
+    )
+    agent.take_action(
+        make_action(BrowserActionType.CURSOR_POSITION),
+        make_state(width=800, height=600),
+    )
+
+    driver.execute.assert_not_called()
@@ -0,0 +1,79 @@
+import gc
+import random
+from pathlib import Path
+
+import pytest
+from cerebellum import BlobStore, BlobStoreWriter
+
+
+def write_store(prefix: str) -> None:
+    with BlobStoreWriter(prefix) as writer:
+        writer.begin("task-a")
+        writer.add(b"frame-a0")
+        writer.add(b"frame-a1")
+        writer.begin("task-empty")
+        writer.begin("task-b")
+        writer.add(b"frame-b0")
+        writer.add(b"frame-a1")  # Identical to an earlier frame
+
+
+def test_frames_by_task_and_step(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "frames")
+    write_store(prefix)
+
+    with BlobStore(prefix) as store:
+        assert len(store) == 4
+        assert store.task_ids == ["task-a", "task-empty", "task-b"]
+        assert store.get("task-a", 1) == b"frame-a1"
+        assert store.get("task-b", 0) == b"frame-b0"
+        assert store.step_count("task-empty") == 0
+        assert isinstance(store.get("task-a", 0), memoryview)
+
+        with pytest.raises(IndexError):
+            store.get("task-b", 2)
+        with pytest.raises(KeyError):
+            store.get("task-c", 0)
+
+
+def test_identical_frames_are_stored_once(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "frames")
+    write_store(prefix)
+
+    with BlobStore(prefix) as store:
+        assert store.ref(1) == store.ref(3)
+    assert (tmp_path / "frames.bin").stat().st_size == len(b"frame-a0" * 3)
+
+
+def test_uniform_sampling_maps_back_to_keys(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "frames")
+    write_store(prefix)
+
+    with BlobStore(prefix) as store:
+        keys = [store.key(frame) for frame in range(len(store))]
+        assert keys == [("task-a", 0), ("task-a", 1), ("task-b", 0), ("task-b", 1)]
+
+        frame = random.Random(0).randrange(len(store))
+        task_id, step = store.key(frame)
+        assert store.get(task_id, step) == store[frame]
+
+
+def test_views_outlive_close(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "frames")
+    write_store(prefix)
+
+    store = BlobStore(prefix)
+    view = store.get("task-a", 0)
+    store.close()
+    assert view == b"frame-a0"
+
+    del view
+    gc.collect()
+
+
+def test_empty_store(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "frames")
+    BlobStoreWriter(prefix).close()
+
+    with BlobStore(prefix) as store:
+        assert len(store) == 0
+        assert store.task_ids == []
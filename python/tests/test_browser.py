@@ -1,11 +1,18 @@
 from unittest.mock import Mock
 from cerebellum import (
+    DOM_SNAPSHOT_SCRIPT,
+    INSERT_TEXT_SCRIPT,
+    MAX_DOM_ELEMENTS,
+    BrowserActionType,
     BrowserAgent,
     BrowserGoalState,
     BrowserAgentOptions,
     Coordinate,
+    DomElement,
 )
 
+from tests.conftest import make_action
+
 
 def test_browser_agent_init():
     """Test BrowserAgent with no options."""
@@ -74,3 +81,113 @@ def test_coordinate_class():
 
     assert coord.x == 10
     assert coord.y == 20
+
+
+def test_fast_text_entry_uses_cdp_insert_text():
+    """Test TYPE inserts text with one CDP call on Chromium drivers."""
+    driver = Mock()
+    driver.execute_script.return_value = True
+    agent = BrowserAgent(
+        driver, Mock(), "goal", BrowserAgentOptions(fast_text_entry=True)
+    )
+
+    agent.take_action(
+        make_action(BrowserActionType.TYPE, text="1600 Amphitheatre Parkway"), Mock()
+    )
+
+    driver.execute_cdp_cmd.assert_called_once_with(
+        "Input.insertText", {"text": "1600 Amphitheatre Parkway"}
+    )
+    driver.execute.assert_not_called()  # No W3C actions were sent
+
+
+def test_fast_text_entry_scripted_without_cdp():
+    """Test TYPE falls back to a scripted value update without CDP."""
+    driver = Mock()
+    del driver.execute_cdp_cmd
+    driver.execute_script.return_value = True
+    agent = BrowserAgent(
+        driver, Mock(), "goal", BrowserAgentOptions(fast_text_entry=True)
+    )
+
+    agent.take_action(make_action(BrowserActionType.TYPE, text="hello"), Mock())
+
+    driver.execute_script.assert_called_once_with(INSERT_TEXT_SCRIPT, "hello", True)
+    driver.execute.assert_not_called()
+
+
+def test_fast_text_entry_falls_back_to_keys():
+    """Test control characters and non-editable targets use per-key typing."""
+    driver = Mock()
+    driver.execute_script.return_value = False
+    agent = BrowserAgent(
+        driver, Mock(), "goal", BrowserAgentOptions(fast_text_entry=True)
+    )
+
+    assert not agent.insert_text("line one\nline two")
+    assert not agent.insert_text("no focused field")
+    agent.take_action(
+        make_action(BrowserActionType.TYPE, text="no focused field"), Mock()
+    )
+
+    driver.execute_cdp_cmd.assert_not_called()
+    driver.execute.assert_called_once()
+
+
+def test_css_pixel_screenshot_on_hidpi():
+    """Test HiDPI captures are scaled to CSS pixels by the browser."""
+    driver = Mock()
+    driver.execute_cdp_cmd.return_value = {"data": "c2NyZWVu"}
+    agent = BrowserAgent(
+        driver, Mock(), "goal", BrowserAgentOptions(css_pixel_screenshots=True)
+    )
+    viewport = {"x": 800, "y": 600, "dpr": 2, "left": 0, "top": 120}
+
+    assert agent.capture_screenshot(viewport) == "c2NyZWVu"
+    driver.execute_cdp_cmd.assert_called_once_with(
+        "Page.captureScreenshot",
+        {
+            "format": "png",
+            "clip": {"x": 0, "y": 120, "width": 800, "height": 600, "scale": 0.5},
+        },
+    )
+    driver.get_screenshot_as_base64.assert_not_called()
+
+    # Nothing to scale at a device pixel ratio of 1
+    agent.capture_screenshot({**viewport, "dpr": 1})
+    driver.get_screenshot_as_base64.assert_called_once()
+
+
+def test_polled_tabs_prune_closed_and_keep_unique_ids():
+    """Test closed tabs are removed and their ids are not handed out again."""
+    driver = Mock()
+    driver.current_window_handle = "tab-a"
+    agent = BrowserAgent(driver, Mock(), "goal")
+
+    driver.window_handles = ["tab-a", "tab-b"]
+    agent._get_tabs()
+    driver.window_handles = ["tab-a", "tab-c"]
+    tabs, _ = agent._get_tabs()
+
+    assert [(tab.handle, tab.id, tab.new) for tab in tabs] == [
+        ("tab-a", 0, False),
+        ("tab-c", 2, True),
+    ]
+    assert set(agent.tabs) == {"tab-a", "tab-c"}
+
+
+def test_capture_elements_in_one_script_call():
+    """Test the element list is read with a single script call."""
+    driver = Mock()
+    driver.execute_script.return_value = [
+        ["textbox", "Email", 10, 20, 200, 24, ""],
+        ["button", "Sign in", 10, 60, 80, 24, None],
+    ]
+    agent = BrowserAgent(driver, Mock(), "goal", BrowserAgentOptions(dom_snapshot=True))
+
+    assert agent.dom_snapshot is True
+    assert agent.capture_elements() == [
+        DomElement("textbox", "Email", 10, 20, 200, 24, ""),
+        DomElement("button", "Sign in", 10, 60, 80, 24, None),
+    ]
+    driver.execute_script.assert_called_once_with(DOM_SNAPSHOT_SCRIPT, MAX_DOM_ELEMENTS)
@@ -0,0 +1,173 @@
+from typing import Optional
+from unittest.mock import Mock
+
+import pytest
+from anthropic import APITimeoutError
+from cerebellum import (
+    ActionPlanner,
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserGoalState,
+    BudgetUsage,
+    CachingPlanner,
+    LoopResponse,
+    SessionBudget,
+    TrajectoryCache,
+)
+from tests.conftest import encode_frame, make_state
+
+
+def test_budget_limits():
+    budget = SessionBudget(
+        max_input_tokens=1000,
+        max_output_tokens=100,
+        max_duration_s=60,
+    )
+
+    assert budget.exceeded(BudgetUsage(input_tokens=1000, output_tokens=100)) is None
+    assert "input tokens" in budget.exceeded(BudgetUsage(input_tokens=1001))
+    assert "output tokens" in budget.exceeded(BudgetUsage(output_tokens=101))
+    assert "elapsed" in budget.exceeded(BudgetUsage(elapsed_s=61))
+
+
+def test_budget_cost_and_near():
+    budget = SessionBudget(max_cost=0.10)
+    usage = BudgetUsage(input_tokens=20_000, output_tokens=1_000)
+
+    assert budget.cost(usage) == 0.075
+    assert budget.exceeded(usage) is None
+    assert not budget.near(usage)
+    assert budget.near(BudgetUsage(input_tokens=25_000, output_tokens=1_000))
+    assert "estimated cost" in budget.exceeded(
+        BudgetUsage(input_tokens=30_000, output_tokens=1_000)
+    )
+    # Without token or cost limits there is nothing to economise on
+    assert not SessionBudget(max_duration_s=1).near(usage)
+
+
+def make_planner() -> Mock:
+    planner = Mock(input_token_usage=0, output_token_usage=0)
+    planner.estimate_next_request_tokens.return_value = 1000
+
+    def plan_action(*args):
+        planner.input_token_usage += 1000
+        planner.output_token_usage += 50
+        return BrowserAction(
+            action=BrowserActionType.KEY,
+            coordinate=None,
+            text="Tab",
+            reasoning="",
+            id="toolu_01",
+        )
+
+    planner.plan_action.side_effect = plan_action
+    return planner
+
+
+def make_agent(
+    options: BrowserAgentOptions, planner: Optional[ActionPlanner] = None
+) -> BrowserAgent:
+    agent = BrowserAgent(Mock(), planner or make_planner(), "goal", options)
+    agent.get_state = Mock()
+    agent.take_action = Mock()
+    return agent
+
+
+def test_max_steps_is_exact():
+    agent = make_agent(BrowserAgentOptions(max_steps=2, wait_after_step_ms=1))
+    agent.start()
+
+    assert len(agent.history) == 2
+    assert agent.planner.plan_action.call_count == 2
+
+
+def test_agent_stops_before_exceeding_budget():
+    recorder = Mock()
+    agent = make_agent(
+        BrowserAgentOptions(
+            budget=SessionBudget(max_input_tokens=2500, max_step_latency_s=30),
+            recorder=recorder,
+            wait_after_step_ms=1,
+        )
+    )
+    agent.start()
+
+    assert agent.status == BrowserGoalState.BUDGET_EXCEEDED
+    assert agent.planner.plan_action.call_count == 2
+    assert agent.budget_exceeded_reason == (
+        "3000 input tokens exceed the budget of 2500"
+    )
+    assert "budget" in recorder.record.call_args.args[0].action.text
+    assert [call.args[0] for call in agent.planner.set_near_budget.call_args_list] == [
+        False,
+        True,
+    ]
+    agent.planner.set_request_timeout.assert_called_with(30)
+
+
+def test_budget_counts_wrapped_planner(tmp_path):
+    planner = make_planner()
+    agent = make_agent(
+        BrowserAgentOptions(
+            budget=SessionBudget(max_input_tokens=2500), wait_after_step_ms=1
+        ),
+        CachingPlanner(planner, TrajectoryCache(str(tmp_path))),
+    )
+    agent.get_state = Mock(return_value=make_state(encode_frame((255, 255, 255))))
+    agent.start()
+
+    assert agent.status == BrowserGoalState.BUDGET_EXCEEDED
+    assert planner.plan_action.call_count == 2
+    assert agent.input_token_usage == 2000
+    assert planner.set_near_budget.call_count == 2
+
+
+def test_budget_keeps_spend_across_escalation():
+    escalation_planner = make_planner()
+    loop_detector = Mock(escalation_planner=escalation_planner)
+    loop_detector.check.side_effect = lambda history, state: (
+        "repeated the same action" if len(history) == 2 else None
+    )
+    loop_detector.respond.return_value = LoopResponse.ESCALATE
+    agent = make_agent(
+        BrowserAgentOptions(
+            budget=SessionBudget(max_input_tokens=4500),
+            loop_detector=loop_detector,
+            wait_after_step_ms=1,
+        )
+    )
+    planner = agent.planner
+    agent.start()
+
+    assert agent.status == BrowserGoalState.BUDGET_EXCEEDED
+    assert planner.plan_action.call_count == 2
+    assert escalation_planner.plan_action.call_count == 2
+    assert agent.input_token_usage == 4000
+    assert agent.output_token_usage == 200
+
+
+def test_request_timeout_ends_session():
+    planner = make_planner()
+    planner.plan_action.side_effect = APITimeoutError(request=Mock())
+    recorder = Mock()
+    agent = make_agent(
+        BrowserAgentOptions(
+            budget=SessionBudget(max_step_latency_s=5),
+            recorder=recorder,
+            wait_after_step_ms=1,
+        ),
+        planner,
+    )
+    agent.start()
+
+    assert agent.status == BrowserGoalState.BUDGET_EXCEEDED
+    assert agent.budget_exceeded_reason == "the planner request took longer than 5s"
+    assert agent.history == []
+    assert "took longer" in recorder.record.call_args.args[0].action.text
+
+    # Without a latency limit the timeout is not the budget's to handle
+    agent = make_agent(BrowserAgentOptions(wait_after_step_ms=1), planner)
+    with pytest.raises(APITimeoutError):
+        agent.start()
@@ -0,0 +1,184 @@
+import os
+import shutil
+from typing import Optional
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    CDPConnection,
+    CDPError,
+    CDPTransport,
+    Coordinate,
+    browser_websocket_url,
+)
+from tests.conftest import FakeWebSocket, make_action, make_state
+
+
+def test_connection_matches_responses_and_events(fake_ws: FakeWebSocket):
+    """Test responses resolve by id, errors raise and events reach listeners."""
+    connection = CDPConnection("ws://devtools")
+    events = []
+    connection.on("Page.loadEventFired", lambda params, sid: events.append(sid))
+
+    result = connection.send("Target.attachToTarget", {"targetId": "tab-1"})
+    assert result == {"sessionId": "session-tab-1"}
+
+    fake_ws.emit("Page.loadEventFired", {"timestamp": 1.0}, "session-tab-1")
+    with pytest.raises(CDPError, match="Invalid key"):
+        connection.send("Input.dispatchKeyEvent", {"key": "Fail"})
+    assert events == ["session-tab-1"]
+
+    connection.close()
+    with pytest.raises(CDPError):
+        connection.send("Page.enable")
+
+
+def test_transport_attaches_per_target(fake_ws: FakeWebSocket):
+    """Test commands go to the session of the active target."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+
+    assert transport.capture_screenshot() == "c2NyZWVu"
+    assert transport.execute_script("return arguments[0]", 1) == {"x": 800, "y": 600}
+    transport.activate("tab-2")
+    transport.capture_screenshot()
+    transport.activate("tab-1")
+    transport.capture_screenshot()
+
+    attaches = [m for m in fake_ws.sent if m["method"] == "Target.attachToTarget"]
+    assert [m["params"]["targetId"] for m in attaches] == ["tab-1", "tab-2"]
+    assert fake_ws.sent[-1]["sessionId"] == "session-tab-1"
+
+    evaluate = next(m for m in fake_ws.sent if m["method"] == "Runtime.evaluate")
+    assert evaluate["params"]["expression"].endswith(".apply(null, [1])")
+    transport.close()
+
+
+def test_transport_dispatches_input(fake_ws: FakeWebSocket):
+    """Test pointer and key actions become DevTools input events."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    state = make_state(width=800, height=600)
+
+    move = make_action(BrowserActionType.MOUSE_MOVE, Coordinate(x=10, y=20))
+    assert transport.perform(move, state)
+    assert transport.perform(make_action(BrowserActionType.DOUBLE_CLICK), state)
+    chord = make_action(BrowserActionType.KEY, text="ctrl+a")
+    assert transport.perform(chord, state)
+    assert transport.perform(make_action(BrowserActionType.TYPE, text="Hi\n"), state)
+
+    mouse = [m["params"] for m in fake_ws.sent if "Mouse" in m["method"]]
+    assert [(p["type"], p["x"], p["y"]) for p in mouse] == [
+        ("mouseMoved", 10, 20),
+        ("mousePressed", 10, 20),
+        ("mouseReleased", 10, 20),
+        ("mousePressed", 10, 20),
+        ("mouseReleased", 10, 20),
+    ]
+    assert [p.get("clickCount") for p in mouse[1:]] == [1, 1, 2, 2]
+
+    keys = [m["params"] for m in fake_ws.sent if "Key" in m["method"]]
+    assert [(p["type"], p["key"], p["modifiers"]) for p in keys[:4]] == [
+        ("rawKeyDown", "Control", 2),
+        ("rawKeyDown", "a", 2),  # No text while ctrl is held
+        ("keyUp", "a", 2),
+        ("keyUp", "Control", 0),
+    ]
+    typed = [p.get("text") for p in keys[4:] if p["type"] == "keyDown"]
+    assert typed == ["H", "i", "\r"]
+    assert transport.mouse == Coordinate(x=10, y=20)
+    transport.close()
+
+
+def test_transport_leaves_unknown_input_to_webdriver(fake_ws: FakeWebSocket):
+    """Test actions without a DevTools mapping are not sent."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    state = make_state(width=800, height=600)
+
+    assert not transport.perform(make_action(BrowserActionType.KEY, text="F13"), state)
+    assert not transport.perform(
+        make_action(BrowserActionType.SWITCH_TAB, text="1"), state
+    )
+    assert not [m for m in fake_ws.sent if m["method"].startswith("Input.")]
+    transport.close()
+
+
+def test_browser_agent_uses_cdp(fake_ws: FakeWebSocket):
+    """Test the agent captures and acts through the transport when set."""
+    driver = Mock()
+    driver.window_handles = ["tab-1"]
+    driver.current_window_handle = "tab-1"
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    transport.execute_script = Mock(side_effect=[{"x": 800, "y": 600}, [0, 0.5]])
+    agent = BrowserAgent(driver, Mock(), "goal", BrowserAgentOptions(cdp=transport))
+
+    state = agent.get_state()
+    agent.take_action(make_action(BrowserActionType.LEFT_CLICK), state)
+
+    assert state.screenshot == "c2NyZWVu"
+    assert state.width == 800
+    driver.execute_script.assert_not_called()
+    driver.get_screenshot_as_base64.assert_not_called()
+    driver.execute.assert_not_called()
+    transport.close()
+
+
+def test_browser_websocket_url_requires_chromium():
+    """Test drivers without a DevTools address have no websocket URL."""
+    driver = Mock()
+    driver.capabilities = {"browserName": "firefox"}
+
+    assert browser_websocket_url(driver) is None
+
+
+def find_chromium() -> Optional[str]:
+    candidates = ("chromium", "chromium-browser", "google-chrome", "chrome")
+    return next(filter(None, map(shutil.which, candidates)), None)
+
+
+@pytest.mark.skipif(
+    not (find_chromium() and shutil.which("chromedriver")),
+    reason="Chromium and chromedriver are required",
+)
+def test_transport_against_headless_chromium():
+    """Test capture, scripts and input against a local headless Chromium."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.binary_location = str(find_chromium())
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=800,600")
+    if os.geteuid() == 0:
+        options.add_argument("--no-sandbox")
+    service = Service(executable_path=shutil.which("chromedriver"))
+    driver = webdriver.Chrome(options=options, service=service)
+
+    try:
+        driver.get(
+            "data:text/html,<input id=q autofocus>"
+            "<script>document.onclick=e=>document.title=e.clientX+','+e.clientY"
+            "</script>"
+        )
+        transport = CDPTransport.from_driver(driver)
+        assert transport is not None
+
+        assert transport.execute_script("return arguments[0] + 1", 1) == 2
+        assert transport.capture_screenshot()
+
+        state = make_state(width=800, height=600)
+        move = make_action(BrowserActionType.MOUSE_MOVE, Coordinate(x=300, y=200))
+        assert transport.perform(move, state)
+        assert transport.perform(make_action(BrowserActionType.LEFT_CLICK), state)
+        assert transport.execute_script("return document.title") == "300,200"
+
+        driver.execute_script("document.getElementById('q').focus()")
+        assert transport.perform(
+            make_action(BrowserActionType.TYPE, text="hello"), state
+        )
+        value = transport.execute_script("return document.getElementById('q').value")
+        assert value == "hello"
+        transport.close()
+    finally:
+        driver.quit()
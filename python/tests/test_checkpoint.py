@@ -0,0 +1,156 @@
+import time
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserGoalState,
+    BrowserState,
+    BrowserTab,
+    Coordinate,
+    ScrollBar,
+    SessionCheckpointer,
+    load_checkpoint,
+    resume_agent,
+)
+from tests.conftest import encode_frame
+
+FRAMES = [encode_frame((255, 255, 255)), encode_frame((0, 0, 0))]
+
+
+def make_tab(handle: str, url: str, active: bool, tab_id: int) -> BrowserTab:
+    return BrowserTab(
+        handle=handle, url=url, title="", active=active, new=False, id=tab_id
+    )
+
+
+def make_agent(directory: str, every: int = 1) -> BrowserAgent:
+    planner = Mock(input_token_usage=0, output_token_usage=0)
+
+    def plan_action(*args) -> BrowserAction:
+        planner.input_token_usage += 100
+        planner.output_token_usage += 10
+        return BrowserAction(
+            action=BrowserActionType.MOUSE_MOVE,
+            coordinate=Coordinate(x=10, y=20),
+            text=None,
+            reasoning="",
+            id="toolu_01",
+        )
+
+    planner.plan_action.side_effect = plan_action
+    agent = BrowserAgent(
+        Mock(),
+        planner,
+        "Find the docs",
+        BrowserAgentOptions(
+            checkpointer=SessionCheckpointer(directory, every),
+            additional_instructions=["Be brief"],
+            max_steps=20,
+        ),
+    )
+
+    def get_state() -> BrowserState:
+        agent.tabs = {
+            "old-a": make_tab("old-a", "https://example.com/a", False, 0),
+            "old-b": make_tab("old-b", "https://example.com/b", True, 3),
+        }
+        agent._next_tab_id = 4
+        return BrowserState(
+            screenshot=FRAMES[len(agent.history) % 2],
+            height=200,
+            width=320,
+            scrollbar=ScrollBar(offset=0.0, height=1.0),
+            tabs=list(agent.tabs.values()),
+            active_tab="old-b",
+            mouse=Coordinate(x=1, y=1),
+        )
+
+    agent.get_state = get_state
+    agent.take_action = Mock()
+    return agent
+
+
+def test_checkpoint_saved_after_each_observation(tmp_path):
+    agent = make_agent(str(tmp_path))
+    for _ in range(3):
+        agent.step()
+
+    checkpoint = load_checkpoint(str(tmp_path))
+
+    assert agent.checkpointer.checkpoints_written == 3
+    assert checkpoint.goal == "Find the docs"
+    assert checkpoint.status == BrowserGoalState.RUNNING
+    # Saved before the third action was planned
+    assert checkpoint.history == agent.history[:2]
+    assert checkpoint.options["additional_instructions"] == ["Be brief"]
+    assert checkpoint.options["max_steps"] == 20
+    assert checkpoint.last_url == "https://example.com/b"
+    assert checkpoint.next_tab_id == 4
+    assert checkpoint.token_usage == {
+        "input_token_usage": 200,
+        "output_token_usage": 20,
+    }
+    assert checkpoint.planner_calls == 2
+    assert checkpoint.every == 1
+    # Identical frames are stored once
+    assert len(list((tmp_path / "screenshots").iterdir())) == 2
+
+
+def test_checkpoint_interval(tmp_path):
+    agent = make_agent(str(tmp_path), every=2)
+    for _ in range(3):
+        agent.step()
+
+    assert agent.checkpointer.checkpoints_written == 2
+    assert len(load_checkpoint(str(tmp_path)).history) == 2
+    resumed = resume_agent(Mock(), Mock(), str(tmp_path))
+    assert resumed.checkpointer.every == 2
+
+
+def test_resume_reopens_tabs_and_continues(tmp_path):
+    agent = make_agent(str(tmp_path))
+    agent._started_at = time.monotonic() - 60
+    agent._loop_hint = "Try something else"
+    agent.additional_instructions.append(agent._loop_hint)
+    for _ in range(3):
+        agent.step()
+
+    driver = Mock()
+    driver.current_window_handle = "new-0"
+    opened = iter(["new-1"])
+    driver.switch_to.new_window.side_effect = lambda kind: setattr(
+        driver, "current_window_handle", next(opened)
+    )
+    driver.switch_to.window.side_effect = lambda handle: setattr(
+        driver, "current_window_handle", handle
+    )
+    planner = Mock(input_token_usage=0, output_token_usage=0)
+
+    resumed = resume_agent(driver, planner, str(tmp_path))
+
+    assert resumed.goal == "Find the docs"
+    assert resumed.status == BrowserGoalState.RUNNING
+    assert len(resumed.history) == 2
+    assert resumed.additional_instructions == ["Be brief", "Try something else"]
+    assert resumed._loop_hint == "Try something else"
+    assert resumed.max_steps == 20
+    # Spend so far counts against the budget of the resumed session
+    assert resumed.input_token_usage == 200
+    assert resumed.output_token_usage == 20
+    assert resumed._planner_calls == 2
+    assert time.monotonic() - resumed._started_at >= 60
+    assert [call.args[0] for call in driver.get.call_args_list] == [
+        "https://example.com/a",
+        "https://example.com/b",
+    ]
+    assert driver.current_window_handle == "new-1"
+    assert {handle: tab.id for handle, tab in resumed.tabs.items()} == {
+        "new-0": 0,
+        "new-1": 3,
+    }
+    assert resumed._next_tab_id == 4
+    # Further checkpoints go to the same directory
+    assert resumed.checkpointer.directory == str(tmp_path)
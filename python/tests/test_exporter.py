@@ -0,0 +1,124 @@
+import io
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    BlobStore,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserGoalState,
+    Coordinate,
+    SessionExporter,
+    TrainingImageOptions,
+    TrajectoryExamples,
+    TrajectoryShard,
+)
+from cerebellum.recorder import SessionRecorder
+from PIL import Image
+
+from tests.conftest import STEPS, make_action, make_step
+
+
+def make_agent(status: BrowserGoalState = BrowserGoalState.SUCCESS) -> Mock:
+    agent = Mock()
+    agent.goal = "Say hello"
+    agent.history = STEPS
+    agent.status = status
+    agent.final_step = make_step(STEPS[-1].state, BrowserActionType.SUCCESS)
+    return agent
+
+
+def test_export_agent_sessions(tmp_path: Path) -> None:
+    options = TrainingImageOptions(size=Coordinate(x=160, y=100), quality=70)
+    with SessionExporter(str(tmp_path), image_options=options) as exporter:
+        assert exporter.export_agent(make_agent(), "session-1") == 4
+
+    shard = TrajectoryShard(str(tmp_path / "shard-00000"))
+    trajectory = shard.trajectory(0)
+    assert trajectory.trajectory_id == "session-1"
+    assert trajectory.goal == "Say hello"
+
+    image = Image.open(io.BytesIO(shard.image(trajectory.steps[0].image)))
+    assert (image.format, image.size) == ("JPEG", (160, 100))
+    assert len(TrajectoryExamples([str(tmp_path / "shard-00000")])) == 4
+
+
+def test_unsuccessful_sessions_can_be_skipped(tmp_path: Path) -> None:
+    with SessionExporter(str(tmp_path), successful_only=True) as exporter:
+        assert exporter.export_agent(make_agent(BrowserGoalState.FAILED)) is None
+        assert exporter.export_agent(make_agent()) == 4
+        assert exporter.sessions_exported == 1
+
+
+def test_export_recording_streams_from_disk(tmp_path: Path) -> None:
+    with SessionRecorder(str(tmp_path / "runs" / "session-7")) as recorder:
+        for step in STEPS:
+            recorder.record(step)
+
+    with SessionExporter(str(tmp_path / "out")) as exporter:
+        exporter.export_recording(str(tmp_path / "runs" / "session-7"), "Say hello")
+
+    shard = TrajectoryShard(str(tmp_path / "out" / "shard-00000"))
+    trajectory = shard.trajectory(0)
+    assert trajectory.trajectory_id == "session-7"
+    assert [s.step.action.action for s in trajectory.steps] == [
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.LEFT_CLICK,
+        BrowserActionType.TYPE,
+    ]
+
+
+def test_agent_and_recording_export_the_same_steps(tmp_path: Path) -> None:
+    planner = Mock()
+    planner.plan_action.side_effect = [step.action for step in STEPS] + [
+        make_action(BrowserActionType.SUCCESS, reasoning="Done")
+    ]
+    with SessionRecorder(str(tmp_path / "run")) as recorder:
+        agent = BrowserAgent(
+            Mock(),
+            planner,
+            "Say hello",
+            BrowserAgentOptions(recorder=recorder, wait_after_step_ms=1),
+        )
+        agent.get_state = Mock(side_effect=[step.state for step in STEPS] * 2)
+        agent.take_action = Mock()
+        agent.start()
+
+    with SessionExporter(str(tmp_path / "out")) as exporter:
+        assert exporter.export_agent(agent, "live") == 4
+        assert exporter.export_recording(str(tmp_path / "run"), "Say hello") == 4
+
+    shard = TrajectoryShard(str(tmp_path / "out" / "shard-00000"))
+    live, recorded = shard.trajectory(0), shard.trajectory(1)
+    assert [s.step for s in live.steps] == [s.step for s in recorded.steps]
+    assert live.steps[-1].step.action.action == BrowserActionType.SUCCESS
+
+
+def test_shards_roll_over_and_accumulate(tmp_path: Path) -> None:
+    with SessionExporter(str(tmp_path), shard_size=2) as exporter:
+        for i in range(3):
+            exporter.export("Say hello", STEPS, f"session-{i}")
+    with SessionExporter(str(tmp_path), shard_size=2) as exporter:
+        exporter.export("Say hello", STEPS, "session-3")
+
+    lengths = [len(TrajectoryShard(str(tmp_path / f"shard-0000{i}"))) for i in range(3)]
+    assert lengths == [2, 1, 1]
+
+
+def test_failed_session_is_discarded(tmp_path: Path) -> None:
+    def broken_steps():
+        yield STEPS[0]
+        raise OSError("recording truncated")
+
+    with SessionExporter(str(tmp_path)) as exporter:
+        with pytest.raises(OSError):
+            exporter.export("Broken", broken_steps(), "broken")
+        exporter.export("Say hello", STEPS, "session-1")
+
+    shard = TrajectoryShard(str(tmp_path / "shard-00000"))
+    assert len(shard) == 1
+    with BlobStore(str(tmp_path / "shard-00000")) as store:
+        assert store.task_ids == ["session-1"]
+        assert store.step_count("session-1") == 3
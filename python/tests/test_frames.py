@@ -0,0 +1,61 @@
+from itertools import chain, repeat
+from unittest.mock import Mock
+
+import pytest
+from cerebellum.frames import (
+    SettleOptions,
+    fingerprint_difference,
+    frame_difference,
+    frame_fingerprint,
+    wait_for_settle,
+)
+from tests.conftest import encode_frame
+
+
+def test_frame_difference_identical():
+    """Test identical frames have no difference."""
+    frame = encode_frame((255, 255, 255))
+    assert frame_difference(frame, frame) == 0.0
+
+
+def test_frame_difference_opposite():
+    """Test black and white frames are maximally different."""
+    assert frame_difference(
+        encode_frame((0, 0, 0)), encode_frame((255, 255, 255))
+    ) == pytest.approx(1.0)
+
+
+def test_frame_difference_ignores_size_and_format():
+    """Test the same content compares equal across sizes and encodings."""
+    small = encode_frame((200, 10, 10), size=(320, 200))
+    large = encode_frame((200, 10, 10), size=(1280, 800), fmt="JPEG")
+    assert frame_difference(small, large) < 0.01
+
+
+def test_fingerprint_difference_size_mismatch():
+    """Test fingerprints of different lengths are rejected."""
+    with pytest.raises(ValueError):
+        fingerprint_difference(b"\x00" * 4, b"\x00" * 5)
+
+
+def test_wait_for_settle_returns_first_stable_frame():
+    """Test settle stops once two consecutive frames match."""
+    loading = [encode_frame((i * 40, 0, 0)) for i in range(3)]
+    done = encode_frame((255, 255, 255))
+    capture = Mock(side_effect=chain(loading, repeat(done)))
+
+    result = wait_for_settle(capture, SettleOptions(interval_ms=1))
+
+    assert result == done
+    assert capture.call_count == 5
+
+
+def test_wait_for_settle_times_out():
+    """Test settle returns the latest frame when the page never settles."""
+    frames = [encode_frame((i % 2 * 255, 0, 0)) for i in range(1000)]
+    capture = Mock(side_effect=frames)
+
+    wait_for_settle(capture, SettleOptions(interval_ms=1, timeout_ms=20))
+
+    assert 1 < capture.call_count < 1000
+    assert len(frame_fingerprint(frames[0])) == 64 * 40
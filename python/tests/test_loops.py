@@ -0,0 +1,122 @@
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserGoalState,
+    Coordinate,
+    LoopDetector,
+    LoopResponse,
+)
+from tests.conftest import encode_frame, make_state, make_step
+
+WHITE = encode_frame((255, 255, 255))
+BLACK = encode_frame((0, 0, 0))
+GRAY = encode_frame((128, 128, 128))
+
+
+def test_detects_repeated_action_on_unchanged_page():
+    detector = LoopDetector()
+    target = Coordinate(x=5, y=5)
+    history = [make_step(WHITE, BrowserActionType.MOUSE_MOVE, target)] * 3
+
+    assert "repeated the mouse_move action" in detector.check(
+        history, make_state(WHITE)
+    )
+    # The page changed after the last action
+    assert detector.check(history, make_state(BLACK)) is None
+    # Different targets are not a repeat
+    moved = history[:2] + [make_step(WHITE, BrowserActionType.MOUSE_MOVE)]
+    assert detector.check(moved, make_state(WHITE)) is None
+
+
+def test_detects_scroll_oscillation():
+    detector = LoopDetector()
+    frames = [WHITE, BLACK, GRAY, BLACK]
+    actions = [BrowserActionType.SCROLL_DOWN, BrowserActionType.SCROLL_UP] * 2
+    history = [make_step(frame, action) for frame, action in zip(frames, actions)]
+
+    assert "scrolled down and up" in detector.check(history, make_state(WHITE))
+    assert detector.check(history[1:], make_state(WHITE)) is None
+
+
+def test_detects_stall_but_not_navigation():
+    detector = LoopDetector(stall_steps=3)
+    actions = [
+        BrowserActionType.LEFT_CLICK,
+        BrowserActionType.KEY,
+        BrowserActionType.LEFT_CLICK,
+    ]
+    history = [make_step(WHITE, action) for action in actions]
+
+    assert "took 3 steps" in detector.check(history, make_state(WHITE))
+    assert (
+        detector.check(history, make_state(WHITE, "https://example.com/next")) is None
+    )
+
+
+def test_reused_detector_starts_over_for_a_new_agent():
+    detector = LoopDetector(repeats=2, stall_steps=0)
+    history = [make_step(WHITE, BrowserActionType.LEFT_CLICK)] * 3
+    reason = detector.check(history[:2], make_state(WHITE))
+    assert detector.respond(history[:2], reason) == LoopResponse.HINT
+    # Steps before the response no longer count
+    assert detector.check(history, make_state(WHITE)) is None
+
+    BrowserAgent(Mock(), Mock(), "goal", BrowserAgentOptions(loop_detector=detector))
+
+    assert detector.detections == []
+    assert detector.check(history, make_state(WHITE)) == reason
+
+
+def test_responses_advance_and_reset_window():
+    detector = LoopDetector(
+        responses=[LoopResponse.HINT, LoopResponse.ESCALATE, LoopResponse.FAIL]
+    )
+    history = [make_step(WHITE, BrowserActionType.LEFT_CLICK)] * 3
+
+    assert detector.respond(history, "looped") == LoopResponse.HINT
+    # Only steps after the response count
+    assert detector.check(history, make_state(WHITE)) is None
+    # No escalation planner to hand over to
+    assert detector.respond(history, "looped") == LoopResponse.FAIL
+    assert detector.detections == ["looped", "looped"]
+
+
+def test_agent_hints_then_fails():
+    planner = Mock()
+    planner.plan_action.return_value = BrowserAction(
+        action=BrowserActionType.LEFT_CLICK,
+        coordinate=None,
+        text=None,
+        reasoning="",
+        id="toolu_01",
+    )
+    agent = BrowserAgent(
+        Mock(),
+        planner,
+        "goal",
+        BrowserAgentOptions(
+            loop_detector=LoopDetector(repeats=2, stall_steps=0),
+            additional_instructions=["Be brief"],
+            recorder=Mock(),
+        ),
+    )
+    agent.get_state = Mock(side_effect=lambda: make_state(WHITE))
+    agent.take_action = Mock()
+
+    for _ in range(3):
+        agent.step()
+    assert agent.additional_instructions[0] == "Be brief"
+    assert "not making progress" in agent.additional_instructions[1]
+    assert agent.status == BrowserGoalState.RUNNING
+
+    for _ in range(2):
+        agent.step()
+    assert agent.status == BrowserGoalState.FAILED
+    failure = agent.recorder.record.call_args.args[0].action
+    assert "repeated the left_click action" in failure.text
+    assert len(agent.additional_instructions) == 2
+    assert planner.plan_action.call_count == 4
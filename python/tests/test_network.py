@@ -0,0 +1,108 @@
+import time
+from typing import Any
+
+import pytest
+from cerebellum import (
+    DEFAULT_BLOCKING_PROFILE,
+    CDPConnection,
+    CDPTransport,
+    RequestBlocker,
+    RequestBlockingProfile,
+)
+from tests.conftest import FakeWebSocket, default_handler, install_fake_websocket
+
+
+@pytest.fixture
+def fake_ws(monkeypatch: pytest.MonkeyPatch) -> FakeWebSocket:
+    def handler(message: dict[str, Any]) -> dict[str, Any]:
+        if message["method"] == "Page.getFrameTree":
+            return {"frameTree": {"frame": {"id": "f1", "url": "https://shop.com/"}}}
+        return default_handler(message)
+
+    ws = install_fake_websocket(monkeypatch, handler)
+    return ws
+
+
+def test_profile_rules():
+    """Test pattern, resource type and third-party rules."""
+    profile = RequestBlockingProfile(
+        url_patterns=("*://*.ads.net/*",),
+        resource_types=frozenset({"Font"}),
+        third_party_only=True,
+    )
+    page = "https://www.shop.com/cart"
+
+    assert profile.blocks("https://x.ads.net/pixel.gif", "Image", page)
+    assert profile.blocks("https://fonts.cdn.org/a.woff2", "Font", page)
+    assert not profile.blocks("https://static.shop.com/a.woff2", "Font", page)
+    assert not profile.blocks("https://x.ads.net/frame.html", "Document", page)
+    assert not DEFAULT_BLOCKING_PROFILE.blocks(page, "Script", page)
+
+
+def test_url_patterns_use_blocked_urls(fake_ws: FakeWebSocket):
+    """Test URL-only profiles avoid interception and count blocked loads."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    blocker = RequestBlocker(
+        transport, RequestBlockingProfile(url_patterns=("*://*.ads.net/*",))
+    )
+    blocker.apply()
+    blocker.apply()
+
+    methods = [m["method"] for m in fake_ws.sent]
+    assert methods.count("Network.setBlockedURLs") == 1
+    assert "Fetch.enable" not in methods
+
+    fake_ws.emit(
+        "Network.loadingFailed",
+        {"requestId": "1", "type": "Image", "blockedReason": "inspector"},
+        "session-tab-1",
+    )
+    fake_ws.emit(
+        "Network.loadingFinished",
+        {"requestId": "2", "encodedDataLength": 2048},
+        "session-tab-1",
+    )
+    time.sleep(0.05)
+
+    assert blocker.stats.blocked_requests == 1
+    assert blocker.stats.allowed_requests == 1
+    assert blocker.stats.transferred_bytes == 2048
+    transport.close()
+
+
+def test_interception_fails_blocked_requests(fake_ws: FakeWebSocket):
+    """Test paused requests are failed or continued by the profile."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    blocker = RequestBlocker(transport, DEFAULT_BLOCKING_PROFILE)
+    blocker.apply()
+
+    for request_id, url, resource_type in (
+        ("1", "https://shop.com/app.js", "Script"),
+        ("2", "https://shop.com/font.woff2", "Font"),
+        ("3", "https://www.google-analytics.com/analytics.js", "Script"),
+    ):
+        fake_ws.emit(
+            "Fetch.requestPaused",
+            {
+                "requestId": request_id,
+                "request": {"url": url},
+                "resourceType": resource_type,
+                "frameId": "f1",
+            },
+            "session-tab-1",
+        )
+    time.sleep(0.05)
+
+    answers = {
+        m["params"]["requestId"]: m["method"]
+        for m in fake_ws.sent
+        if m["method"].startswith("Fetch.") and "requestId" in m["params"]
+    }
+    assert answers == {
+        "1": "Fetch.continueRequest",
+        "2": "Fetch.failRequest",
+        "3": "Fetch.failRequest",
+    }
+    assert blocker.stats.blocked_requests == 2
+    assert blocker.stats.blocked_by_type == {"Font": 1, "Script": 1}
+    transport.close()
@@ -0,0 +1,160 @@
+import base64
+import os
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    BrowserStep,
+    Coordinate,
+    DomElement,
+    ScrollBar,
+)
+from cerebellum.recorder import SessionRecorder, load_session
+
+from tests.conftest import make_state, make_step
+
+PNG_A = base64.b64encode(b"\x89PNG\r\n\x1a\nframe-a").decode()
+PNG_B = base64.b64encode(b"\x89PNG\r\n\x1a\nframe-b").decode()
+
+
+def make_recorded_step(
+    screenshot: str, action: BrowserActionType, index: int
+) -> BrowserStep:
+    """Builds a step with non-default state fields, numbered by index."""
+    state = make_state(
+        screenshot,
+        url="https://example.com",
+        width=800,
+        height=600,
+        mouse=Coordinate(x=1, y=2),
+        scrollbar=ScrollBar(offset=0.0, height=0.5),
+    )
+    coordinate = (
+        Coordinate(x=10, y=20) if action == BrowserActionType.MOUSE_MOVE else None
+    )
+    return make_step(
+        state, action, coordinate, reasoning=f"step {index}", id=f"toolu_{index}"
+    )
+
+
+def test_recorder_round_trip(tmp_path):
+    """Test recorded steps load back unchanged."""
+    steps = [
+        make_recorded_step(PNG_A, BrowserActionType.MOUSE_MOVE, 0),
+        make_recorded_step(PNG_B, BrowserActionType.LEFT_CLICK, 1),
+    ]
+    with SessionRecorder(str(tmp_path)) as recorder:
+        for step in steps:
+            recorder.record(step)
+
+    assert recorder.steps_recorded == 2
+    assert list(load_session(str(tmp_path))) == steps
+
+
+def test_recorder_round_trip_elements(tmp_path):
+    """Test DOM snapshots are recorded with the state."""
+    step = make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 0)
+    step.state.elements = [
+        DomElement("textbox", "Email", 10, 20, 200, 24, "a@b.c"),
+        DomElement("button", "Sign in", 10, 60, 80, 24),
+    ]
+    with SessionRecorder(str(tmp_path)) as recorder:
+        recorder.record(step)
+
+    assert list(load_session(str(tmp_path))) == [step]
+
+
+def test_recorder_deduplicates_screenshots(tmp_path):
+    """Test identical screenshots are stored once."""
+    with SessionRecorder(str(tmp_path)) as recorder:
+        for i in range(3):
+            recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, i))
+
+    assert len(os.listdir(tmp_path / "screenshots")) == 1
+    assert len(list(load_session(str(tmp_path)))) == 3
+
+
+def test_recorder_appends_to_existing_log(tmp_path):
+    """Test a second recorder continues an existing log."""
+    with SessionRecorder(str(tmp_path)) as recorder:
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 0))
+    with SessionRecorder(str(tmp_path)) as recorder:
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 1))
+
+    assert [s.action.id for s in load_session(str(tmp_path))] == [
+        "toolu_0",
+        "toolu_1",
+    ]
+
+
+def test_load_session_ignores_partial_line(tmp_path):
+    """Test a torn final line from a crash is skipped."""
+    with SessionRecorder(str(tmp_path)) as recorder:
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 0))
+    with open(tmp_path / "steps.jsonl", "a") as f:
+        f.write('{"state": {"screen')
+
+    assert len(list(load_session(str(tmp_path)))) == 1
+
+
+def test_recorder_resumes_after_partial_line(tmp_path):
+    """Test a recorder reopened after a crash mid-line keeps the log readable."""
+    with SessionRecorder(str(tmp_path)) as recorder:
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 0))
+    with open(tmp_path / "steps.jsonl", "a") as f:
+        f.write('{"state": {"screen')
+
+    with SessionRecorder(str(tmp_path)) as recorder:
+        assert recorder.steps_recorded == 1
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 1))
+
+    assert [s.action.id for s in load_session(str(tmp_path))] == [
+        "toolu_0",
+        "toolu_1",
+    ]
+
+
+def test_recorder_rejects_after_close(tmp_path):
+    """Test recording after close raises."""
+    recorder = SessionRecorder(str(tmp_path))
+    recorder.close()
+
+    with pytest.raises(RuntimeError):
+        recorder.record(make_recorded_step(PNG_A, BrowserActionType.LEFT_CLICK, 0))
+
+
+def test_browser_agent_records_steps(tmp_path):
+    """Test BrowserAgent streams taken and final steps to the recorder."""
+    driver = Mock()
+    driver.execute_script.side_effect = lambda script, *args: (
+        [0, 0]
+        if "last_mouse_x" in script or "pageYOffset" in script
+        else {"x": 800, "y": 600}
+    )
+    driver.get_screenshot_as_base64.return_value = PNG_A
+    driver.window_handles = ["tab-1"]
+    driver.current_window_handle = "tab-1"
+    driver.current_url = "https://example.com"
+    driver.title = "Example"
+    planner = Mock()
+    planner.plan_action.side_effect = [
+        make_recorded_step(PNG_A, BrowserActionType.MOUSE_MOVE, 0).action,
+        make_recorded_step(PNG_A, BrowserActionType.SUCCESS, 1).action,
+    ]
+
+    with SessionRecorder(str(tmp_path)) as recorder:
+        agent = BrowserAgent(
+            driver, planner, "goal", BrowserAgentOptions(recorder=recorder)
+        )
+        agent.step()
+        agent.step()
+
+    recorded = list(load_session(str(tmp_path)))
+    assert [s.action.action for s in recorded] == [
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.SUCCESS,
+    ]
+    assert len(agent.history) == 1
@@ -0,0 +1,83 @@
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserActionType,
+    BrowserAgent,
+    Coordinate,
+)
+from cerebellum.frames import SettleOptions
+from cerebellum.replay import ReplayOptions, ReplayRunner
+
+from tests.conftest import encode_frame, make_step
+
+RED = encode_frame((255, 0, 0))
+BLUE = encode_frame((0, 0, 255))
+GREEN = encode_frame((0, 255, 0))
+
+
+def make_agent(frames: list[str]) -> BrowserAgent:
+    """Builds an agent whose page advances one frame per replayed action."""
+    driver = Mock()
+    driver.execute_script.side_effect = lambda script, *args: (
+        [0, 0]
+        if "last_mouse_x" in script or "pageYOffset" in script
+        else {"x": 320, "y": 200}
+    )
+    driver.window_handles = ["tab-1"]
+    driver.current_window_handle = "tab-1"
+    page = {"index": 0}
+    driver.get_screenshot_as_base64.side_effect = lambda: frames[page["index"]]
+
+    agent = BrowserAgent(driver, Mock(), "goal")
+
+    def take_action(action, last_state):
+        page["index"] += 1
+
+    agent.take_action = Mock(side_effect=take_action)
+    return agent
+
+
+OPTIONS = ReplayOptions(settle=SettleOptions(interval_ms=1))
+
+
+def test_replay_matching_session():
+    """Test a matching recording replays every action without the planner."""
+    agent = make_agent([RED, BLUE, GREEN])
+    steps = [
+        make_step(RED, BrowserActionType.MOUSE_MOVE, Coordinate(x=5, y=5)),
+        make_step(BLUE, BrowserActionType.LEFT_CLICK),
+        make_step(GREEN, BrowserActionType.SUCCESS),
+    ]
+
+    result = ReplayRunner(agent, OPTIONS).run(steps)
+
+    assert result.success
+    assert result.steps_replayed == 2
+    assert agent.take_action.call_count == 2
+    assert [step.action.action for step in agent.history] == [
+        BrowserActionType.MOUSE_MOVE,
+        BrowserActionType.LEFT_CLICK,
+    ]
+    agent.planner.plan_action.assert_not_called()
+    # Two settle frames per verified step, the last of which is the state's
+    assert agent.driver.get_screenshot_as_base64.call_count == 6
+
+
+def test_replay_reports_first_divergence():
+    """Test replay stops at the first frame that differs from the recording."""
+    agent = make_agent([RED, GREEN, GREEN])
+    steps = [
+        make_step(RED, BrowserActionType.MOUSE_MOVE, Coordinate(x=5, y=5)),
+        make_step(BLUE, BrowserActionType.LEFT_CLICK),
+        make_step(GREEN, BrowserActionType.SUCCESS),
+    ]
+
+    result = ReplayRunner(agent, OPTIONS).run(steps)
+
+    assert not result.success
+    assert result.steps_replayed == 1
+    assert result.divergence.step_index == 1
+    assert result.divergence.expected == steps[1]
+    assert result.divergence.actual.screenshot == GREEN
+    assert result.divergence.difference > OPTIONS.diff_threshold
+    assert agent.take_action.call_count == 1
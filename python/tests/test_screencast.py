@@ -0,0 +1,89 @@
+import time
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    BrowserAgent,
+    BrowserAgentOptions,
+    CDPConnection,
+    CDPTransport,
+    ScreencastBuffer,
+)
+from tests.conftest import FakeWebSocket, default_handler, install_fake_websocket
+
+
+@pytest.fixture
+def fake_ws(monkeypatch: pytest.MonkeyPatch) -> FakeWebSocket:
+    def handler(message: dict[str, Any]) -> dict[str, Any]:
+        if message["method"] == "Page.startScreencast":
+            ws.emit(
+                "Page.screencastFrame",
+                {"data": "ZnJhbWUtMQ==", "metadata": {}, "sessionId": 1},
+                message["sessionId"],
+            )
+        return default_handler(message)
+
+    ws = install_fake_websocket(monkeypatch, handler)
+    return ws
+
+
+def test_screencast_buffers_and_acks_frames(fake_ws: FakeWebSocket):
+    """Test pushed frames are buffered, acknowledged and awaited by time."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    screencast = ScreencastBuffer(transport, capacity=2, frame_timeout_ms=50)
+    screencast.start()
+
+    first = screencast.wait_for_frame(0.0)
+    assert first is not None and first.data == "ZnJhbWUtMQ=="
+
+    # No repaint after the action, the unchanged frame is returned on timeout
+    assert screencast.wait_for_frame(time.monotonic()) == first
+
+    for index in (2, 3):
+        fake_ws.emit(
+            "Page.screencastFrame",
+            {"data": f"frame-{index}", "metadata": {}, "sessionId": index},
+            "session-tab-1",
+        )
+    latest = screencast.wait_for_frame(first.received_at)
+    assert latest is not None
+    time.sleep(0.05)  # Let the reader deliver the last frame
+    assert [frame.data for frame in screencast.frames()] == ["frame-2", "frame-3"]
+
+    acks = [m for m in fake_ws.sent if m["method"] == "Page.screencastFrameAck"]
+    assert [m["params"]["sessionId"] for m in acks] == [1, 2, 3]
+    transport.close()
+
+
+def test_screencast_follows_active_tab(fake_ws: FakeWebSocket):
+    """Test the stream restarts on the page the transport switched to."""
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    screencast = ScreencastBuffer(transport, frame_timeout_ms=50)
+    screencast.start()
+
+    transport.activate("tab-2")
+    screencast.wait_for_frame(0.0)
+
+    methods = [(m["method"], m.get("sessionId")) for m in fake_ws.sent]
+    assert ("Page.stopScreencast", "session-tab-1") in methods
+    assert ("Page.startScreencast", "session-tab-2") in methods
+    transport.close()
+
+
+def test_browser_agent_reads_screencast(fake_ws: FakeWebSocket):
+    """Test the agent observes the streamed frame instead of a screenshot."""
+    driver = Mock()
+    transport = CDPTransport(CDPConnection("ws://devtools"), "tab-1")
+    screencast = ScreencastBuffer(transport, frame_timeout_ms=50)
+    screencast.start()
+    agent = BrowserAgent(
+        driver,
+        Mock(),
+        "goal",
+        BrowserAgentOptions(cdp=transport, screencast=screencast),
+    )
+
+    assert agent.capture_screenshot() == "ZnJhbWUtMQ=="
+    assert not [m for m in fake_ws.sent if m["method"] == "Page.captureScreenshot"]
+    transport.close()
@@ -0,0 +1,109 @@
+import time
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from cerebellum import (
+    BrowserAgent,
+    BrowserAgentOptions,
+    CDPConnection,
+    PageTarget,
+    TabTracker,
+)
+from tests.conftest import FakeWebSocket, default_handler, install_fake_websocket
+
+
+def target_info(target_id: str, url: str, target_type: str = "page") -> dict[str, Any]:
+    return {
+        "targetId": target_id,
+        "type": target_type,
+        "url": url,
+        "title": url.rsplit("/", 1)[-1],
+        "attached": False,
+    }
+
+
+@pytest.fixture
+def fake_ws(monkeypatch: pytest.MonkeyPatch) -> FakeWebSocket:
+    def handler(message: dict[str, Any]) -> dict[str, Any]:
+        if message["method"] == "Target.setDiscoverTargets":
+            # Existing targets are reported when discovery is enabled
+            ws.emit(
+                "Target.targetCreated",
+                {"targetInfo": target_info("tab-1", "https://example.com/home")},
+            )
+            ws.emit(
+                "Target.targetCreated",
+                {
+                    "targetInfo": target_info(
+                        "worker-1", "https://example.com/sw.js", "service_worker"
+                    )
+                },
+            )
+        return default_handler(message)
+
+    ws = install_fake_websocket(monkeypatch, handler)
+    return ws
+
+
+def wait_for_pages(tracker: TabTracker, count: int) -> list[PageTarget]:
+    deadline = time.monotonic() + 1
+    while len(tracker.pages()) != count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return tracker.pages()
+
+
+def test_tab_tracker_follows_target_events(fake_ws: FakeWebSocket):
+    """Test pages are added, updated and removed from discovery events."""
+    tracker = TabTracker(CDPConnection("ws://devtools"))
+    tracker.start()
+
+    assert wait_for_pages(tracker, 1) == [
+        PageTarget(handle="tab-1", url="https://example.com/home", title="home")
+    ]
+
+    fake_ws.emit(
+        "Target.targetCreated",
+        {"targetInfo": target_info("tab-2", "about:blank")},
+    )
+    fake_ws.emit(
+        "Target.targetInfoChanged",
+        {"targetInfo": target_info("tab-2", "https://example.com/cart")},
+    )
+    fake_ws.emit("Target.targetDestroyed", {"targetId": "tab-1"})
+    time.sleep(0.05)
+
+    assert tracker.pages() == [
+        PageTarget(handle="tab-2", url="https://example.com/cart", title="cart")
+    ]
+    tracker.connection.close()
+
+
+def test_browser_agent_reads_tracked_tabs(fake_ws: FakeWebSocket):
+    """Test observation uses the tracked table and prunes closed tabs."""
+    driver = Mock()
+    driver.current_window_handle = "tab-1"
+    tracker = TabTracker(CDPConnection("ws://devtools"))
+    tracker.start()
+    wait_for_pages(tracker, 1)
+    agent = BrowserAgent(
+        driver, Mock(), "goal", BrowserAgentOptions(tab_tracker=tracker)
+    )
+
+    tabs, current_tab = agent._get_tabs()
+    assert current_tab == "tab-1"
+    assert [(tab.id, tab.new, tab.active) for tab in tabs] == [(0, True, True)]
+
+    fake_ws.emit(
+        "Target.targetCreated",
+        {"targetInfo": target_info("tab-2", "https://example.com/cart")},
+    )
+    fake_ws.emit("Target.targetDestroyed", {"targetId": "tab-1"})
+    wait_for_pages(tracker, 1)
+    time.sleep(0.05)
+
+    tabs, _ = agent._get_tabs()
+    assert [(tab.handle, tab.id, tab.new) for tab in tabs] == [("tab-2", 1, True)]
+    assert list(agent.tabs) == ["tab-2"]
+    driver.switch_to.window.assert_not_called()
+    tracker.connection.close()
@@ -0,0 +1,114 @@
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    ChromeTraceTracer,
+    Coordinate,
+    DomElement,
+    TargetIndex,
+    TargetSnapper,
+)
+
+CARD = DomElement("region", "Offer", 0, 0, 400, 300)
+BUTTON = DomElement("button", "Buy", 100, 100, 80, 30)
+LINK = DomElement("link", "Terms", 600, 20, 40, 16)
+
+
+def make_move(x: int, y: int) -> BrowserAction:
+    return BrowserAction(
+        action=BrowserActionType.MOUSE_MOVE,
+        coordinate=Coordinate(x=x, y=y),
+        text=None,
+        reasoning="",
+        id="toolu_01",
+    )
+
+
+def test_index_prefers_nearest_then_smallest():
+    index = TargetIndex([CARD, BUTTON, LINK], cell_size=32)
+
+    assert index.nearest(Coordinate(x=120, y=110), 10) == (BUTTON, 0)
+    assert index.nearest(Coordinate(x=10, y=10), 10) == (CARD, 0)
+    assert index.nearest(Coordinate(x=590, y=20), 12) == (LINK, 10)
+    assert index.nearest(Coordinate(x=590, y=20), 8) is None
+    assert index.nearest(Coordinate(x=900, y=700), 24) is None
+
+
+def test_snapper_moves_near_misses_inside_target():
+    snapper = TargetSnapper(tolerance=24)
+    snapper.update([BUTTON, LINK])
+
+    snapped = snapper.snap(make_move(90, 112))
+    assert snapped.coordinate == Coordinate(x=103, y=112)
+    assert snapper.last_distance == 13
+    assert snapper.snap(make_move(120, 110)).coordinate == Coordinate(x=120, y=110)
+    assert snapper.last_distance == 0
+    assert snapper.snap(make_move(400, 400)).coordinate == Coordinate(x=400, y=400)
+    assert snapper.last_distance is None
+
+    assert (snapper.stats.snapped, snapper.stats.on_target) == (1, 1)
+    assert snapper.stats.no_target == 1
+    assert snapper.stats.mean_distance == 13
+    assert snapper.stats.max_distance == 13
+
+
+def test_snapper_ignores_other_actions():
+    snapper = TargetSnapper()
+    snapper.update([BUTTON])
+    click = BrowserAction(
+        action=BrowserActionType.LEFT_CLICK,
+        coordinate=None,
+        text=None,
+        reasoning="",
+        id="toolu_01",
+    )
+
+    assert snapper.snap(click) is click
+    assert snapper.stats.snapped == snapper.stats.no_target == 0
+
+
+def test_agent_snaps_planned_move():
+    driver = Mock()
+    planner = Mock()
+    planner.plan_action.return_value = make_move(95, 95)
+    snapper = TargetSnapper()
+    agent = BrowserAgent(
+        driver, planner, "goal", BrowserAgentOptions(target_snapper=snapper)
+    )
+    state = Mock()
+    agent.get_state = Mock(return_value=state)
+    agent.take_action = Mock()
+    snapper.update([BUTTON])
+
+    agent.step()
+
+    assert agent.history[0].action.coordinate == Coordinate(x=103, y=103)
+    agent.take_action.assert_called_once_with(agent.history[0].action, state)
+
+
+def test_agent_traces_snap_distance():
+    planner = Mock()
+    planner.plan_action.return_value = make_move(110, 95)
+    snapper = TargetSnapper()
+    tracer = ChromeTraceTracer()
+    agent = BrowserAgent(
+        Mock(),
+        planner,
+        "goal",
+        BrowserAgentOptions(target_snapper=snapper, tracer=tracer),
+    )
+    agent.get_state = Mock()
+    agent._take_action = Mock()
+    snapper.update([BUTTON])
+
+    agent.step()
+    agent.take_action(make_move(0, 0), Mock())
+
+    acts = [span.attributes for span in tracer.spans if span.name == "act"]
+    assert acts == [
+        {"action": BrowserActionType.MOUSE_MOVE, "snap_distance": 8},
+        {"action": BrowserActionType.MOUSE_MOVE},
+    ]
@@ -0,0 +1,96 @@
+import json
+from unittest.mock import Mock
+
+from cerebellum import (
+    BrowserAction,
+    BrowserActionType,
+    BrowserAgent,
+    BrowserAgentOptions,
+    ChromeTraceTracer,
+    Coordinate,
+    NoopTracer,
+)
+
+
+def test_noop_tracer_span():
+    """Test NoopTracer span runs the block and records nothing."""
+    tracer = NoopTracer()
+    ran = False
+    with tracer.span("anything", key="value"):
+        ran = True
+    tracer.flush()
+
+    assert ran
+
+
+def test_chrome_trace_tracer_nested_spans():
+    """Test spans are recorded inner first with containing timings."""
+    tracer = ChromeTraceTracer()
+    with tracer.span("outer", step=1):
+        with tracer.span("inner"):
+            pass
+
+    assert [span.name for span in tracer.spans] == ["inner", "outer"]
+    inner, outer = tracer.spans
+    assert outer.attributes == {"step": 1}
+    assert outer.start_us <= inner.start_us
+    assert inner.start_us + inner.duration_us <= outer.start_us + outer.duration_us
+
+
+def test_chrome_trace_tracer_records_on_exception():
+    """Test a span is still recorded when the block raises."""
+    tracer = ChromeTraceTracer()
+    try:
+        with tracer.span("failing"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    assert [span.name for span in tracer.spans] == ["failing"]
+
+
+def test_chrome_trace_tracer_flush(tmp_path):
+    """Test flush writes a Chrome trace-event file."""
+    path = tmp_path / "trace.json"
+    tracer = ChromeTraceTracer(str(path))
+    with tracer.span("step", step=0):
+        pass
+    tracer.flush()
+
+    trace = json.loads(path.read_text())
+    (event,) = trace["traceEvents"]
+    assert event["name"] == "step"
+    assert event["ph"] == "X"
+    assert event["args"] == {"step": 0}
+    assert event["dur"] >= 0
+
+
+def test_browser_agent_step_spans():
+    """Test BrowserAgent.step emits step, capture, plan and act spans."""
+    tracer = ChromeTraceTracer()
+    driver = Mock()
+    driver.execute_script.side_effect = lambda script, *args: (
+        [0, 0]
+        if "last_mouse_x" in script or "pageYOffset" in script
+        else {"x": 800, "y": 600}
+    )
+    driver.window_handles = ["tab-1"]
+    driver.current_window_handle = "tab-1"
+    planner = Mock()
+    planner.plan_action.return_value = BrowserAction(
+        action=BrowserActionType.MOUSE_MOVE,
+        coordinate=Coordinate(x=10, y=20),
+        text=None,
+        reasoning="Move to the button",
+        id="toolu_01",
+    )
+    agent = BrowserAgent(driver, planner, "goal", BrowserAgentOptions(tracer=tracer))
+
+    agent.step()
+
+    names = [span.name for span in tracer.spans]
+    assert names[-1] == "step"
+    for name in ("capture", "capture.screenshot", "capture.tabs", "plan", "act"):
+        assert name in names
+    act = next(span for span in tracer.spans if span.name == "act")
+    assert act.attributes == {"action": BrowserActionType.MOUSE_MOVE}
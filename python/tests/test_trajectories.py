@@ -0,0 +1,103 @@
+import io
+import json
+from pathlib import Path
+
+from cerebellum import (
+    Coordinate,
+    TrainingImageOptions,
+    TrajectoryExamples,
+    TrajectoryShard,
+    TrajectoryWriter,
+    prepare_screenshot,
+    shard_complete,
+)
+from PIL import Image
+
+from tests.conftest import STEPS, make_overlay_state
+
+
+def write_shard(prefix: str) -> None:
+    with TrajectoryWriter(prefix) as writer:
+        writer.write("session-1", "Say hello", STEPS)
+        writer.begin("session-2", "Click once")
+        writer.append(STEPS[1], b"\xff\xd8custom")
+        writer.end()
+
+
+def test_shard_round_trip(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "shard-00000")
+    write_shard(prefix)
+
+    assert shard_complete(prefix)
+    shard = TrajectoryShard(prefix)
+    assert len(shard) == 2
+    assert [shard.step_count(i) for i in range(2)] == [3, 1]
+
+    trajectory = shard.trajectory(0)
+    assert trajectory.trajectory_id == "session-1"
+    assert [s.step.action for s in trajectory.steps] == [s.action for s in STEPS]
+    assert trajectory.steps[0].step.state.screenshot == ""
+
+    image = Image.open(io.BytesIO(shard.image(trajectory.steps[2].image)))
+    assert image.format == "JPEG"
+    assert shard.image(shard.trajectory(1).steps[0].image) == b"\xff\xd8custom"
+
+
+def test_identical_images_are_stored_once(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "shard")
+    write_shard(prefix)
+    shard = TrajectoryShard(prefix)
+
+    refs = [step.image for step in shard.trajectory(0).steps]
+    assert refs[0] == refs[1]  # Same frame and mouse position
+    assert refs[2] != refs[0]
+
+
+def test_unclosed_shard_is_incomplete(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "shard")
+    writer = TrajectoryWriter(prefix)
+    writer.write("session-1", "Say hello", STEPS)
+
+    assert not shard_complete(prefix)
+    writer.close()
+    assert shard_complete(prefix)
+
+
+def test_examples_are_built_per_prefix(tmp_path: Path) -> None:
+    prefix = str(tmp_path / "shard")
+    write_shard(prefix)
+    examples = TrajectoryExamples([prefix])
+
+    assert len(examples) == 4
+    first, last = examples[0], examples[2]
+    assert first[1]["content"].startswith("<USER_TASK>Say hello</USER_TASK>")
+    assert len(first) == 3 + 3
+    assert len(last) == 3 + 3 * 3
+
+    # Only the last step of a prefix carries a screenshot
+    images = [
+        part
+        for message in last
+        if isinstance(message["content"], list)
+        for part in message["content"]
+        if part["type"] == "image_url"
+    ]
+    assert len(images) == 1
+    assert images[0]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+
+    move = json.loads(first[-1]["tool_calls"][0]["arguments"])
+    assert move["coordinate"] == [0.25, 0.25]
+    assert [m["name"] for m in last if m["role"] == "tool"] == [
+        "screenshot",
+        "mouse_move",
+        "left_click",
+    ]
+    assert examples[3][-1]["tool_calls"][0]["name"] == "left_click"
+    assert examples[-1] == examples[3]
+
+
+def test_prepare_screenshot_fits_target_size() -> None:
+    state = make_overlay_state()
+    data = prepare_screenshot(state, TrainingImageOptions(Coordinate(x=160, y=160)))
+
+    assert Image.open(io.BytesIO(data)).size == (160, 100)